@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Create verified bot accounts (bot<i>@bots.local) for the CLI bot swarm.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100)
+        parser.add_argument('--password', default='botpassword')
+
+    def handle(self, *args, **options):
+        password = make_password(options['password'])
+        existing = set(
+            User.objects.filter(username__startswith='bot').values_list('username', flat=True)
+        )
+
+        bots = [
+            User(
+                email=f'bot{i}@bots.local',
+                username=f'bot{i}',
+                tournament_alias=f'bot{i}',
+                password=password,
+                email_verified=True
+            )
+            for i in range(options['count'])
+            if f'bot{i}' not in existing
+        ]
+        User.objects.bulk_create(bots, batch_size=500)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(bots)} bot accounts ({options["count"] - len(bots)} already existed).'
+        ))
@@ -1,31 +1,32 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
-import json
 import asyncio
-import random
-import math
 import time
 from channels.db import database_sync_to_async
-from django.contrib.auth import get_user_model
-from django.utils import timezone
+from django.conf import settings
 from ..models import Match
-from ..utils import PlayersManager, XPManager
-
-class ClassicPongConsumer(AsyncWebsocketConsumer):
+from ..utils import PlayersManager
+from ..scheduler import GameScheduler
+from ..delta import DeltaEncoder
+from ..protocol import GameProtocolMixin
+from ..fanout import GroupFanout
+from ..ownership import MatchOwnershipMixin
+from ..inputs import InputQueueMixin
+from ..spectators import SpectatorFeedMixin
+from ..replays import ReplayRecordingMixin
+from ..results import MatchResults
+from ..profiling import TickProfiler
+from ..engines import ClassicPongEngine
+
+class ClassicPongConsumer(InputQueueMixin, SpectatorFeedMixin, ReplayRecordingMixin, MatchOwnershipMixin, GameProtocolMixin, AsyncWebsocketConsumer):
     shared_games = {}
     game_loops = {}
     active_connections = {}
     connection_timestamps = {}
     disconnection_cleanup_tasks = {}
+    state_encoders = {}
 
-    GAME_WIDTH = 800
-    GAME_HEIGHT = 400
-    PADDLE_WIDTH = 15
-    PADDLE_HEIGHT = 80
-    BALL_SIZE = 10
-    PADDLE_SPEED = 11
-    INITIAL_BALL_SPEED = 7
-    MAX_BALL_SPEED = 15
-    BALL_SPEEDUP = 0.2
+    GAME_TYPE = 'classic-pong'
+    engine = ClassicPongEngine()
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -33,7 +34,6 @@ class ClassicPongConsumer(AsyncWebsocketConsumer):
         self.game_id = None
         self.username = None
         self.player_num = None
-        self.delta_time = 1/60
         self.reconnection_grace_period = 0
         self.cleanup_ref = False
         self.user = None
@@ -46,25 +46,15 @@ class ClassicPongConsumer(AsyncWebsocketConsumer):
         except Match.DoesNotExist:
             return False
 
-    @database_sync_to_async
-    def update_match_record(self, game_state):
-        try:
-            match = Match.objects.get(id=self.game_id)
-            winner_username = game_state['winner']
-            winner_user = get_user_model().objects.get(username=winner_username)
-            xp_manager = XPManager(winner_user)
-            xp_manager.add_xp(50)
-            winner_user.save()
-
-            match.winner = winner_user
-            match.score_player1 = game_state['score1']
-            match.score_player2 = game_state['score2']
-            match.forfeit = game_state.get('forfeit', False)
-            match.ended_at = timezone.now()
-            match.status = "completed"
-            match.save()
-        except Exception as e:
-            print(f"Error updating match record: {e}")
+    async def update_match_record(self, game_state):
+        await MatchResults.submit(
+            self.game_id,
+            game_state['winner'],
+            game_state['score1'],
+            game_state['score2'],
+            game_state.get('forfeit', False),
+            xp=50
+        )
 
     async def connect(self):
         try:
@@ -92,20 +82,18 @@ class ClassicPongConsumer(AsyncWebsocketConsumer):
 
             self.connection_timestamps[self.channel_name] = time.time()
 
-            if self.game_id in self.disconnection_cleanup_tasks:
-                self.disconnection_cleanup_tasks[self.game_id].cancel()
-                del self.disconnection_cleanup_tasks[self.game_id]
-
             await self.channel_layer.group_add(
                 self.room_group_name,
                 self.channel_name
             )
-            await self.accept()
+            await self.accept(self.negotiate_protocol())
+            await GroupFanout.join(self.room_group_name, self)
 
-            if self.game_id not in self.shared_games:
-                self.initialize_game_state()
-                if self.game_id not in self.game_loops:
-                    self.game_loops[self.game_id] = asyncio.create_task(self.game_loop())
+            await self.claim_match(create=True)
+            await self.submit(self.player_num, {
+                'type': 'player_joined',
+                'channel': self.channel_name
+            })
 
             if self.active_connections.get(self.game_id, 0) > 0:
                 await self.channel_layer.group_send(
@@ -125,6 +113,9 @@ class ClassicPongConsumer(AsyncWebsocketConsumer):
             if not hasattr(self, 'game_id'):
                 return
 
+            self.release_protocol()
+            await GroupFanout.leave(self.room_group_name, self)
+
             disconnect_time = time.time()
             connection_time = self.connection_timestamps.get(self.channel_name, disconnect_time)
             connection_duration = disconnect_time - connection_time
@@ -137,10 +128,7 @@ class ClassicPongConsumer(AsyncWebsocketConsumer):
                 await self.handle_unstable_connection()
                 return
 
-            cleanup_task = asyncio.create_task(
-                self.delayed_cleanup(self.game_id, self.player_num)
-            )
-            self.disconnection_cleanup_tasks[self.game_id] = cleanup_task
+            await self.submit(self.player_num, {'type': 'player_left'})
 
             await self.channel_layer.group_send(
                 self.room_group_name,
@@ -161,192 +149,104 @@ class ClassicPongConsumer(AsyncWebsocketConsumer):
         except Exception:
             pass
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         try:
-            data = json.loads(text_data)
-            game_state = self.shared_games[self.game_id]
+            data = self.decode_message(text_data, bytes_data)
 
             if data['type'] == 'init':
-                await self.handle_init(data, game_state)
-            elif data['type'] == 'player_input':
-                self.handle_player_input(data['input'])
+                self.player_num = 'player1' if data['isPlayer1'] else 'player2'
 
-            await self.broadcast_game_state()
+            if data['type'] in ('init', 'player_input'):
+                await self.submit(self.player_num, data)
 
         except Exception as e:
             print(f"Error in receive: {e}")
             await self.send_error("An error occurred processing your input")
 
-    async def handle_init(self, data, game_state):
-        if data['isPlayer1']:
-            self.player_num = 'player1'
+    async def apply_message(self, player, data):
+        game_state = self.shared_games[self.game_id]
+
+        if data['type'] == 'player_joined':
+            self.cancel_pending_cleanup()
+            self.wake_match()
+            await self.send_keyframe(data['channel'])
+        elif data['type'] == 'player_left':
+            self.schedule_cleanup(player)
+            self.wake_match()
+        elif data['type'] == 'init':
+            self.handle_init(player, data, game_state)
+        elif data['type'] == 'player_input':
+            self.queue_input(player, data)
+
+    def apply_queued_input(self, player, data):
+        self.handle_player_input(player, data['input'], data.get('seq'), data.get('tick'))
+
+    def handle_init(self, player, data, game_state):
+        if player == 'player1':
             game_state['player1'] = data['username']
             game_state['player2'] = data['opponent']
         else:
-            self.player_num = 'player2'
             game_state['player1'] = data['opponent']
             game_state['player2'] = data['username']
 
         if game_state['player1'] and game_state['player2']:
             game_state['gameStarted'] = True
+            self.wake_match()
 
-    def handle_player_input(self, input_type):
-        game_state = self.shared_games[self.game_id]
-        paddle_key = 'paddle1Y' if self.player_num == 'player1' else 'paddle2Y'
-
-        if input_type == 'up':
-            game_state[paddle_key] = max(
-                0,
-                game_state[paddle_key] - self.PADDLE_SPEED
-            )
-        elif input_type == 'down':
-            game_state[paddle_key] = min(
-                self.GAME_HEIGHT - self.PADDLE_HEIGHT,
-                game_state[paddle_key] + self.PADDLE_SPEED
-            )
+    def handle_player_input(self, player, input_type, seq=None, view_tick=None):
+        self.record_input(player, input_type, seq, view_tick)
+        self.engine.apply_input(self.shared_games[self.game_id], player, input_type, view_tick)
 
     def initialize_game_state(self):
-        self.shared_games[self.game_id] = {
-            'gameStarted': False,
-            'gameOver': False,
-            'player1': None,
-            'player2': None,
-            'paddle1Y': (self.GAME_HEIGHT - self.PADDLE_HEIGHT) / 2,
-            'paddle2Y': (self.GAME_HEIGHT - self.PADDLE_HEIGHT) / 2,
-            'ballX': self.GAME_WIDTH / 2,
-            'ballY': self.GAME_HEIGHT / 2,
-            'ballSpeedX': self.INITIAL_BALL_SPEED * (1 if random.random() > 0.5 else -1),
-            'ballSpeedY': self.INITIAL_BALL_SPEED * (random.random() * 2 - 1),
-            'score1': 0,
-            'score2': 0,
-            'lastUpdate': time.time(),
-            'winner': None,
-            'forfeit': False,
-            'combo1': 0,
-            'combo2': 0
-        }
-
-    async def game_loop(self):
-        try:
-            while True:
-                if self.game_id in self.shared_games:
-                    game_state = self.shared_games[self.game_id]
-                    current_time = time.time()
-                    dt = current_time - game_state['lastUpdate']
+        self.state_encoders[self.game_id] = DeltaEncoder()
+        self.shared_games[self.game_id] = self.engine.initial_state()
 
-                    if game_state['gameStarted'] and not game_state['gameOver']:
-                        self.update_game_state(dt)
-                        game_state['lastUpdate'] = current_time
-                        await self.check_scoring()
-                        await self.broadcast_game_state()
+    def wire_state(self):
+        return self.engine.to_wire(self.shared_games[self.game_id])
 
-                await asyncio.sleep(self.delta_time)
+    def snapshot_state(self):
+        return self.engine.to_snapshot(self.shared_games[self.game_id])
 
-        except asyncio.CancelledError:
-            pass
-        except Exception as e:
-            print(f"Error in game loop: {e}")
-
-    def update_game_state(self, dt):
-        game_state = self.shared_games[self.game_id]
-        self.update_ball_position()
-        self.check_collisions()
-
-    def update_ball_position(self):
-        game_state = self.shared_games[self.game_id]
+    def is_game_running(self):
+        game_state = self.shared_games.get(self.game_id)
+        return bool(game_state) and game_state['gameStarted'] and not game_state['gameOver']
 
-        next_x = game_state['ballX'] + game_state['ballSpeedX']
-        next_y = game_state['ballY'] + game_state['ballSpeedY']
+    def is_game_waiting(self):
+        game_state = self.shared_games.get(self.game_id)
+        return bool(game_state) and not game_state['gameStarted']
 
-        if next_y - self.BALL_SIZE/2 <= 0:
-            next_y = self.BALL_SIZE/2
-            game_state['ballSpeedY'] = abs(game_state['ballSpeedY'])
-        elif next_y + self.BALL_SIZE/2 >= self.GAME_HEIGHT:
-            next_y = self.GAME_HEIGHT - self.BALL_SIZE/2
-            game_state['ballSpeedY'] = -abs(game_state['ballSpeedY'])
+    def tick_mode(self):
+        mode = super().tick_mode()
+        if mode == 'live' and settings.GAME_CRUISE_TICKS and self.engine.ball_far_from_paddles(self.shared_games[self.game_id]):
+            return 'cruise'
+        return mode
 
-        game_state['ballX'] = next_x
-        game_state['ballY'] = next_y
+    async def game_tick(self, steps):
+        timer = TickProfiler.timer(self.GAME_TYPE, GameScheduler.tick_interval)
+        if not await self.keep_match_alive():
+            return
+        timer.mark('keep_match_alive')
 
-    def check_collisions(self):
         game_state = self.shared_games[self.game_id]
+        self.drain_inputs()
+        timer.mark('drain_inputs')
 
-        ball_left = game_state['ballX'] - self.BALL_SIZE/2
-        ball_right = game_state['ballX'] + self.BALL_SIZE/2
-        ball_top = game_state['ballY'] - self.BALL_SIZE/2
-        ball_bottom = game_state['ballY'] + self.BALL_SIZE/2
-
-        left_paddle_x = 50
-        if (ball_left <= left_paddle_x + self.PADDLE_WIDTH and
-            ball_right >= left_paddle_x and
-            ball_top <= game_state['paddle1Y'] + self.PADDLE_HEIGHT and
-            ball_bottom >= game_state['paddle1Y'] and
-            game_state['ballSpeedX'] < 0):
-
-            game_state['ballX'] = left_paddle_x + self.PADDLE_WIDTH + self.BALL_SIZE/2
-            self.handle_paddle_hit(game_state, game_state['paddle1Y'], True)
-            game_state['combo1'] += 1
-            game_state['combo2'] = 0
-
-        right_paddle_x = self.GAME_WIDTH - 50 - self.PADDLE_WIDTH
-        if (ball_right >= right_paddle_x and
-            ball_left <= right_paddle_x + self.PADDLE_WIDTH and
-            ball_top <= game_state['paddle2Y'] + self.PADDLE_HEIGHT and
-            ball_bottom >= game_state['paddle2Y'] and
-            game_state['ballSpeedX'] > 0):
-
-            game_state['ballX'] = right_paddle_x - self.BALL_SIZE/2
-            self.handle_paddle_hit(game_state, game_state['paddle2Y'], False)
-            game_state['combo2'] += 1
-            game_state['combo1'] = 0
-
-    def handle_paddle_hit(self, game_state, paddle_y, is_left_paddle):
-        relative_hit = (game_state['ballY'] - (paddle_y + self.PADDLE_HEIGHT/2)) / (self.PADDLE_HEIGHT/2)
-        relative_hit = max(-1, min(1, relative_hit))
-
-        max_angle = 5 * math.pi / 12
-        angle = relative_hit * max_angle
-
-        current_speed = math.sqrt(game_state['ballSpeedX']**2 + game_state['ballSpeedY']**2)
-        new_speed = min(current_speed + self.BALL_SPEEDUP, self.MAX_BALL_SPEED)
-        new_speed *= 1 + random.uniform(-0.1, 0.1)
-
-        direction = 1 if is_left_paddle else -1
-        game_state['ballSpeedX'] = direction * abs(new_speed * math.cos(angle))
-
-        y_direction = 1 if game_state['ballSpeedY'] > 0 else -1
-        game_state['ballSpeedY'] = y_direction * abs(new_speed * math.sin(angle))
-        game_state['ballSpeedY'] *= 1 + random.uniform(-0.1, 0.1)
-
-    async def check_scoring(self):
-        game_state = self.shared_games[self.game_id]
-
-        scored = False
-        if game_state['ballX'] <= 0:
-            game_state['score2'] += 1
-            game_state['combo2'] = 0
-            scored = True
-        elif game_state['ballX'] >= self.GAME_WIDTH:
-            game_state['score1'] += 1
-            game_state['combo1'] = 0
-            scored = True
-
-        if scored:
-            if game_state['score1'] >= 11 or game_state['score2'] >= 11:
-                winner = game_state['player1'] if game_state['score1'] > game_state['score2'] else game_state['player2']
-                game_state['winner'] = winner
-                game_state['gameOver'] = True
+        for _ in range(steps):
+            self.engine.step(game_state, GameScheduler.physics_step, timer.mark)
+            if game_state['gameOver']:
                 await self.update_match_record(game_state)
-                await self.broadcast_game_end(winner)
-            else:
-                self.reset_ball()
-
-    def reset_ball(self):
-        game_state = self.shared_games[self.game_id]
-        game_state['ballX'] = self.GAME_WIDTH / 2
-        game_state['ballY'] = self.GAME_HEIGHT / 2
-        game_state['ballSpeedX'] = self.INITIAL_BALL_SPEED * (1 if random.random() > 0.5 else -1)
-        game_state['ballSpeedY'] = self.INITIAL_BALL_SPEED * (random.random() * 2 - 1)
+                timer.mark('update_match_record')
+                await self.broadcast_game_end(game_state['winner'])
+                timer.mark('broadcast_game_end')
+                break
+
+        self.record_replay()
+        timer.mark('record_replay')
+        await self.broadcast_game_state()
+        timer.mark('broadcast_game_state')
+        await self.publish_spectators(final=game_state['gameOver'])
+        timer.mark('publish_spectators')
+        timer.finish()
 
     async def delayed_cleanup(self, game_id, player_number):
         try:
@@ -374,17 +274,12 @@ class ClassicPongConsumer(AsyncWebsocketConsumer):
                         self.room_group_name,
                         {
                             'type': 'game_ended_by_forfeit',
-                            'state': game_state,
+                            'state': self.engine.to_wire(game_state),
                             'message': f'Game ended due to player disconnection. {winner_username} wins by forfeit.'
                         }
                     )
 
-                if game_id in self.game_loops:
-                    self.game_loops[game_id].cancel()
-                    del self.game_loops[game_id]
-
-                if game_id in self.shared_games:
-                    del self.shared_games[game_id]
+                await self.release_match()
 
                 if game_id in self.active_connections:
                     del self.active_connections[game_id]
@@ -396,11 +291,15 @@ class ClassicPongConsumer(AsyncWebsocketConsumer):
 
     async def broadcast_game_state(self):
         if self.game_id in self.shared_games:
-            await self.channel_layer.group_send(
+            frame = self.state_encoders[self.game_id].encode(self.wire_state())
+            if frame is None:
+                return
+
+            await GroupFanout.send(
                 self.room_group_name,
                 {
                     'type': 'game_state_update',
-                    'state': self.shared_games[self.game_id]
+                    **self.encode_frame(frame)
                 }
             )
 
@@ -410,7 +309,7 @@ class ClassicPongConsumer(AsyncWebsocketConsumer):
             {
                 'type': 'game_ended',
                 'winner': winner,
-                'state': self.shared_games[self.game_id]
+                'state': self.wire_state()
             }
         )
 
@@ -424,45 +323,60 @@ class ClassicPongConsumer(AsyncWebsocketConsumer):
         )
 
     async def send_error(self, message):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'error',
             'message': message
-        }))
+        })
+
+    async def send_keyframe(self, channel):
+        if self.game_id in self.shared_games:
+            keyframe = self.state_encoders[self.game_id].keyframe(self.wire_state())
+            await self.channel_layer.send(channel, {
+                'type': 'game_state_update',
+                **self.encode_frame(keyframe)
+            })
+
+    def cancel_pending_cleanup(self):
+        if self.game_id in self.disconnection_cleanup_tasks:
+            self.disconnection_cleanup_tasks.pop(self.game_id).cancel()
+
+    def schedule_cleanup(self, player):
+        self.cancel_pending_cleanup()
+        self.disconnection_cleanup_tasks[self.game_id] = asyncio.create_task(
+            self.delayed_cleanup(self.game_id, player)
+        )
 
     async def game_state_update(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'game_state',
-            'state': event['state']
-        }))
+        await self.send_frame(event)
 
     async def game_ended(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'game_ended',
             'winner': event['winner'],
             'state': event['state']
-        }))
+        })
 
     async def game_ended_by_forfeit(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'game_ended_by_forfeit',
             'state': event['state'],
             'message': event['message']
-        }))
+        })
 
     async def connection_warning(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'connection_warning',
             'message': event['message']
-        }))
+        })
 
     async def player_disconnected(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'player_disconnected',
             'message': event['message']
-        }))
+        })
 
     async def player_reconnected(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'player_reconnected',
             'message': event['message']
-        }))
+        })
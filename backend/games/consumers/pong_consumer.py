@@ -1,24 +1,34 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
-import json
 import asyncio
 import time
 from channels.db import database_sync_to_async
-from django.contrib.auth import get_user_model
 from ..models import Match
-from ..utils import PlayersManager, XPManager
-from django.utils import timezone
-
-
-User = get_user_model()
-
-
-class PongConsumer(AsyncWebsocketConsumer):
+from ..utils import PlayersManager
+from ..scheduler import GameScheduler
+from ..delta import DeltaEncoder
+from ..protocol import GameProtocolMixin
+from ..fanout import GroupFanout
+from ..ownership import MatchOwnershipMixin
+from ..inputs import InputQueueMixin
+from ..spectators import SpectatorFeedMixin
+from ..replays import ReplayRecordingMixin
+from ..results import MatchResults
+from ..profiling import TickProfiler
+from ..engines import Pong3DEngine
+
+
+class PongConsumer(InputQueueMixin, SpectatorFeedMixin, ReplayRecordingMixin, MatchOwnershipMixin, GameProtocolMixin, AsyncWebsocketConsumer):
 
     shared_games = {}
     game_loops = {}
     active_connections = {}
     connection_timestamps = {}
     disconnection_cleanup_tasks = {}
+    state_encoders = {}
+
+    GAME_TYPE = 'pong'
+    PLAYER_MESSAGES = ('init', 'mouse_move')
+    engine = Pong3DEngine()
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -26,7 +36,6 @@ class PongConsumer(AsyncWebsocketConsumer):
         self.player_number = None
         self.game_id = None
         self.username = None
-        self.delta_time = 1/60
         self.reconnection_grace_period = 0
 
     @database_sync_to_async
@@ -74,20 +83,18 @@ class PongConsumer(AsyncWebsocketConsumer):
 
             self.connection_timestamps[self.channel_name] = time.time()
 
-            if self.game_id in self.disconnection_cleanup_tasks:
-                self.disconnection_cleanup_tasks[self.game_id].cancel()
-                del self.disconnection_cleanup_tasks[self.game_id]
-
             await self.channel_layer.group_add(
                 self.room_group_name,
                 self.channel_name
             )
-            await self.accept()
+            await self.accept(self.negotiate_protocol())
+            await GroupFanout.join(self.room_group_name, self)
 
-            if self.game_id not in self.shared_games:
-                self.initialize_game_state()
-                if self.game_id not in self.game_loops:
-                    self.game_loops[self.game_id] = asyncio.create_task(self.game_loop())
+            await self.claim_match(create=True)
+            await self.submit(self.player_number, {
+                'type': 'player_joined',
+                'channel': self.channel_name
+            })
 
             if self.active_connections.get(self.game_id, 0) > 0:
                 await self.channel_layer.group_send(
@@ -107,6 +114,9 @@ class PongConsumer(AsyncWebsocketConsumer):
             if not hasattr(self, 'game_id'):
                 return
 
+            self.release_protocol()
+            await GroupFanout.leave(self.room_group_name, self)
+
             disconnect_time = time.time()
             connection_time = self.connection_timestamps.get(self.channel_name, disconnect_time)
             connection_duration = disconnect_time - connection_time
@@ -118,10 +128,7 @@ class PongConsumer(AsyncWebsocketConsumer):
                 await self.handle_unstable_connection()
                 return
 
-            cleanup_task = asyncio.create_task(
-                self.delayed_cleanup(self.game_id, self.player_number)
-            )
-            self.disconnection_cleanup_tasks[self.game_id] = cleanup_task
+            await self.submit(self.player_number, {'type': 'player_left'})
 
             await self.channel_layer.group_send(
                 self.room_group_name,
@@ -157,8 +164,8 @@ class PongConsumer(AsyncWebsocketConsumer):
 
                     game_state['winner'] = game_state[winning_player]
                     game_state['final_score'] = {
-                        'player1': 3 if winning_player == 'player1' else 0,
-                        'player2': 3 if winning_player == 'player2' else 0
+                        'player1': self.engine.ROUNDS_TO_WIN if winning_player == 'player1' else 0,
+                        'player2': self.engine.ROUNDS_TO_WIN if winning_player == 'player2' else 0
                     }
                     game_state['disconnect_forfeit'] = True
 
@@ -177,12 +184,7 @@ class PongConsumer(AsyncWebsocketConsumer):
                         }
                     )
 
-                if game_id in self.game_loops:
-                    self.game_loops[game_id].cancel()
-                    del self.game_loops[game_id]
-
-                if game_id in self.shared_games:
-                    del self.shared_games[game_id]
+                await self.release_match()
 
                 if game_id in self.active_connections:
                     del self.active_connections[game_id]
@@ -202,41 +204,18 @@ class PongConsumer(AsyncWebsocketConsumer):
         )
 
     def initialize_game_state(self):
-        self.shared_games[self.game_id] = {
-            'game_id': self.game_id,
-            'player1': None,
-            'player2': None,
-            'ball_position': {
-                'x': 0,
-                'y': 5.0387,
-                'z': -8
-            },
-            'paddle1_position': {
-                'x': 0,
-                'y': 4.0387,
-                'z': 10
-            },
-            'paddle2_position': {
-                'x': 0,
-                'y': 4.0387,
-                'z': -10
-            },
-            'scores': {'player1': 0, 'player2': 0},
-            'rounds_won': {'player1': 0, 'player2': 0},
-            'winner': None,
-            'game_started': False,
-            'last_update': time.time()
-        }
-
-    async def receive(self, text_data):
+        self.state_encoders[self.game_id] = DeltaEncoder()
+        self.shared_games[self.game_id] = self.engine.initial_state(self.game_id)
+
+    async def receive(self, text_data=None, bytes_data=None):
         try:
-            data = json.loads(text_data)
+            data = self.decode_message(text_data, bytes_data)
 
             if data['type'] == 'ping':
-                await self.send(text_data=json.dumps({
+                await self.send_message({
                     'type': 'pong',
                     'timestamp': time.time()
-                }))
+                })
                 return
 
             if data['type'] == 'client_disconnect':
@@ -252,122 +231,93 @@ class PongConsumer(AsyncWebsocketConsumer):
                 return
 
             if data['type'] == 'init':
-                await self.handle_init(data)
-            elif data['type'] == 'mouse_move':
-                self.update_paddle_position(data)
-            elif data['type'] == 'ball_position':
-                self.update_ball_position(data)
-            elif data['type'] == 'score_update':
-                await self.handle_score_update(data)
-            elif data['type'] == 'game_won':
-                await self.handle_game_won(data)
-            elif data['type'] == 'match_complete':
-                await self.handle_match_complete(data)
-
-            await self.broadcast_game_state()
+                self.player_number = 'player1' if data['isPlayer1'] else 'player2'
+
+            if data['type'] in self.PLAYER_MESSAGES:
+                await self.submit(self.player_number, data)
 
         except Exception as e:
             print(f"Error in receive: {e}")
             await self.send_error("An error occurred processing your input")
 
-    async def handle_init(self, data):
-        if data['isPlayer1']:
-            self.player_number = 'player1'
+    async def apply_message(self, player, data):
+        if data['type'] == 'player_joined':
+            self.cancel_pending_cleanup()
+            self.wake_match()
+            await self.send_keyframe(data['channel'])
+            return
+        elif data['type'] == 'player_left':
+            self.schedule_cleanup(player)
+            self.wake_match()
+            return
+
+        if data['type'] == 'init':
+            self.handle_init(player, data)
+        elif data['type'] == 'mouse_move':
+            self.queue_input(player, data)
+
+    def apply_queued_input(self, player, data):
+        self.engine.apply_input(self.shared_games[self.game_id], player, data['mouse_position'])
+
+    def handle_init(self, player, data):
+        if player == 'player1':
             self.shared_games[self.game_id]['player1'] = data['username']
             self.shared_games[self.game_id]['player2'] = data['opponent']
         else:
-            self.player_number = 'player2'
             self.shared_games[self.game_id]['player1'] = data['opponent']
             self.shared_games[self.game_id]['player2'] = data['username']
 
         if all([self.shared_games[self.game_id]['player1'],
                 self.shared_games[self.game_id]['player2']]):
             self.shared_games[self.game_id]['game_started'] = True
+            self.wake_match()
 
-    def update_paddle_position(self, data):
-        if self.player_number == 'player1':
-            self.shared_games[self.game_id]['paddle1_position'].update({
-                'x': 5.5 * data['mouse_position']['x'],
-                'z': 11 - abs(data['mouse_position']['x'] * 2),
-                'y': 5.03 + data['mouse_position']['y'] * 2
-            })
-        elif self.player_number == 'player2':
-            self.shared_games[self.game_id]['paddle2_position'].update({
-                'x': -5.5 * data['mouse_position']['x'],
-                'z': -11 + abs(data['mouse_position']['x'] * 2),
-                'y': 5.03 + data['mouse_position']['y'] * 2
-            })
+    def is_game_running(self):
+        game_state = self.shared_games.get(self.game_id)
+        return bool(game_state) and game_state['game_started'] and not game_state.get('winner')
 
-    def update_ball_position(self, data):
-        self.shared_games[self.game_id]['ball_position'].update(data['ball_position'])
-
-    async def handle_score_update(self, data):
-        game_state = self.shared_games[self.game_id]
-        game_state['scores'] = data['scores']
-
-        if 'scoring_history' not in game_state:
-            game_state['scoring_history'] = []
-        game_state['scoring_history'].append({
-            'scorer': data['scoringPlayer'],
-            'score': data['scores']
-        })
+    def is_game_waiting(self):
+        game_state = self.shared_games.get(self.game_id)
+        return bool(game_state) and not game_state['game_started']
 
-    async def handle_game_won(self, data):
-        game_state = self.shared_games[self.game_id]
-        game_state['rounds_won'] = data['matches']
-        game_state['current_game_winner'] = data['winner']
-        game_state['scores'] = {'player1': 0, 'player2': 0}
+    async def game_tick(self, steps):
+        timer = TickProfiler.timer(self.GAME_TYPE, GameScheduler.tick_interval)
+        if not await self.keep_match_alive():
+            return
+        timer.mark('keep_match_alive')
 
-    async def handle_match_complete(self, data):
         game_state = self.shared_games[self.game_id]
-        winner_username = self.get_user_from_player_number(data['winner'])
-        game_state['winner'] = winner_username
-        game_state['final_score'] = data['finalScore']
-
-        await self.update_match_record(data)
-
-        game_state['scores'] = {'player1': 0, 'player2': 0}
-        game_state['rounds_won'] = {'player1': 0, 'player2': 0}
-
-    async def game_loop(self):
-        try:
-            while True:
-                if self.game_id in self.shared_games:
-                    game_state = self.shared_games[self.game_id]
-                    current_time = time.time()
-                    dt = current_time - game_state['last_update']
-
-                    if game_state['game_started'] and not game_state.get('winner'):
-                        game_state['last_update'] = current_time
-                        await self.broadcast_game_state()
-
-                await asyncio.sleep(self.delta_time)
-
-        except asyncio.CancelledError:
-            pass
-        except Exception as e:
-            print(f"Error in game loop: {e}")
-
-    @database_sync_to_async
-    def update_match_record(self, data):
-        try:
-            match = Match.objects.get(id=self.game_id)
-            winner_username = self.get_user_from_player_number(data['winner'])
-            winner_user = get_user_model().objects.get(username=winner_username)
-            xp_manager = XPManager(winner_user)
-            xp_manager.add_xp(100)
-            winner_user.save()
-
-            match.winner = winner_user
-            match.final_score = f"{data['finalScore']['player1']}-{data['finalScore']['player2']}"
-            match.score_player1 = self.shared_games[self.game_id]['rounds_won']['player1']
-            match.score_player2 = self.shared_games[self.game_id]['rounds_won']['player2']
-            match.forfeit = data['forfeit']
-            match.ended_at = timezone.now()
-            match.status = "completed"
-            match.save()
-        except Exception as e:
-            print(f"Error updating match record: {e}")
+        self.drain_inputs()
+        timer.mark('drain_inputs')
+
+        for _ in range(steps):
+            self.engine.step(game_state, GameScheduler.physics_step, timer.mark)
+            if game_state['winner']:
+                await self.update_match_record({
+                    'winner': 'player1' if game_state['winner'] == game_state['player1'] else 'player2',
+                    'finalScore': game_state['final_score'],
+                    'forfeit': False
+                })
+                timer.mark('update_match_record')
+                break
+
+        self.record_replay()
+        timer.mark('record_replay')
+        await self.broadcast_game_state()
+        timer.mark('broadcast_game_state')
+        await self.publish_spectators(final=bool(game_state['winner']))
+        timer.mark('publish_spectators')
+        timer.finish()
+
+    async def update_match_record(self, data):
+        await MatchResults.submit(
+            self.game_id,
+            self.get_user_from_player_number(data['winner']),
+            data['finalScore']['player1'],
+            data['finalScore']['player2'],
+            data['forfeit'],
+            xp=100
+        )
 
     def get_user_from_player_number(self, player_number):
         game_state = self.shared_games[self.game_id]
@@ -375,101 +325,67 @@ class PongConsumer(AsyncWebsocketConsumer):
 
     async def broadcast_game_state(self):
         if self.game_id in self.shared_games:
-            await self.channel_layer.group_send(
+            frame = self.state_encoders[self.game_id].encode(self.shared_games[self.game_id])
+            if frame is None:
+                return
+
+            await GroupFanout.send(
                 self.room_group_name,
                 {
                     'type': 'send_game_state',
-                    'state': self.shared_games[self.game_id]
+                    **self.encode_frame(frame)
                 }
             )
 
+    async def send_keyframe(self, channel):
+        if self.game_id in self.shared_games:
+            keyframe = self.state_encoders[self.game_id].keyframe(self.shared_games[self.game_id])
+            await self.channel_layer.send(channel, {
+                'type': 'send_game_state',
+                **self.encode_frame(keyframe)
+            })
+
+    def cancel_pending_cleanup(self):
+        if self.game_id in self.disconnection_cleanup_tasks:
+            self.disconnection_cleanup_tasks.pop(self.game_id).cancel()
+
+    def schedule_cleanup(self, player):
+        self.cancel_pending_cleanup()
+        self.disconnection_cleanup_tasks[self.game_id] = asyncio.create_task(
+            self.delayed_cleanup(self.game_id, player)
+        )
+
     async def send_game_state(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'game_state',
-            'state': event['state']
-        }))
+        await self.send_frame(event)
 
     async def player_disconnected(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'player_disconnected',
             'message': event['message']
-        }))
+        })
 
     async def player_reconnected(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'player_reconnected',
             'message': event['message']
-        }))
+        })
 
     async def connection_warning(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'connection_warning',
             'message': event['message']
-        }))
+        })
 
     async def game_ended_by_forfeit(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'game_ended_by_forfeit',
             'state': event['state'],
             'message': event['message']
-        }))
+        })
 
     async def send_error(self, message):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'error',
             'message': message,
             'timestamp': time.time()
-        }))
-
-    @database_sync_to_async
-    def get_user_by_username(self, username):
-        User = get_user_model()
-        try:
-            return User.objects.get(username=username)
-        except User.DoesNotExist:
-            return None
-
-    def handle_game_state_update(self, game_state):
-        current_time = time.time()
-
-        if 'last_activity' in game_state:
-            if current_time - game_state['last_activity'] > 30:
-                game_state['connection_warning'] = True
-
-        game_state['last_activity'] = current_time
-
-        if not game_state.get('winner'):
-            p1_score = game_state['rounds_won'].get('player1', 0)
-            p2_score = game_state['rounds_won'].get('player2', 0)
-
-            if p1_score >= 3 or p2_score >= 3:
-                game_state['winner'] = game_state['player1'] if p1_score > p2_score else game_state['player2']
-                game_state['game_complete'] = True
-
-    def validate_game_state(self):
-        if self.game_id not in self.shared_games:
-            return False
-
-        game_state = self.shared_games[self.game_id]
-        required_fields = ['player1', 'player2', 'scores', 'rounds_won']
-
-        return all(field in game_state for field in required_fields)
-
-    async def handle_reconnection(self):
-        if not self.validate_game_state():
-            await self.send_error("Invalid game state on reconnection")
-            return False
-
-        game_state = self.shared_games[self.game_id]
-        game_state['connection_warning'] = False
-        game_state['last_activity'] = time.time()
-
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'player_reconnected',
-                'message': f"{self.username} has reconnected",
-                'timestamp': time.time()
-            }
-        )
-        return True
+        })
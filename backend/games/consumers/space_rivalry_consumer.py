@@ -1,46 +1,31 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
-import json
 import asyncio
-import random
-import math
 import time
 from channels.db import database_sync_to_async
-from django.contrib.auth import get_user_model
 from ..models import Match
-from ..utils import PlayersManager, XPManager
-from django.utils import timezone
-
-class SpaceRivalryConsumer(AsyncWebsocketConsumer):
+from ..utils import PlayersManager
+from ..scheduler import GameScheduler
+from ..delta import DeltaEncoder
+from ..protocol import GameProtocolMixin
+from ..fanout import GroupFanout
+from ..ownership import MatchOwnershipMixin
+from ..inputs import InputQueueMixin
+from ..spectators import SpectatorFeedMixin
+from ..replays import ReplayRecordingMixin
+from ..results import MatchResults
+from ..profiling import TickProfiler
+from ..engines import SpaceRivalryEngine
+
+class SpaceRivalryConsumer(InputQueueMixin, SpectatorFeedMixin, ReplayRecordingMixin, MatchOwnershipMixin, GameProtocolMixin, AsyncWebsocketConsumer):
     shared_games = {}
     game_loops = {}
     active_connections = {}
     connection_timestamps = {}
     disconnection_cleanup_tasks = {}
+    state_encoders = {}
 
-    GAME_WIDTH = 800
-    GAME_HEIGHT = 600
-    SHIP_WIDTH = 40
-    SHIP_HEIGHT = 30
-    LASER_WIDTH = 4
-    LASER_HEIGHT = 15
-    ASTEROID_SIZE = 30
-    DEBRIS_SIZE = 20
-    POWERUP_SIZE = 25
-    MOVEMENT_SPEED = 10
-
-    POWERUPS = {
-        'RAPID_FIRE': {'duration': 5000, 'color': 'yellow'},
-        'SHIELD': {'duration': 8000, 'color': 'cyan'},
-        'DOUBLE_BULLETS': {'duration': 6000, 'color': 'magenta'},
-        'SLOW_MOTION': {'duration': 4000, 'color': 'lime'}
-    }
-
-    ASTEROID_TYPES = {
-        'NORMAL': {'speed': 3, 'size': ASTEROID_SIZE, 'health': 1, 'points': 100},
-        'FAST': {'speed': 5, 'size': ASTEROID_SIZE * 0.7, 'health': 1, 'points': 150},
-        'SPLIT': {'speed': 2, 'size': ASTEROID_SIZE * 1.2, 'health': 1, 'points': 200},
-        'EXPLODING': {'speed': 2, 'size': ASTEROID_SIZE * 1.3, 'health': 1, 'points': 300}
-    }
+    GAME_TYPE = 'space-rivalry'
+    engine = SpaceRivalryEngine(tick_ms=GameScheduler.physics_step * 1000)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -49,7 +34,6 @@ class SpaceRivalryConsumer(AsyncWebsocketConsumer):
         self.username = None
         self.player_num = None
         self.reconnection_grace_period = 0
-        self.delta_time = 1/60
 
     @database_sync_to_async
     def check_match_status(self):
@@ -92,20 +76,18 @@ class SpaceRivalryConsumer(AsyncWebsocketConsumer):
 
             self.connection_timestamps[self.channel_name] = time.time()
 
-            if self.game_id in self.disconnection_cleanup_tasks:
-                self.disconnection_cleanup_tasks[self.game_id].cancel()
-                del self.disconnection_cleanup_tasks[self.game_id]
-
             await self.channel_layer.group_add(
                 self.room_group_name,
                 self.channel_name
             )
-            await self.accept()
+            await self.accept(self.negotiate_protocol())
+            await GroupFanout.join(self.room_group_name, self)
 
-            if self.game_id not in self.shared_games:
-                self.initialize_game_state()
-                if self.game_id not in self.game_loops:
-                    self.game_loops[self.game_id] = asyncio.create_task(self.game_loop())
+            await self.claim_match(create=True)
+            await self.submit(self.player_num, {
+                'type': 'player_joined',
+                'channel': self.channel_name
+            })
 
             if self.active_connections.get(self.game_id, 0) > 0:
                 await self.channel_layer.group_send(
@@ -145,17 +127,12 @@ class SpaceRivalryConsumer(AsyncWebsocketConsumer):
                         self.room_group_name,
                         {
                             'type': 'game_ended_by_forfeit',
-                            'state': game_state,
+                            'state': self.engine.to_wire(game_state),
                             'message': f'Game ended due to player disconnection. {game_state[winning_player]} wins by forfeit.'
                         }
                     )
 
-                if game_id in self.game_loops:
-                    self.game_loops[game_id].cancel()
-                    del self.game_loops[game_id]
-
-                if game_id in self.shared_games:
-                    del self.shared_games[game_id]
+                await self.release_match()
 
                 if game_id in self.active_connections:
                     del self.active_connections[game_id]
@@ -170,6 +147,9 @@ class SpaceRivalryConsumer(AsyncWebsocketConsumer):
             if not hasattr(self, 'game_id'):
                 return
 
+            self.release_protocol()
+            await GroupFanout.leave(self.room_group_name, self)
+
             disconnect_time = time.time()
             connection_time = self.connection_timestamps.get(self.channel_name, disconnect_time)
             connection_duration = disconnect_time - connection_time
@@ -184,10 +164,7 @@ class SpaceRivalryConsumer(AsyncWebsocketConsumer):
                 await self.handle_unstable_connection()
                 return
 
-            cleanup_task = asyncio.create_task(
-                self.delayed_cleanup(self.game_id, self.player_num)
-            )
-            self.disconnection_cleanup_tasks[self.game_id] = cleanup_task
+            await self.submit(self.player_num, {'type': 'player_left'})
 
             await self.channel_layer.group_send(
                 self.room_group_name,
@@ -208,39 +185,53 @@ class SpaceRivalryConsumer(AsyncWebsocketConsumer):
         except Exception:
             pass
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         try:
-            data = json.loads(text_data)
-            game_state = self.shared_games[self.game_id]
+            data = self.decode_message(text_data, bytes_data)
 
             if data['type'] == 'init':
-                if data['isPlayer1']:
-                    self.player_num = 'player1'
-                    game_state['player1'] = data['username']
-                    game_state['player2'] = data['opponent']
-                else:
-                    self.player_num = 'player2'
-                    game_state['player1'] = data['opponent']
-                    game_state['player2'] = data['username']
-
-                if game_state['player1'] and game_state['player2']:
-                    game_state['gameStarted'] = True
-
-            elif data['type'] == 'player_input':
-                self.handle_player_input(data['input'])
+                self.player_num = 'player1' if data['isPlayer1'] else 'player2'
 
-            await self.broadcast_game_state()
+            if data['type'] in ('init', 'player_input'):
+                await self.submit(self.player_num, data)
 
         except Exception as e:
             print(f"Error in receive: {e}")
             await self.send_error("An error occurred processing your input")
 
+    async def apply_message(self, player, data):
+        game_state = self.shared_games[self.game_id]
+
+        if data['type'] == 'player_joined':
+            self.cancel_pending_cleanup()
+            self.wake_match()
+            await self.send_keyframe(data['channel'])
+        elif data['type'] == 'player_left':
+            self.schedule_cleanup(player)
+            self.wake_match()
+        elif data['type'] == 'init':
+            if player == 'player1':
+                game_state['player1'] = data['username']
+                game_state['player2'] = data['opponent']
+            else:
+                game_state['player1'] = data['opponent']
+                game_state['player2'] = data['username']
+
+            if game_state['player1'] and game_state['player2']:
+                game_state['gameStarted'] = True
+                self.wake_match()
+        elif data['type'] == 'player_input':
+            self.queue_input(player, data)
+
+    def apply_queued_input(self, player, data):
+        self.handle_player_input(player, data['input'], data.get('seq'))
+
     async def game_ended_by_forfeit(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'game_ended_by_forfeit',
             'state': event['state'],
             'message': event['message']
-        }))
+        })
 
     async def handle_unstable_connection(self):
         await self.channel_layer.group_send(
@@ -251,403 +242,134 @@ class SpaceRivalryConsumer(AsyncWebsocketConsumer):
             }
         )
 
-    def handle_player_input(self, input_type):
-        game_state = self.shared_games[self.game_id]
-        player_pos_key = f'player{self.player_num[-1]}Pos'
-
-        if input_type == 'left':
-            current_pos = game_state[player_pos_key]
-            min_pos = self.SHIP_WIDTH/2 if self.player_num == 'player1' else self.GAME_WIDTH/2 + self.SHIP_WIDTH/2
-            game_state[player_pos_key] = max(min_pos, current_pos - self.MOVEMENT_SPEED)
-
-        elif input_type == 'right':
-            current_pos = game_state[player_pos_key]
-            max_pos = self.GAME_WIDTH/2 - self.SHIP_WIDTH/2 if self.player_num == 'player1' else self.GAME_WIDTH - self.SHIP_WIDTH/2
-            game_state[player_pos_key] = min(max_pos, current_pos + self.MOVEMENT_SPEED)
-
-        elif input_type == 'shoot':
-            self.handle_shooting(game_state)
-
-    def handle_shooting(self, game_state):
-        player_num = int(self.player_num[-1])
-        current_time = time.time() * 1000
-        last_shot_key = f'lastShot{player_num}'
-
-        if current_time - game_state.get(last_shot_key, 0) >= self.get_shooting_cooldown(game_state, player_num):
-            player_pos = game_state[f'player{player_num}Pos']
-            lasers_key = f'lasers{player_num}'
-            effects = game_state[f'activeEffects{player_num}']
-
-            if effects.get('DOUBLE_BULLETS', {}).get('active'):
-                game_state[lasers_key].extend([
-                    {'x': player_pos - 10, 'y': self.GAME_HEIGHT - self.SHIP_HEIGHT - 10},
-                    {'x': player_pos + 10, 'y': self.GAME_HEIGHT - self.SHIP_HEIGHT - 10}
-                ])
-            else:
-                game_state[lasers_key].append({
-                    'x': player_pos,
-                    'y': self.GAME_HEIGHT - self.SHIP_HEIGHT - 10
-                })
-
-            game_state[last_shot_key] = current_time
-
-    def get_shooting_cooldown(self, game_state, player_num):
-        effects = game_state[f'activeEffects{player_num}']
-        return 250 if effects.get('RAPID_FIRE', {}).get('active') else 500
+    def handle_player_input(self, player, input_type, seq=None):
+        self.record_input(player, input_type, seq)
+        self.engine.apply_input(self.shared_games[self.game_id], player, input_type)
 
-    async def game_loop(self):
-        try:
-            while True:
-                if self.game_id in self.shared_games:
-                    game_state = self.shared_games[self.game_id]
-                    current_time = time.time()
-                    dt = current_time - game_state['lastUpdate']
-
-                    if game_state['gameStarted'] and not game_state['gameOver']:
-                        self.update_game_state(dt)
-                        game_state['lastUpdate'] = current_time
-                        await self.check_game_over()
-                        await self.broadcast_game_state()
+    def is_game_running(self):
+        game_state = self.shared_games.get(self.game_id)
+        return bool(game_state) and game_state['gameStarted'] and not game_state['gameOver']
 
-                await asyncio.sleep(self.delta_time)
+    def is_game_waiting(self):
+        game_state = self.shared_games.get(self.game_id)
+        return bool(game_state) and not game_state['gameStarted']
 
-        except asyncio.CancelledError:
-            pass
-        except Exception as e:
-            print(f"Error in game loop: {e}")
+    async def game_tick(self, steps):
+        timer = TickProfiler.timer(self.GAME_TYPE, GameScheduler.tick_interval)
+        if not await self.keep_match_alive():
+            return
+        timer.mark('keep_match_alive')
 
-    def initialize_game_state(self):
-        self.shared_games[self.game_id] = {
-            'gameStarted': False,
-            'gameOver': False,
-            'player1': None,
-            'player2': None,
-            'player1Pos': self.GAME_WIDTH / 4,
-            'player2Pos': 3 * self.GAME_WIDTH / 4,
-            'health1': 75,
-            'health2': 75,
-            'score1': 0,
-            'score2': 0,
-            'lasers1': [],
-            'lasers2': [],
-            'asteroids': [],
-            'debris': [],
-            'powerups': [],
-            'explosions': [],
-            'activeEffects1': {},
-            'activeEffects2': {},
-            'combo1': 0,
-            'combo2': 0,
-            'wave': 1,
-            'difficulty': 1,
-            'lastUpdate': time.time(),
-            'winner': None,
-            'forfeit': False
-        }
-
-    def update_game_state(self, dt):
         game_state = self.shared_games[self.game_id]
+        self.drain_inputs()
+        timer.mark('drain_inputs')
+
+        for _ in range(steps):
+            self.engine.step(game_state, GameScheduler.physics_step, timer.mark)
+            if game_state['gameOver']:
+                await self.update_match_record(game_state)
+                timer.mark('update_match_record')
+                await self.broadcast_game_end(game_state['winner'])
+                timer.mark('broadcast_game_end')
+                break
+
+        self.record_replay()
+        timer.mark('record_replay')
+        await self.broadcast_game_state()
+        timer.mark('broadcast_game_state')
+        await self.publish_spectators(final=game_state['gameOver'])
+        timer.mark('publish_spectators')
+        timer.finish()
 
-        self.update_lasers(game_state)
-
-        slow_motion = any(
-            game_state[f'activeEffects{i}'].get('SLOW_MOTION', {}).get('active')
-            for i in [1, 2]
-        )
-        speed_multiplier = 0.5 if slow_motion else 1
-
-        self.update_asteroids(game_state, speed_multiplier)
-
-        self.update_powerups(game_state)
-
-        self.update_debris(game_state)
-
-        self.update_explosions(game_state)
-
-        self.check_all_collisions(game_state)
-
-        game_state['difficulty'] = min(game_state['difficulty'] + 0.1 * dt / 30, 10)
-
-        if random.random() < 0.02 * game_state['difficulty']:
-            self.spawn_asteroid(game_state)
-
-    def update_lasers(self, game_state):
-        for player in [1, 2]:
-            game_state[f'lasers{player}'] = [
-                {**laser, 'y': laser['y'] - 10}
-                for laser in game_state[f'lasers{player}']
-                if laser['y'] > 0
-            ]
-
-    def update_asteroids(self, game_state, speed_multiplier):
-        game_state['asteroids'] = [
-            {**asteroid, 'y': asteroid['y'] + asteroid['speed'] * speed_multiplier}
-            for asteroid in game_state['asteroids']
-            if asteroid['y'] < self.GAME_HEIGHT + asteroid['size']
-        ]
-
-    def update_powerups(self, game_state):
-        current_time = time.time() * 1000
-
-        game_state['powerups'] = [
-            {**powerup, 'y': powerup['y'] + 2}
-            for powerup in game_state['powerups']
-            if powerup['y'] < self.GAME_HEIGHT
-        ]
-
-        for player in [1, 2]:
-            effects_key = f'activeEffects{player}'
-            for powerup_type, effect in game_state[effects_key].items():
-                if effect.get('active') and current_time >= effect.get('endsAt', 0):
-                    game_state[effects_key][powerup_type] = {'active': False}
-
-    def update_debris(self, game_state):
-        game_state['debris'] = [
-            {**debris, 'y': debris['y'] + 3}
-            for debris in game_state['debris']
-            if debris['y'] < self.GAME_HEIGHT
-        ]
-
-    def update_explosions(self, game_state):
-        current_time = time.time() * 1000
-        game_state['explosions'] = [
-            explosion for explosion in game_state['explosions']
-            if current_time - explosion['created'] < 500
-        ]
-
-    def check_all_collisions(self, game_state):
-
-        self.check_laser_collisions(game_state, 1)
-        self.check_laser_collisions(game_state, 2)
-
-        self.check_ship_collisions(game_state)
-
-        self.check_powerup_collisions(game_state)
-
-    def check_laser_collisions(self, game_state, player_num):
-        lasers_key = f'lasers{player_num}'
-        new_lasers = []
-        current_time = time.time() * 1000
-
-        for laser in game_state[lasers_key]:
-            hit = False
-            for asteroid in game_state['asteroids'][:]:
-                if self.check_collision(
-                    laser['x'], laser['y'], self.LASER_WIDTH, self.LASER_HEIGHT,
-                    asteroid['x'], asteroid['y'], asteroid['size'], asteroid['size']
-                ):
-                    hit = True
-                    game_state['asteroids'].remove(asteroid)
-
-                    if asteroid['type'] == 'SPLIT':
-                        self.split_asteroid(game_state, asteroid)
-                    elif asteroid['type'] == 'EXPLODING':
-                        self.create_explosion(game_state, asteroid)
-                        self.damage_nearby_asteroids(game_state, asteroid)
-
-                    self.update_score(game_state, player_num, asteroid['points'])
-
-                    if random.random() < 0.2:
-                        self.spawn_powerup(game_state, asteroid)
-
-                    self.create_debris(game_state, asteroid, 3 - player_num)
-                    break
-
-            if not hit:
-                new_lasers.append(laser)
-
-        game_state[lasers_key] = new_lasers
-
-    def check_ship_collisions(self, game_state):
-        for player_num in [1, 2]:
-            if game_state[f'activeEffects{player_num}'].get('SHIELD', {}).get('active'):
-                continue
-
-            ship_pos = game_state[f'player{player_num}Pos']
-
-            for asteroid in game_state['asteroids'][:]:
-                if self.check_collision(
-                    ship_pos, self.GAME_HEIGHT - self.SHIP_HEIGHT, self.SHIP_WIDTH, self.SHIP_HEIGHT,
-                    asteroid['x'], asteroid['y'], asteroid['size'], asteroid['size']
-                ):
-                    game_state[f'health{player_num}'] = max(0, game_state[f'health{player_num}'] - 20)
-                    game_state['asteroids'].remove(asteroid)
-
-            for debris in game_state['debris'][:]:
-                if debris['targetPlayer'] == player_num and self.check_collision(
-                    ship_pos, self.GAME_HEIGHT - self.SHIP_HEIGHT, self.SHIP_WIDTH, self.SHIP_HEIGHT,
-                    debris['x'], debris['y'], self.DEBRIS_SIZE, self.DEBRIS_SIZE
-                ):
-                    game_state[f'health{player_num}'] = max(0, game_state[f'health{player_num}'] - 10)
-                    game_state['debris'].remove(debris)
-
-    def check_powerup_collisions(self, game_state):
-        current_time = time.time() * 1000
-
-        for player_num in [1, 2]:
-            ship_pos = game_state[f'player{player_num}Pos']
-
-            for powerup in game_state['powerups'][:]:
-                if self.check_collision(
-                    ship_pos, self.GAME_HEIGHT - self.SHIP_HEIGHT, self.SHIP_WIDTH, self.SHIP_HEIGHT,
-                    powerup['x'], powerup['y'], self.POWERUP_SIZE, self.POWERUP_SIZE
-                ):
-                    # Activate power-up
-                    effects_key = f'activeEffects{player_num}'
-                    game_state[effects_key][powerup['type']] = {
-                        'active': True,
-                        'endsAt': current_time + self.POWERUPS[powerup['type']]['duration']
-                    }
-                    game_state['powerups'].remove(powerup)
-
-    def check_collision(self, x1, y1, w1, h1, x2, y2, w2, h2):
-        return (
-            abs(x1 - x2) * 2 < (w1 + w2) and
-            abs(y1 - y2) * 2 < (h1 + h2)
+    def initialize_game_state(self):
+        self.state_encoders[self.game_id] = DeltaEncoder()
+        self.shared_games[self.game_id] = self.engine.initial_state()
+
+    def wire_state(self):
+        return self.engine.to_wire(self.shared_games[self.game_id])
+
+    def snapshot_state(self):
+        return self.engine.to_snapshot(self.shared_games[self.game_id])
+
+    def restore_state(self, state):
+        self.engine.restore(self.shared_games[self.game_id], state)
+
+    async def update_match_record(self, game_state):
+        await MatchResults.submit(
+            self.game_id,
+            game_state['winner'],
+            game_state['score1'],
+            game_state['score2'],
+            game_state['forfeit'],
+            xp=50
         )
 
-    def update_score(self, game_state, player_num, points):
-        combo_key = f'combo{player_num}'
-        score_key = f'score{player_num}'
-
-        game_state[combo_key] += 1
-        combo_multiplier = 1 + game_state[combo_key] // 5
-        game_state[score_key] += points * combo_multiplier
-
-        game_state[f'lastHit{player_num}'] = time.time() * 1000
-
-    def spawn_asteroid(self, game_state):
-        asteroid_type = random.choice(list(self.ASTEROID_TYPES.keys()))
-        asteroid_data = self.ASTEROID_TYPES[asteroid_type]
-
-        game_state['asteroids'].append({
-            'x': random.uniform(0, self.GAME_WIDTH),
-            'y': -asteroid_data['size'],
-            'type': asteroid_type,
-            **asteroid_data
-        })
-
-    def split_asteroid(self, game_state, asteroid):
-        for offset in [-20, 20]:
-            game_state['asteroids'].append({
-                'x': asteroid['x'] + offset,
-                'y': asteroid['y'],
-                'type': 'NORMAL',
-                **self.ASTEROID_TYPES['NORMAL']
-            })
-
-    def create_explosion(self, game_state, asteroid):
-        game_state['explosions'].append({
-            'x': asteroid['x'],
-            'y': asteroid['y'],
-            'created': time.time() * 1000
-        })
-
-    def damage_nearby_asteroids(self, game_state, exploding_asteroid):
-        explosion_radius = 100
-        for asteroid in game_state['asteroids'][:]:
-            dx = asteroid['x'] - exploding_asteroid['x']
-            dy = asteroid['y'] - exploding_asteroid['y']
-            distance = math.sqrt(dx * dx + dy * dy)
-
-            if distance < explosion_radius:
-                game_state['asteroids'].remove(asteroid)
-
-    def spawn_powerup(self, game_state, asteroid):
-        powerup_type = random.choice(list(self.POWERUPS.keys()))
-        game_state['powerups'].append({
-            'x': asteroid['x'],
-            'y': asteroid['y'],
-            'type': powerup_type,
-            **self.POWERUPS[powerup_type]
-        })
-
-    def create_debris(self, game_state, asteroid, target_player):
-        game_state['debris'].append({
-            'x': asteroid['x'],
-            'y': asteroid['y'],
-            'targetPlayer': target_player
-        })
-
-    async def check_game_over(self):
-        game_state = self.shared_games[self.game_id]
-
-        if game_state['health1'] <= 0 or game_state['health2'] <= 0:
-            game_state['gameOver'] = True
-            winner = game_state['player2'] if game_state['health1'] <= 0 else game_state['player1']
-            game_state['winner'] = winner
-
-            await self.update_match_record(game_state)
-            await self.broadcast_game_end(winner)
-
-    @database_sync_to_async
-    def update_match_record(self, game_state):
-        try:
-            match = Match.objects.get(id=self.game_id)
-            winner_username = game_state['winner']
-            winner_user = get_user_model().objects.get(username=winner_username)
-            xp_manager = XPManager(winner_user)
-            xp_manager.add_xp(50)
-            winner_user.save()
-
-            match.winner = winner_user
-            match.score_player1 = game_state['score1']
-            match.score_player2 = game_state['score2']
-            match.forfeit = game_state['forfeit']
-            match.ended_at = timezone.now()
-
-            match.status = "completed"
-            match.save()
-        except Exception as e:
-            print(f"Error updating match record: {e}")
-
     async def broadcast_game_end(self, winner):
         await self.channel_layer.group_send(
             self.room_group_name,
             {
                 'type': 'game_ended',
                 'winner': winner,
-                'state': self.shared_games[self.game_id]
+                'state': self.wire_state()
             }
         )
 
     async def broadcast_game_state(self):
         if self.game_id in self.shared_games:
-            await self.channel_layer.group_send(
+            frame = self.state_encoders[self.game_id].encode(self.wire_state())
+            if frame is None:
+                return
+
+            await GroupFanout.send(
                 self.room_group_name,
                 {
                     'type': 'game_state_update',
-                    'state': self.shared_games[self.game_id]
+                    **self.encode_frame(frame)
                 }
             )
 
+    async def send_keyframe(self, channel):
+        if self.game_id in self.shared_games:
+            keyframe = self.state_encoders[self.game_id].keyframe(self.wire_state())
+            await self.channel_layer.send(channel, {
+                'type': 'game_state_update',
+                **self.encode_frame(keyframe)
+            })
+
+    def cancel_pending_cleanup(self):
+        if self.game_id in self.disconnection_cleanup_tasks:
+            self.disconnection_cleanup_tasks.pop(self.game_id).cancel()
+
+    def schedule_cleanup(self, player):
+        self.cancel_pending_cleanup()
+        self.disconnection_cleanup_tasks[self.game_id] = asyncio.create_task(
+            self.delayed_cleanup(self.game_id, player)
+        )
+
     async def game_state_update(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'game_state',
-            'state': event['state']
-        }))
+        await self.send_frame(event)
 
     async def player_disconnected(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'player_disconnected',
             'message': event['message']
-        }))
+        })
 
     async def player_reconnected(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'player_reconnected',
             'message': event['message']
-        }))
+        })
 
     async def game_ended(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'game_ended',
             'winner': event['winner'],
             'state': event['state']
-        }))
+        })
 
     async def send_error(self, message):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'error',
             'message': message
-        }))
+        })
@@ -0,0 +1,121 @@
+import asyncio
+import time
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from ..protocol import GameProtocolMixin
+from ..fanout import GroupFanout
+from ..utils import RedisClient
+
+
+class SpectatorConsumer(GameProtocolMixin, AsyncWebsocketConsumer):
+    ROOMS = {
+        'classic-pong': 'pong_{}',
+        'pong': 'pong_{}',
+        'space-rivalry': 'space_rivalry_{}',
+    }
+    # each viewer holds a seat scored by its last heartbeat, so seats of a worker that died
+    # without disconnecting age out instead of filling the room for good
+    seat_ttl = 30
+    seat_heartbeat = 10
+    local_seats = {}
+    heartbeat_task = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.room_group_name = None
+        self.seated = False
+
+    def seats_key(self):
+        return f'spectators:{self.room_group_name}'
+
+    @classmethod
+    def start_heartbeat(cls):
+        if cls.heartbeat_task is None or cls.heartbeat_task.done():
+            cls.heartbeat_task = asyncio.create_task(cls.heartbeat_loop())
+
+    @classmethod
+    async def heartbeat_loop(cls):
+        while cls.local_seats:
+            await asyncio.sleep(cls.seat_heartbeat)
+            redis = RedisClient.get()
+            now = time.time()
+            for key, channels in list(cls.local_seats.items()):
+                try:
+                    await redis.zadd(key, {channel: now for channel in channels})
+                    await redis.expire(key, cls.seat_ttl)
+                except Exception as e:
+                    print(f"Error refreshing spectator seats for {key}: {e}")
+
+    async def reserve_seat(self):
+        redis = RedisClient.get()
+        key = self.seats_key()
+        now = time.time()
+        try:
+            await redis.zremrangebyscore(key, 0, now - self.seat_ttl)
+            await redis.zadd(key, {self.channel_name: now})
+            await redis.expire(key, self.seat_ttl)
+            if await redis.zcard(key) > settings.SPECTATOR_CAP:
+                await redis.zrem(key, self.channel_name)
+                return False
+        except Exception as e:
+            print(f"Error reserving spectator seat for {self.room_group_name}: {e}")
+            return False
+
+        self.seated = True
+        self.local_seats.setdefault(key, set()).add(self.channel_name)
+        self.start_heartbeat()
+        return True
+
+    async def release_seat(self):
+        if not self.seated:
+            return
+
+        self.seated = False
+        key = self.seats_key()
+        channels = self.local_seats.get(key, set())
+        channels.discard(self.channel_name)
+        if not channels:
+            self.local_seats.pop(key, None)
+        try:
+            await RedisClient.get().zrem(key, self.channel_name)
+        except Exception as e:
+            print(f"Error releasing spectator seat for {self.room_group_name}: {e}")
+
+    async def connect(self):
+        try:
+            user = self.scope.get('user', None)
+            game_type = self.scope['url_route']['kwargs']['game_type']
+            game_id = self.scope['url_route']['kwargs']['game_id']
+
+            if user is None or game_type not in self.ROOMS:
+                await self.close()
+                return
+
+            self.room_group_name = f"spectate_{self.ROOMS[game_type].format(game_id)}"
+
+            if not await self.reserve_seat():
+                await self.close(code=4003)
+                return
+
+            await self.accept(self.negotiate_protocol())
+            await GroupFanout.join(self.room_group_name, self)
+        except Exception as e:
+            print(f"Error in spectator connect: {e}")
+
+    async def disconnect(self, close_code):
+        try:
+            if not self.room_group_name:
+                return
+
+            if self.seated:
+                self.release_protocol()
+                await GroupFanout.leave(self.room_group_name, self)
+            await self.release_seat()
+        except Exception as e:
+            print(f"Error in spectator disconnect: {e}")
+
+    async def receive(self, text_data=None, bytes_data=None):
+        pass
+
+    async def spectator_frame(self, event):
+        await self.send_frame(event)
@@ -0,0 +1,82 @@
+def snapshot(value):
+    if isinstance(value, dict):
+        return {key: snapshot(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [snapshot(item) for item in value]
+    return value
+
+
+def diff_state(old, new):
+    changes = {}
+    removed = []
+
+    for key, value in new.items():
+        if key not in old:
+            changes[key] = value
+            continue
+
+        previous = old[key]
+        if isinstance(value, dict) and isinstance(previous, dict):
+            nested_changes, nested_removed = diff_state(previous, value)
+            if nested_changes:
+                changes[key] = nested_changes
+            removed.extend([key] + path for path in nested_removed)
+        elif value != previous:
+            changes[key] = value
+
+    for key in old:
+        if key not in new:
+            removed.append([key])
+
+    return changes, removed
+
+
+class DeltaEncoder:
+    keyframe_interval = 60
+
+    def __init__(self, keyframe_interval=None):
+        if keyframe_interval is not None:
+            self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self.baseline = None
+        self.frames_since_keyframe = 0
+
+    def encode(self, state):
+        if self.baseline is None or self.frames_since_keyframe >= self.keyframe_interval:
+            self.seq += 1
+            self.baseline = snapshot(state)
+            self.frames_since_keyframe = 0
+            return {
+                'type': 'game_state',
+                'seq': self.seq,
+                'state': state
+            }
+
+        changes, removed = diff_state(self.baseline, state)
+        if not changes and not removed:
+            return None
+
+        self.seq += 1
+        self.baseline = snapshot(state)
+        self.frames_since_keyframe += 1
+
+        frame = {
+            'type': 'game_state_delta',
+            'seq': self.seq,
+            'base': self.seq - 1,
+            'changes': changes
+        }
+        if removed:
+            frame['removed'] = removed
+        return frame
+
+    def keyframe(self, state):
+        # a late joiner gets the state the last broadcast seq describes, so the next delta
+        # applies on top of it. The live state may already be ahead of that seq
+        if self.baseline is None:
+            return self.encode(state)
+        return {
+            'type': 'game_state',
+            'seq': self.seq,
+            'state': snapshot(self.baseline)
+        }
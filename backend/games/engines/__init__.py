@@ -0,0 +1,3 @@
+from .classic_pong import ClassicPongEngine
+from .space_rivalry import SpaceRivalryEngine
+from .pong3d import Pong3DEngine
@@ -0,0 +1,234 @@
+import math
+from .rng import MatchRandom
+
+
+class ClassicPongEngine:
+    GAME_WIDTH = 800
+    GAME_HEIGHT = 400
+    PADDLE_WIDTH = 15
+    PADDLE_HEIGHT = 80
+    PADDLE_OFFSET = 50
+    BALL_SIZE = 10
+    PADDLE_SPEED = 11
+    INITIAL_BALL_SPEED = 7
+    MAX_BALL_SPEED = 15
+    BALL_SPEEDUP = 0.2
+    WINNING_SCORE = 11
+
+    PHASES = ('update_ball_position', 'check_collisions', 'check_scoring')
+
+    # how far back a late input may still claim a hit (200ms at 60 ticks/s)
+    REWIND_TICKS = 12
+    # beyond this from both paddle faces nothing can happen for a good dozen steps
+    CRUISE_DISTANCE = 200
+    # server-side only, kept out of broadcasts and snapshots
+    PRIVATE_KEYS = ('paddleHistory1', 'paddleHistory2', 'missed1', 'missed2') + MatchRandom.STATE_KEYS
+
+    def __init__(self):
+        self.rng = MatchRandom()
+
+    def initial_state(self, seed=None):
+        game_state = {
+            'gameStarted': False,
+            'gameOver': False,
+            'player1': None,
+            'player2': None,
+            'paddle1Y': (self.GAME_HEIGHT - self.PADDLE_HEIGHT) / 2,
+            'paddle2Y': (self.GAME_HEIGHT - self.PADDLE_HEIGHT) / 2,
+            'ballX': self.GAME_WIDTH / 2,
+            'ballY': self.GAME_HEIGHT / 2,
+            'score1': 0,
+            'score2': 0,
+            'tick': 0,
+            'winner': None,
+            'forfeit': False,
+            'combo1': 0,
+            'combo2': 0,
+            'paddleHistory1': [],
+            'paddleHistory2': [],
+            'missed1': None,
+            'missed2': None
+        }
+        self.rng.seed(game_state, seed)
+        self.reset_ball(game_state)
+        return game_state
+
+    def apply_input(self, game_state, player, input_type, view_tick=None):
+        paddle_key = 'paddle1Y' if player == 'player1' else 'paddle2Y'
+
+        if input_type == 'up':
+            game_state[paddle_key] = max(
+                0,
+                game_state[paddle_key] - self.PADDLE_SPEED
+            )
+        elif input_type == 'down':
+            game_state[paddle_key] = min(
+                self.GAME_HEIGHT - self.PADDLE_HEIGHT,
+                game_state[paddle_key] + self.PADDLE_SPEED
+            )
+
+        if isinstance(view_tick, int):
+            self.record_paddle(game_state, player[-1], view_tick)
+
+    def record_paddle(self, game_state, player_num, view_tick):
+        # the paddle as the player placed it, indexed by the tick they were looking at
+        tick = game_state['tick']
+        input_tick = min(tick, max(view_tick, tick - self.REWIND_TICKS))
+        history = game_state[f'paddleHistory{player_num}']
+        history.append([input_tick, game_state[f'paddle{player_num}Y']])
+        while history[0][0] < tick - self.REWIND_TICKS:
+            history.pop(0)
+
+    def paddle_at(self, game_state, player_num, tick):
+        for input_tick, paddle_y in reversed(game_state[f'paddleHistory{player_num}']):
+            if input_tick <= tick:
+                return paddle_y
+        return None
+
+    def step(self, game_state, dt, probe=None):
+        for phase in self.PHASES:
+            getattr(self, phase)(game_state, dt)
+            if probe is not None:
+                probe(phase)
+        game_state['tick'] += 1
+
+    def update_ball_position(self, game_state, dt):
+        next_x = game_state['ballX'] + game_state['ballSpeedX']
+        next_y = game_state['ballY'] + game_state['ballSpeedY']
+
+        if next_y - self.BALL_SIZE/2 <= 0:
+            next_y = self.BALL_SIZE/2
+            game_state['ballSpeedY'] = abs(game_state['ballSpeedY'])
+        elif next_y + self.BALL_SIZE/2 >= self.GAME_HEIGHT:
+            next_y = self.GAME_HEIGHT - self.BALL_SIZE/2
+            game_state['ballSpeedY'] = -abs(game_state['ballSpeedY'])
+
+        game_state['ballX'] = next_x
+        game_state['ballY'] = next_y
+
+    def check_collisions(self, game_state, dt):
+        ball_left = game_state['ballX'] - self.BALL_SIZE/2
+        ball_right = game_state['ballX'] + self.BALL_SIZE/2
+
+        left_paddle_x = self.PADDLE_OFFSET
+        if (ball_left <= left_paddle_x + self.PADDLE_WIDTH and
+            ball_right >= left_paddle_x and
+            game_state['ballSpeedX'] < 0):
+            if self.covers(game_state['paddle1Y'], game_state['ballY']):
+                self.bounce(game_state, 1, game_state['paddle1Y'])
+            elif game_state['missed1'] is None and game_state['paddleHistory1']:
+                self.record_miss(game_state, 1)
+
+        right_paddle_x = self.GAME_WIDTH - self.PADDLE_OFFSET - self.PADDLE_WIDTH
+        if (ball_right >= right_paddle_x and
+            ball_left <= right_paddle_x + self.PADDLE_WIDTH and
+            game_state['ballSpeedX'] > 0):
+            if self.covers(game_state['paddle2Y'], game_state['ballY']):
+                self.bounce(game_state, 2, game_state['paddle2Y'])
+            elif game_state['missed2'] is None and game_state['paddleHistory2']:
+                self.record_miss(game_state, 2)
+
+        for player_num in [1, 2]:
+            if game_state[f'missed{player_num}'] is not None:
+                self.check_late_hit(game_state, player_num, dt)
+
+    def covers(self, paddle_y, ball_y):
+        return (
+            ball_y - self.BALL_SIZE/2 <= paddle_y + self.PADDLE_HEIGHT and
+            ball_y + self.BALL_SIZE/2 >= paddle_y
+        )
+
+    def bounce(self, game_state, player_num, paddle_y):
+        if player_num == 1:
+            game_state['ballX'] = self.PADDLE_OFFSET + self.PADDLE_WIDTH + self.BALL_SIZE/2
+        else:
+            game_state['ballX'] = self.GAME_WIDTH - self.PADDLE_OFFSET - self.PADDLE_WIDTH - self.BALL_SIZE/2
+        self.handle_paddle_hit(game_state, paddle_y, player_num == 1)
+        game_state[f'combo{player_num}'] += 1
+        game_state[f'combo{3 - player_num}'] = 0
+        game_state[f'missed{player_num}'] = None
+
+    def record_miss(self, game_state, player_num):
+        # the ball is level with the paddle and missed it. The player sends view ticks, so a late
+        # input may still claim the hit: remember where the ball was and hold the point
+        game_state[f'missed{player_num}'] = {
+            'tick': game_state['tick'],
+            'ballX': game_state['ballX'],
+            'ballY': game_state['ballY'],
+            'ballSpeedX': game_state['ballSpeedX'],
+            'ballSpeedY': game_state['ballSpeedY']
+        }
+
+    def check_late_hit(self, game_state, player_num, dt):
+        missed = game_state[f'missed{player_num}']
+        paddle_y = self.paddle_at(game_state, player_num, missed['tick'])
+
+        if paddle_y is not None and self.covers(paddle_y, missed['ballY']):
+            # rewind the ball to the miss, bounce it and play the elapsed ticks forward
+            for key in ('ballX', 'ballY', 'ballSpeedX', 'ballSpeedY'):
+                game_state[key] = missed[key]
+            self.bounce(game_state, player_num, paddle_y)
+            for _ in range(game_state['tick'] - missed['tick']):
+                self.update_ball_position(game_state, dt)
+        elif game_state['tick'] - missed['tick'] >= self.REWIND_TICKS:
+            game_state[f'missed{player_num}'] = None
+
+    def handle_paddle_hit(self, game_state, paddle_y, is_left_paddle):
+        relative_hit = (game_state['ballY'] - (paddle_y + self.PADDLE_HEIGHT/2)) / (self.PADDLE_HEIGHT/2)
+        relative_hit = max(-1, min(1, relative_hit))
+
+        max_angle = 5 * math.pi / 12
+        angle = relative_hit * max_angle
+
+        current_speed = math.sqrt(game_state['ballSpeedX']**2 + game_state['ballSpeedY']**2)
+        new_speed = min(current_speed + self.BALL_SPEEDUP, self.MAX_BALL_SPEED)
+        new_speed *= 1 + self.rng.uniform(game_state, -0.1, 0.1)
+
+        direction = 1 if is_left_paddle else -1
+        game_state['ballSpeedX'] = direction * abs(new_speed * math.cos(angle))
+
+        y_direction = 1 if game_state['ballSpeedY'] > 0 else -1
+        game_state['ballSpeedY'] = y_direction * abs(new_speed * math.sin(angle))
+        game_state['ballSpeedY'] *= 1 + self.rng.uniform(game_state, -0.1, 0.1)
+
+    def check_scoring(self, game_state, dt):
+        scored = False
+        if game_state['missed1'] is not None or game_state['missed2'] is not None:
+            return
+        if game_state['ballX'] <= 0:
+            game_state['score2'] += 1
+            game_state['combo2'] = 0
+            scored = True
+        elif game_state['ballX'] >= self.GAME_WIDTH:
+            game_state['score1'] += 1
+            game_state['combo1'] = 0
+            scored = True
+
+        if scored:
+            if game_state['score1'] >= self.WINNING_SCORE or game_state['score2'] >= self.WINNING_SCORE:
+                winner = game_state['player1'] if game_state['score1'] > game_state['score2'] else game_state['player2']
+                game_state['winner'] = winner
+                game_state['gameOver'] = True
+            else:
+                self.reset_ball(game_state)
+
+    def ball_far_from_paddles(self, game_state):
+        left_face = self.PADDLE_OFFSET + self.PADDLE_WIDTH
+        right_face = self.GAME_WIDTH - self.PADDLE_OFFSET - self.PADDLE_WIDTH
+        return (
+            game_state['ballX'] - left_face > self.CRUISE_DISTANCE and
+            right_face - game_state['ballX'] > self.CRUISE_DISTANCE and
+            game_state['missed1'] is None and game_state['missed2'] is None
+        )
+
+    def to_wire(self, game_state):
+        return {key: value for key, value in game_state.items() if key not in self.PRIVATE_KEYS}
+
+    def to_snapshot(self, game_state):
+        return {**self.to_wire(game_state), **self.rng.state(game_state)}
+
+    def reset_ball(self, game_state):
+        game_state['ballX'] = self.GAME_WIDTH / 2
+        game_state['ballY'] = self.GAME_HEIGHT / 2
+        game_state['ballSpeedX'] = self.INITIAL_BALL_SPEED * (1 if self.rng.random(game_state) > 0.5 else -1)
+        game_state['ballSpeedY'] = self.INITIAL_BALL_SPEED * (self.rng.random(game_state) * 2 - 1)
@@ -0,0 +1,49 @@
+import numpy as np
+
+
+class EntityPool:
+    # struct-of-arrays storage: one preallocated column per field, the first `count` rows live
+    initial_capacity = 32
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.count = 0
+        self.columns = {
+            name: np.zeros(self.initial_capacity, dtype=dtype) for name, dtype in fields.items()
+        }
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, name):
+        return self.columns[name][:self.count]
+
+    def grow(self):
+        for name, column in self.columns.items():
+            grown = np.zeros(len(column) * 2, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            self.columns[name] = grown
+
+    def add(self, **values):
+        if self.count == len(self.columns['x']):
+            self.grow()
+
+        index = self.count
+        for name, column in self.columns.items():
+            column[index] = values.get(name, 0)
+        self.count += 1
+        return index
+
+    def keep(self, mask):
+        kept = int(np.count_nonzero(mask))
+        if kept == self.count:
+            return
+        for column in self.columns.values():
+            column[:kept] = column[:self.count][mask]
+        self.count = kept
+
+    def clear(self):
+        self.count = 0
+
+    def lists(self, *names):
+        return [self.columns[name][:self.count].tolist() for name in names]
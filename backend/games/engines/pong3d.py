@@ -0,0 +1,221 @@
+import math
+import random
+
+
+class Pong3DEngine:
+    GRAVITY = -9.82
+    BALL_RADIUS = 0.1
+    FLOOR_Y = 0.5
+    FLOOR_RESTITUTION = 0.5
+
+    TABLE_TOP = 4.15
+    TABLE_THICKNESS = 0.3
+    TABLE_CENTER_Z = -0.06
+    TABLE_HALF_WIDTH = 4.14
+    TABLE_HALF_DEPTH = 9.255
+    OUT_MARGIN = 3
+
+    NET_HALF_THICKNESS = 0.15
+    NET_BOTTOM = 3.7
+    NET_TOP = 4.9
+
+    PADDLE_Z = 10
+    PADDLE_HALF_WIDTH = 0.55
+    PADDLE_HALF_HEIGHT = 0.75
+    PADDLE_HALF_DEPTH = 0.25
+    PADDLE_REST_Y = 4.0387
+    PADDLE_MAX_SPEED = 30
+
+    SERVE_Y = 5.0387
+    SERVE_Z = 8
+    SERVE_SPEED_Y = 4
+    SERVE_SPEED_Z = 14
+    START_DELAY = 3
+    SERVE_DELAY = 1
+
+    POINTS_TO_WIN = 11
+    ROUNDS_TO_WIN = 2
+
+    PHASES = ('update_paddles', 'update_ball', 'check_collisions', 'check_scoring')
+
+    def initial_state(self, game_id=None):
+        return {
+            'game_id': game_id,
+            'player1': None,
+            'player2': None,
+            'ball_position': {'x': 0, 'y': self.SERVE_Y, 'z': -self.SERVE_Z},
+            'ball_velocity': {'x': 0, 'y': self.SERVE_SPEED_Y, 'z': self.SERVE_SPEED_Z},
+            'paddle1_position': {'x': 0, 'y': self.PADDLE_REST_Y, 'z': self.PADDLE_Z},
+            'paddle2_position': {'x': 0, 'y': self.PADDLE_REST_Y, 'z': -self.PADDLE_Z},
+            'paddle_targets': {
+                'player1': {'x': 0, 'y': self.PADDLE_REST_Y, 'z': self.PADDLE_Z},
+                'player2': {'x': 0, 'y': self.PADDLE_REST_Y, 'z': -self.PADDLE_Z},
+            },
+            'bounces': {'player1': 0, 'player2': 0},
+            'last_hit': 'player2',
+            'serve_in': self.START_DELAY,
+            'scores': {'player1': 0, 'player2': 0},
+            'rounds_won': {'player1': 0, 'player2': 0},
+            'winner': None,
+            'game_started': False,
+            'tick': 0
+        }
+
+    def apply_input(self, game_state, player, mouse_position):
+        mouse_x = max(-1, min(1, float(mouse_position['x'])))
+        mouse_y = max(-1, min(1, float(mouse_position['y'])))
+
+        if player == 'player1':
+            target = {'x': 5.5 * mouse_x, 'z': 11 - abs(mouse_x * 2)}
+        else:
+            target = {'x': -5.5 * mouse_x, 'z': -11 + abs(mouse_x * 2)}
+        target['y'] = 5.03 + mouse_y * 2
+
+        game_state['paddle_targets'][player] = target
+
+    def step(self, game_state, dt, probe=None):
+        for phase in self.PHASES:
+            getattr(self, phase)(game_state, dt)
+            if probe is not None:
+                probe(phase)
+        game_state['tick'] += 1
+
+    def update_paddles(self, game_state, dt):
+        max_move = self.PADDLE_MAX_SPEED * dt
+        for player in ('player1', 'player2'):
+            paddle = game_state[f'paddle{player[-1]}_position']
+            target = game_state['paddle_targets'][player]
+
+            dx = target['x'] - paddle['x']
+            dy = target['y'] - paddle['y']
+            dz = target['z'] - paddle['z']
+            distance = math.sqrt(dx * dx + dy * dy + dz * dz)
+            if distance <= max_move:
+                paddle.update(target)
+            else:
+                scale = max_move / distance
+                paddle['x'] += dx * scale
+                paddle['y'] += dy * scale
+                paddle['z'] += dz * scale
+
+    def update_ball(self, game_state, dt):
+        if game_state['serve_in'] > 0:
+            game_state['serve_in'] = max(0, game_state['serve_in'] - dt)
+            return
+
+        ball = game_state['ball_position']
+        velocity = game_state['ball_velocity']
+
+        velocity['y'] += self.GRAVITY * dt
+        ball['x'] += velocity['x'] * dt
+        ball['y'] += velocity['y'] * dt
+        ball['z'] += velocity['z'] * dt
+
+        if ball['y'] < self.FLOOR_Y:
+            velocity['y'] *= -self.FLOOR_RESTITUTION
+            ball['y'] = self.FLOOR_Y
+
+    def check_collisions(self, game_state, dt):
+        if game_state['serve_in'] > 0:
+            return
+
+        ball = game_state['ball_position']
+        velocity = game_state['ball_velocity']
+
+        for player, direction in (('player1', 1), ('player2', -1)):
+            if game_state['last_hit'] != player and velocity['z'] * direction > 0:
+                paddle = game_state[f'paddle{player[-1]}_position']
+                if self.touches_paddle(ball, paddle):
+                    self.handle_paddle_hit(game_state, player, paddle)
+                    return
+
+        bottom = ball['y'] - self.BALL_RADIUS
+        if velocity['y'] < 0 and self.over_table(ball) and self.TABLE_TOP - self.TABLE_THICKNESS < bottom <= self.TABLE_TOP:
+            ball['y'] = self.TABLE_TOP + self.BALL_RADIUS
+            velocity['y'] = -velocity['y']
+            side = 'player1' if ball['z'] > 0 else 'player2'
+            game_state['bounces'][side] += 1
+            return
+
+        if (abs(ball['z']) <= self.NET_HALF_THICKNESS + self.BALL_RADIUS and
+            abs(ball['x']) <= self.TABLE_HALF_WIDTH and
+            self.NET_BOTTOM <= ball['y'] - self.BALL_RADIUS <= self.NET_TOP):
+
+            coming_from = -1 if velocity['z'] > 0 else 1
+            velocity['z'] = -velocity['z'] * 0.5
+            velocity['x'] += (random.random() - 0.5) * 0.2
+            velocity['y'] *= 0.9
+            ball['z'] = coming_from * (self.NET_HALF_THICKNESS + self.BALL_RADIUS)
+
+    def touches_paddle(self, ball, paddle):
+        return (
+            abs(ball['x'] - paddle['x']) <= self.PADDLE_HALF_WIDTH + self.BALL_RADIUS and
+            abs(ball['y'] - paddle['y']) <= self.PADDLE_HALF_HEIGHT + self.BALL_RADIUS and
+            abs(ball['z'] - paddle['z']) <= self.PADDLE_HALF_DEPTH + self.BALL_RADIUS
+        )
+
+    def over_table(self, ball):
+        return (
+            abs(ball['x']) <= self.TABLE_HALF_WIDTH and
+            abs(ball['z'] - self.TABLE_CENTER_Z) <= self.TABLE_HALF_DEPTH
+        )
+
+    def handle_paddle_hit(self, game_state, player, paddle):
+        ball = game_state['ball_position']
+
+        hit_direction = (ball['x'] - paddle['x'] + self.PADDLE_HALF_WIDTH) / (2 * self.PADDLE_HALF_WIDTH)
+        hit_height = (ball['y'] - paddle['y'] + self.PADDLE_HALF_HEIGHT) / (2 * self.PADDLE_HALF_HEIGHT)
+        hit_direction = max(0, min(1, hit_direction))
+        hit_height = max(0, min(1, hit_height))
+
+        direction = -1 if player == 'player1' else 1
+        lift = math.log(hit_height + 1)
+
+        game_state['ball_velocity'] = {
+            'x': -(hit_direction - 0.5) * 3,
+            'y': lift * 6 + 2,
+            'z': direction * (lift * 13 + 10)
+        }
+        game_state['last_hit'] = player
+        game_state['bounces'] = {'player1': 0, 'player2': 0}
+
+    def check_scoring(self, game_state, dt):
+        if game_state['serve_in'] > 0:
+            return
+
+        ball = game_state['ball_position']
+        bounces = game_state['bounces']
+        hitter = game_state['last_hit']
+        receiver = 'player2' if hitter == 'player1' else 'player1'
+
+        if bounces[hitter] >= 2:
+            self.award_point(game_state, receiver)
+        elif bounces[receiver] >= 2:
+            self.award_point(game_state, hitter)
+        elif (abs(ball['z'] - self.TABLE_CENTER_Z) > self.TABLE_HALF_DEPTH + self.OUT_MARGIN or
+              abs(ball['x']) > self.TABLE_HALF_WIDTH + self.OUT_MARGIN):
+            self.award_point(game_state, hitter if bounces[receiver] else receiver)
+
+    def award_point(self, game_state, scorer):
+        scores = game_state['scores']
+        scores[scorer] += 1
+
+        if max(scores.values()) >= self.POINTS_TO_WIN and abs(scores['player1'] - scores['player2']) >= 2:
+            game_state['rounds_won'][scorer] += 1
+            game_state['scores'] = {'player1': 0, 'player2': 0}
+
+            if game_state['rounds_won'][scorer] >= self.ROUNDS_TO_WIN:
+                game_state['winner'] = game_state[scorer]
+                game_state['final_score'] = dict(game_state['rounds_won'])
+                return
+
+        self.serve(game_state, scorer)
+
+    def serve(self, game_state, server):
+        # the point winner serves from their own end towards the opponent
+        direction = 1 if server == 'player1' else -1
+        game_state['ball_position'] = {'x': 0, 'y': self.SERVE_Y, 'z': self.SERVE_Z * direction}
+        game_state['ball_velocity'] = {'x': 0, 'y': self.SERVE_SPEED_Y, 'z': -self.SERVE_SPEED_Z * direction}
+        game_state['last_hit'] = server
+        game_state['bounces'] = {'player1': 0, 'player2': 0}
+        game_state['serve_in'] = self.SERVE_DELAY
@@ -0,0 +1,38 @@
+import random
+
+MASK = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+
+class MatchRandom:
+    # splitmix64 over a single integer kept in the game state, so snapshots and failover
+    # carry the generator along and the same seed + inputs always give the same match
+    key = 'rngState'
+    STATE_KEYS = ('seed', key)
+
+    def seed(self, game_state, seed=None):
+        if seed is None:
+            seed = random.getrandbits(64)
+        game_state['seed'] = seed & MASK
+        game_state[self.key] = seed & MASK
+
+    def state(self, game_state):
+        # generator position for snapshots. It never goes to clients, who could otherwise
+        # predict every spawn and bounce
+        return {key: game_state[key] for key in self.STATE_KEYS}
+
+    def next(self, game_state):
+        state = (game_state[self.key] + GOLDEN_GAMMA) & MASK
+        game_state[self.key] = state
+        z = ((state ^ (state >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK
+        return z ^ (z >> 31)
+
+    def random(self, game_state):
+        return (self.next(game_state) >> 11) * (1.0 / (1 << 53))
+
+    def uniform(self, game_state, a, b):
+        return a + (b - a) * self.random(game_state)
+
+    def choice(self, game_state, seq):
+        return seq[int(self.random(game_state) * len(seq))]
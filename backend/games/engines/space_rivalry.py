@@ -0,0 +1,550 @@
+import numpy as np
+from .entities import EntityPool
+from .rng import MatchRandom
+from .spatial import SpatialGrid
+
+
+class SpaceRivalryEngine:
+    GAME_WIDTH = 800
+    GAME_HEIGHT = 600
+    SHIP_WIDTH = 40
+    SHIP_HEIGHT = 30
+    LASER_WIDTH = 4
+    LASER_HEIGHT = 15
+    ASTEROID_SIZE = 30
+    DEBRIS_SIZE = 20
+    POWERUP_SIZE = 25
+    MOVEMENT_SPEED = 10
+
+    POWERUPS = {
+        'RAPID_FIRE': {'duration': 5000, 'color': 'yellow'},
+        'SHIELD': {'duration': 8000, 'color': 'cyan'},
+        'DOUBLE_BULLETS': {'duration': 6000, 'color': 'magenta'},
+        'SLOW_MOTION': {'duration': 4000, 'color': 'lime'}
+    }
+
+    ASTEROID_TYPES = {
+        'NORMAL': {'speed': 3, 'size': ASTEROID_SIZE, 'health': 1, 'points': 100},
+        'FAST': {'speed': 5, 'size': ASTEROID_SIZE * 0.7, 'health': 1, 'points': 150},
+        'SPLIT': {'speed': 2, 'size': ASTEROID_SIZE * 1.2, 'health': 1, 'points': 200},
+        'EXPLODING': {'speed': 2, 'size': ASTEROID_SIZE * 1.3, 'health': 1, 'points': 300}
+    }
+
+    PHASES = (
+        'update_lasers',
+        'update_asteroids',
+        'update_powerups',
+        'update_debris',
+        'update_explosions',
+        'check_all_collisions',
+        'update_spawns',
+        'check_game_over'
+    )
+
+    ASTEROID_KINDS = list(ASTEROID_TYPES)
+    POWERUP_KINDS = list(POWERUPS)
+
+    # every entity moves in a straight line from an anchor: y = y0 + vy * (tick - tick0)
+    MOTION_FIELDS = {
+        'id': np.int64, 'x': np.float64, 'y': np.float64,
+        'y0': np.float64, 'tick0': np.int64, 'vy': np.float64
+    }
+    LASER_FIELDS = MOTION_FIELDS
+    ASTEROID_FIELDS = {
+        **MOTION_FIELDS, 'speed': np.float64, 'size': np.float64,
+        'health': np.int64, 'points': np.int64, 'type': np.int8
+    }
+    DEBRIS_FIELDS = {**MOTION_FIELDS, 'target': np.int8}
+    POWERUP_FIELDS = {**MOTION_FIELDS, 'type': np.int8}
+    LASER_SPEED = -10
+    DEBRIS_SPEED = 3
+    POWERUP_SPEED = 2
+    ENTITY_KEYS = ('lasers1', 'lasers2', 'asteroids', 'debris', 'powerups')
+
+    FIXED_SIZES = {'debris': DEBRIS_SIZE, 'powerups': POWERUP_SIZE}
+    CELL_SIZE = 80
+    SCALAR_PAIRS = 128
+    BROADPHASE_PAIRS = 1000
+    SHIP_ROWS = np.full(2, GAME_HEIGHT - SHIP_HEIGHT, dtype=np.float64)
+    EXPLOSION_RADIUS = 100
+
+    def __init__(self, tick_ms=1000 / 60):
+        self.tick_ms = tick_ms
+        self.rng = MatchRandom()
+        self.grids = {
+            kind: SpatialGrid(self.GAME_WIDTH, self.GAME_HEIGHT, self.CELL_SIZE)
+            for kind in ('asteroids', 'debris', 'powerups')
+        }
+
+    def now(self, game_state):
+        # simulated milliseconds, so effects and cooldowns replay the same way
+        return game_state['tick'] * self.tick_ms
+
+    def initial_state(self, seed=None):
+        game_state = {
+            'gameStarted': False,
+            'gameOver': False,
+            'player1': None,
+            'player2': None,
+            'player1Pos': self.GAME_WIDTH / 4,
+            'player2Pos': 3 * self.GAME_WIDTH / 4,
+            'health1': 75,
+            'health2': 75,
+            'score1': 0,
+            'score2': 0,
+            'lasers1': EntityPool(self.LASER_FIELDS),
+            'lasers2': EntityPool(self.LASER_FIELDS),
+            'asteroids': EntityPool(self.ASTEROID_FIELDS),
+            'debris': EntityPool(self.DEBRIS_FIELDS),
+            'powerups': EntityPool(self.POWERUP_FIELDS),
+            'explosions': [],
+            'activeEffects1': {},
+            'activeEffects2': {},
+            'combo1': 0,
+            'combo2': 0,
+            'wave': 1,
+            'difficulty': 1,
+            'tick': 0,
+            'nextEntityId': 1,
+            'winner': None,
+            'forfeit': False
+        }
+        self.rng.seed(game_state, seed)
+        return game_state
+
+    def apply_input(self, game_state, player, input_type):
+        player_pos_key = f'player{player[-1]}Pos'
+
+        if input_type == 'left':
+            current_pos = game_state[player_pos_key]
+            min_pos = self.SHIP_WIDTH/2 if player == 'player1' else self.GAME_WIDTH/2 + self.SHIP_WIDTH/2
+            game_state[player_pos_key] = max(min_pos, current_pos - self.MOVEMENT_SPEED)
+
+        elif input_type == 'right':
+            current_pos = game_state[player_pos_key]
+            max_pos = self.GAME_WIDTH/2 - self.SHIP_WIDTH/2 if player == 'player1' else self.GAME_WIDTH - self.SHIP_WIDTH/2
+            game_state[player_pos_key] = min(max_pos, current_pos + self.MOVEMENT_SPEED)
+
+        elif input_type == 'shoot':
+            self.handle_shooting(player, game_state)
+
+    def handle_shooting(self, player, game_state):
+        player_num = int(player[-1])
+        current_time = self.now(game_state)
+        last_shot_key = f'lastShot{player_num}'
+
+        last_shot = game_state.get(last_shot_key)
+        if last_shot is None or current_time - last_shot >= self.get_shooting_cooldown(game_state, player_num):
+            player_pos = game_state[f'player{player_num}Pos']
+            lasers_key = f'lasers{player_num}'
+            effects = game_state[f'activeEffects{player_num}']
+
+            y = self.GAME_HEIGHT - self.SHIP_HEIGHT - 10
+            # fired between ticks, so the laser sits at y on the current tick
+            tick = game_state['tick']
+            if effects.get('DOUBLE_BULLETS', {}).get('active'):
+                self.spawn(game_state, lasers_key, player_pos - 10, y, self.LASER_SPEED, tick)
+                self.spawn(game_state, lasers_key, player_pos + 10, y, self.LASER_SPEED, tick)
+            else:
+                self.spawn(game_state, lasers_key, player_pos, y, self.LASER_SPEED, tick)
+
+            game_state[last_shot_key] = current_time
+
+    def get_shooting_cooldown(self, game_state, player_num):
+        effects = game_state[f'activeEffects{player_num}']
+        return 250 if effects.get('RAPID_FIRE', {}).get('active') else 500
+
+    def step(self, game_state, dt, probe=None):
+        for phase in self.PHASES:
+            getattr(self, phase)(game_state, dt)
+            if probe is not None:
+                probe(phase)
+        game_state['tick'] += 1
+
+    def move(self, game_state, pool):
+        # positions after this step, i.e. as of the next tick
+        y = pool['y']
+        y[:] = pool['y0'] + pool['vy'] * (game_state['tick'] + 1 - pool['tick0'])
+
+    def update_lasers(self, game_state, dt):
+        for player in [1, 2]:
+            lasers = game_state[f'lasers{player}']
+            lasers.keep(lasers['y'] > 0)
+            self.move(game_state, lasers)
+
+    def update_asteroids(self, game_state, dt):
+        slow_motion = any(
+            game_state[f'activeEffects{i}'].get('SLOW_MOTION', {}).get('active')
+            for i in [1, 2]
+        )
+        speed_multiplier = 0.5 if slow_motion else 1
+
+        asteroids = game_state['asteroids']
+        asteroids.keep(asteroids['y'] < self.GAME_HEIGHT + asteroids['size'])
+
+        velocity = asteroids['speed'] * speed_multiplier
+        changed = asteroids['vy'] != velocity
+        if changed.any():
+            # re-anchor where the velocity changed, which is what clients see as a correction
+            asteroids['y0'][changed] = asteroids['y'][changed]
+            asteroids['tick0'][changed] = game_state['tick']
+            asteroids['vy'][changed] = velocity[changed]
+        self.move(game_state, asteroids)
+
+    def update_powerups(self, game_state, dt):
+        current_time = self.now(game_state)
+
+        powerups = game_state['powerups']
+        powerups.keep(powerups['y'] < self.GAME_HEIGHT)
+        self.move(game_state, powerups)
+
+        for player in [1, 2]:
+            effects_key = f'activeEffects{player}'
+            for powerup_type, effect in game_state[effects_key].items():
+                if effect.get('active') and current_time >= effect.get('endsAt', 0):
+                    game_state[effects_key][powerup_type] = {'active': False}
+
+    def update_debris(self, game_state, dt):
+        debris = game_state['debris']
+        debris.keep(debris['y'] < self.GAME_HEIGHT)
+        self.move(game_state, debris)
+
+    def update_explosions(self, game_state, dt):
+        current_time = self.now(game_state)
+        game_state['explosions'] = [
+            explosion for explosion in game_state['explosions']
+            if current_time - explosion['created'] < 500
+        ]
+
+    def update_spawns(self, game_state, dt):
+        game_state['difficulty'] = min(game_state['difficulty'] + 0.1 * dt / 30, 10)
+
+        if self.rng.random(game_state) < 0.02 * game_state['difficulty']:
+            self.spawn_asteroid(game_state)
+
+    def check_all_collisions(self, game_state, dt):
+        removed = {}
+        for kind, grid in self.grids.items():
+            # grids are built on first use, most ticks only need the flat test
+            grid.clear()
+            removed[kind] = set()
+
+        self.check_laser_collisions(game_state, 1, removed)
+        self.check_laser_collisions(game_state, 2, removed)
+
+        self.check_ship_collisions(game_state, removed)
+
+        self.check_powerup_collisions(game_state, removed)
+
+        for kind, indices in removed.items():
+            if indices:
+                mask = np.ones(len(game_state[kind]), dtype=bool)
+                mask[list(indices)] = False
+                game_state[kind].keep(mask)
+
+    def half_extent(self, kind, pool):
+        if kind == 'asteroids':
+            return pool['size'] / 2
+        return self.FIXED_SIZES[kind] / 2
+
+    def refresh_grid(self, game_state, kind):
+        # pools only grow during the collision phase (splits, drops, debris)
+        pool = game_state[kind]
+        grid = self.grids[kind]
+        if len(grid) != len(pool):
+            grid.build(pool['x'], pool['y'], self.half_extent(kind, pool))
+        return grid
+
+    def overlaps(self, game_state, kind, x, y, w, h):
+        # columns each query box touches, in list order, or None when nothing touches at all
+        pool = game_state[kind]
+        pool_x, pool_y = pool['x'], pool['y']
+        size = pool['size'] if kind == 'asteroids' else self.FIXED_SIZES[kind]
+
+        pairs = len(pool) * len(x)
+        if pairs < self.SCALAR_PAIRS:
+            # a handful of entities, array call overhead would dominate
+            sizes = size.tolist() if kind == 'asteroids' else [size] * len(pool)
+            entities = list(zip(pool_x.tolist(), pool_y.tolist(), sizes))
+            hits = [
+                [
+                    column for column, (entity_x, entity_y, entity_size) in enumerate(entities)
+                    if abs(entity_x - box_x) * 2 < w + entity_size and abs(entity_y - box_y) * 2 < h + entity_size
+                ]
+                for box_x, box_y in zip(x.tolist(), y.tolist())
+            ]
+            return hits if any(hits) else None
+
+        if pairs < self.BROADPHASE_PAIRS:
+            # a flat vectorised test beats the grid bookkeeping on small fields. Most ticks
+            # nothing is level with anything, and the y band alone settles those
+            candidates = None
+            matrix = np.abs(pool_y - y[:, None]) * 2 < h + size
+            if not matrix.any():
+                return None
+        else:
+            candidates = np.flatnonzero(self.refresh_grid(game_state, kind).near(x, y, w, h))
+            if not candidates.size:
+                return None
+            pool_x, pool_y = pool_x[candidates], pool_y[candidates]
+            if kind == 'asteroids':
+                size = size[candidates]
+            matrix = np.abs(pool_y - y[:, None]) * 2 < h + size
+
+        matrix &= np.abs(pool_x - x[:, None]) * 2 < w + size
+        rows, columns = np.nonzero(matrix)
+        if candidates is not None:
+            columns = candidates[columns]
+
+        hits = [[] for _ in range(len(x))]
+        for row, column in zip(rows.tolist(), columns.tolist()):
+            hits[row].append(column)
+        return hits
+
+    def ship_hits(self, game_state, kind):
+        if not len(game_state[kind]):
+            return [[], []]
+
+        x = np.array([game_state['player1Pos'], game_state['player2Pos']], dtype=np.float64)
+        return self.overlaps(game_state, kind, x, self.SHIP_ROWS, self.SHIP_WIDTH, self.SHIP_HEIGHT) or [[], []]
+
+    def asteroid_at(self, game_state, index):
+        asteroids = game_state['asteroids']
+        return {
+            'x': float(asteroids['x'][index]),
+            'y': float(asteroids['y'][index]),
+            'type': self.ASTEROID_KINDS[asteroids['type'][index]],
+            'points': int(asteroids['points'][index])
+        }
+
+    def first_added_hit(self, game_state, start, removed, x, y):
+        asteroids = game_state['asteroids']
+        for index in range(start, len(asteroids)):
+            size = asteroids['size'][index]
+            if index not in removed['asteroids'] and self.check_collision(
+                x, y, self.LASER_WIDTH, self.LASER_HEIGHT,
+                asteroids['x'][index], asteroids['y'][index], size, size
+            ):
+                return index
+        return None
+
+    def check_laser_collisions(self, game_state, player_num, removed):
+        lasers = game_state[f'lasers{player_num}']
+        if not len(lasers) or not len(game_state['asteroids']):
+            return
+
+        hits = self.overlaps(
+            game_state, 'asteroids', lasers['x'], lasers['y'], self.LASER_WIDTH, self.LASER_HEIGHT
+        )
+        if hits is None:
+            return
+
+        indexed = len(game_state['asteroids'])
+        keep = np.ones(len(lasers), dtype=bool)
+
+        for index, (x, y) in enumerate(zip(*lasers.lists('x', 'y'))):
+            # list order decides which asteroid a laser hits first
+            hit = next((column for column in hits[index] if column not in removed['asteroids']), None)
+            if hit is None and len(game_state['asteroids']) > indexed:
+                hit = self.first_added_hit(game_state, indexed, removed, x, y)
+            if hit is None:
+                continue
+
+            keep[index] = False
+            asteroid = self.asteroid_at(game_state, hit)
+            removed['asteroids'].add(hit)
+
+            if asteroid['type'] == 'SPLIT':
+                self.split_asteroid(game_state, asteroid)
+            elif asteroid['type'] == 'EXPLODING':
+                self.create_explosion(game_state, asteroid)
+                self.damage_nearby_asteroids(game_state, asteroid, removed)
+
+            self.update_score(game_state, player_num, asteroid['points'])
+
+            if self.rng.random(game_state) < 0.2:
+                self.spawn_powerup(game_state, asteroid)
+
+            self.create_debris(game_state, asteroid, 3 - player_num)
+
+        lasers.keep(keep)
+
+    def check_ship_collisions(self, game_state, removed):
+        asteroid_hits = self.ship_hits(game_state, 'asteroids')
+        debris_hits = self.ship_hits(game_state, 'debris')
+        targets = game_state['debris']['target']
+
+        for player_num in [1, 2]:
+            if game_state[f'activeEffects{player_num}'].get('SHIELD', {}).get('active'):
+                continue
+
+            for index in asteroid_hits[player_num - 1]:
+                if index not in removed['asteroids']:
+                    game_state[f'health{player_num}'] = max(0, game_state[f'health{player_num}'] - 20)
+                    removed['asteroids'].add(index)
+
+            for index in debris_hits[player_num - 1]:
+                if targets[index] == player_num and index not in removed['debris']:
+                    game_state[f'health{player_num}'] = max(0, game_state[f'health{player_num}'] - 10)
+                    removed['debris'].add(index)
+
+    def check_powerup_collisions(self, game_state, removed):
+        current_time = self.now(game_state)
+        powerup_hits = self.ship_hits(game_state, 'powerups')
+        types = game_state['powerups']['type']
+
+        for player_num in [1, 2]:
+            for index in powerup_hits[player_num - 1]:
+                if index in removed['powerups']:
+                    continue
+
+                powerup_type = self.POWERUP_KINDS[types[index]]
+                # Activate power-up
+                effects_key = f'activeEffects{player_num}'
+                game_state[effects_key][powerup_type] = {
+                    'active': True,
+                    'endsAt': current_time + self.POWERUPS[powerup_type]['duration']
+                }
+                removed['powerups'].add(index)
+
+    def check_collision(self, x1, y1, w1, h1, x2, y2, w2, h2):
+        return (
+            abs(x1 - x2) * 2 < (w1 + w2) and
+            abs(y1 - y2) * 2 < (h1 + h2)
+        )
+
+    def update_score(self, game_state, player_num, points):
+        combo_key = f'combo{player_num}'
+        score_key = f'score{player_num}'
+
+        game_state[combo_key] += 1
+        combo_multiplier = 1 + game_state[combo_key] // 5
+        game_state[score_key] += points * combo_multiplier
+
+        game_state[f'lastHit{player_num}'] = self.now(game_state)
+
+    def spawn_asteroid(self, game_state):
+        asteroid_type = self.rng.choice(game_state, self.ASTEROID_KINDS)
+        self.add_asteroid(
+            game_state, asteroid_type,
+            self.rng.uniform(game_state, 0, self.GAME_WIDTH), -self.ASTEROID_TYPES[asteroid_type]['size']
+        )
+
+    def spawn(self, game_state, kind, x, y, velocity, tick=None, **values):
+        # entities spawned during a step are first seen on the next tick
+        entity_id = game_state['nextEntityId']
+        game_state['nextEntityId'] += 1
+        if tick is None:
+            tick = game_state['tick'] + 1
+        game_state[kind].add(id=entity_id, x=x, y=y, y0=y, tick0=tick, vy=velocity, **values)
+
+    def add_asteroid(self, game_state, asteroid_type, x, y):
+        properties = self.ASTEROID_TYPES[asteroid_type]
+        self.spawn(
+            game_state, 'asteroids', x, y, properties['speed'],
+            type=self.ASTEROID_KINDS.index(asteroid_type),
+            **properties
+        )
+
+    def split_asteroid(self, game_state, asteroid):
+        for offset in [-20, 20]:
+            self.add_asteroid(game_state, 'NORMAL', asteroid['x'] + offset, asteroid['y'])
+
+    def create_explosion(self, game_state, asteroid):
+        game_state['explosions'].append({
+            'x': asteroid['x'],
+            'y': asteroid['y'],
+            'created': self.now(game_state)
+        })
+
+    def damage_nearby_asteroids(self, game_state, exploding_asteroid, removed):
+        radius = self.EXPLOSION_RADIUS
+        x, y = exploding_asteroid['x'], exploding_asteroid['y']
+        asteroids = game_state['asteroids']
+
+        near = self.refresh_grid(game_state, 'asteroids').near(
+            np.array([x]), np.array([y]), radius * 2, radius * 2
+        )
+        candidates = np.flatnonzero(near)
+        dx = asteroids['x'][candidates] - x
+        dy = asteroids['y'][candidates] - y
+        removed['asteroids'].update(candidates[dx * dx + dy * dy < radius * radius].tolist())
+
+    def spawn_powerup(self, game_state, asteroid):
+        powerup_type = self.rng.choice(game_state, self.POWERUP_KINDS)
+        self.spawn(
+            game_state, 'powerups', asteroid['x'], asteroid['y'], self.POWERUP_SPEED,
+            type=self.POWERUP_KINDS.index(powerup_type)
+        )
+
+    def create_debris(self, game_state, asteroid, target_player):
+        self.spawn(game_state, 'debris', asteroid['x'], asteroid['y'], self.DEBRIS_SPEED, target=target_player)
+
+    def check_game_over(self, game_state, dt):
+        if game_state['health1'] <= 0 or game_state['health2'] <= 0:
+            game_state['gameOver'] = True
+            game_state['winner'] = game_state['player2'] if game_state['health1'] <= 0 else game_state['player1']
+
+    def to_wire(self, game_state):
+        # entities are keyed by id and carry their motion anchor instead of a live position, so
+        # they only show up in deltas when spawned, re-anchored or despawned. Clients place them
+        # at y + vy * (state tick - tick)
+        wire = {key: value for key, value in game_state.items() if key not in MatchRandom.STATE_KEYS}
+
+        for key in ('lasers1', 'lasers2'):
+            wire[key] = {
+                str(entity_id): {'x': x, 'y': y, 'vy': vy, 'tick': tick}
+                for entity_id, x, y, vy, tick in zip(*game_state[key].lists('id', 'x', 'y0', 'vy', 'tick0'))
+            }
+
+        wire['asteroids'] = {
+            str(entity_id): {
+                'x': x, 'y': y, 'vy': vy, 'tick': tick, 'type': self.ASTEROID_KINDS[kind],
+                'speed': speed, 'size': size, 'health': health, 'points': points
+            }
+            for entity_id, x, y, vy, tick, kind, speed, size, health, points in zip(*game_state['asteroids'].lists(
+                'id', 'x', 'y0', 'vy', 'tick0', 'type', 'speed', 'size', 'health', 'points'
+            ))
+        }
+        wire['debris'] = {
+            str(entity_id): {'x': x, 'y': y, 'vy': vy, 'tick': tick, 'targetPlayer': target}
+            for entity_id, x, y, vy, tick, target in zip(*game_state['debris'].lists(
+                'id', 'x', 'y0', 'vy', 'tick0', 'target'
+            ))
+        }
+        wire['powerups'] = {
+            str(entity_id): {
+                'x': x, 'y': y, 'vy': vy, 'tick': tick,
+                'type': self.POWERUP_KINDS[kind], **self.POWERUPS[self.POWERUP_KINDS[kind]]
+            }
+            for entity_id, x, y, vy, tick, kind in zip(*game_state['powerups'].lists(
+                'id', 'x', 'y0', 'vy', 'tick0', 'type'
+            ))
+        }
+        return wire
+
+    def to_snapshot(self, game_state):
+        return {**self.to_wire(game_state), **self.rng.state(game_state)}
+
+    def restore(self, game_state, state):
+        game_state.update({key: value for key, value in state.items() if key not in self.ENTITY_KEYS})
+
+        for key in self.ENTITY_KEYS:
+            pool = game_state[key]
+            pool.clear()
+            for entity_id, entity in state.get(key, {}).items():
+                values = {
+                    'id': int(entity_id),
+                    'x': entity['x'],
+                    'y0': entity['y'],
+                    'tick0': entity['tick'],
+                    'vy': entity['vy'],
+                    'y': entity['y'] + entity['vy'] * (game_state['tick'] - entity['tick'])
+                }
+                if key == 'asteroids':
+                    values.update(self.ASTEROID_TYPES[entity['type']], type=self.ASTEROID_KINDS.index(entity['type']))
+                elif key == 'debris':
+                    values['target'] = entity['targetPlayer']
+                elif key == 'powerups':
+                    values['type'] = self.POWERUP_KINDS.index(entity['type'])
+                pool.add(**values)
@@ -0,0 +1,51 @@
+import math
+import numpy as np
+
+
+class SpatialGrid:
+    # uniform broadphase over a fixed arena. Items are bucketed by the cell holding their
+    # centre and queries are widened by the largest half-extent, so building is a handful of
+    # array ops per tick. Positions off the arena clamp to the border cells.
+    def __init__(self, width, height, cell_size):
+        self.cell_size = cell_size
+        self.cols = math.ceil(width / cell_size)
+        self.rows = math.ceil(height / cell_size)
+        self.cells = np.empty(0, dtype=np.intp)
+        self.max_extent = 0
+
+    def __len__(self):
+        return len(self.cells)
+
+    def cell_coords(self, x, y):
+        cols = np.minimum(np.maximum((x // self.cell_size).astype(np.intp), 0), self.cols - 1)
+        rows = np.minimum(np.maximum((y // self.cell_size).astype(np.intp), 0), self.rows - 1)
+        return cols, rows
+
+    def clear(self):
+        self.cells = self.cells[:0]
+        self.max_extent = 0
+
+    def build(self, x, y, extent):
+        cols, rows = self.cell_coords(x, y)
+        self.cells = rows * self.cols + cols
+        self.max_extent = float(np.max(extent)) if len(x) else 0
+
+    def near(self, x, y, w, h):
+        # boolean mask over the built items sharing a cell with any of the query boxes
+        reach_x = w / 2 + self.max_extent
+        reach_y = h / 2 + self.max_extent
+        left, top = self.cell_coords(x - reach_x, y - reach_y)
+        right, bottom = self.cell_coords(x + reach_x, y + reach_y)
+
+        marked = np.zeros(self.cols * self.rows, dtype=bool)
+        if 2 * max(reach_x, reach_y) <= self.cell_size:
+            # each box spans at most two cells either way, so its corner cells cover it
+            for row in (top, bottom):
+                for col in (left, right):
+                    marked[row * self.cols + col] = True
+        else:
+            for first, last, row_from, row_to in zip(left.tolist(), right.tolist(), top.tolist(), bottom.tolist()):
+                for row in range(row_from, row_to + 1):
+                    marked[row * self.cols + first:row * self.cols + last + 1] = True
+
+        return marked[self.cells]
@@ -0,0 +1,202 @@
+import asyncio
+import time
+from channels.consumer import get_handler_name
+from channels.exceptions import ChannelFull
+from channels.layers import get_channel_layer
+from .utils import RedisClient
+
+
+class GroupFanout:
+    refresh_interval = 1
+    registry_ttl = 60
+
+    worker_channel = None
+    _local = {}
+    _remote = {}
+    _input_handlers = {}
+    _relay_task = None
+    _keepalive_task = None
+
+    @classmethod
+    def registry_key(cls, group):
+        return f'fanout:{group}'
+
+    @classmethod
+    async def ensure_relay(cls):
+        if cls._relay_task is not None and not cls._relay_task.done():
+            return
+
+        if cls.worker_channel is None:
+            channel = await get_channel_layer().new_channel('fanout.')
+            if cls.worker_channel is None:
+                cls.worker_channel = channel
+
+        if cls._relay_task is None or cls._relay_task.done():
+            cls._relay_task = asyncio.create_task(cls.relay_loop())
+        if cls._keepalive_task is None or cls._keepalive_task.done():
+            cls._keepalive_task = asyncio.create_task(cls.keepalive_loop())
+
+    @classmethod
+    async def relay_loop(cls):
+        channel_layer = get_channel_layer()
+        while True:
+            try:
+                message = await channel_layer.receive(cls.worker_channel)
+                if message['type'] == 'fanout.input':
+                    await cls.deliver_input(message['group'], message['player'], message['data'])
+                else:
+                    await cls.deliver_local(message['group'], message['event'])
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"Error in fanout relay: {e}")
+
+    @classmethod
+    async def keepalive_loop(cls):
+        # every worker re-scores its own entry, so a worker that died without leaving ages out
+        # of the group even while other workers keep it alive
+        while True:
+            await asyncio.sleep(cls.registry_ttl / 3)
+            cls.prune_remote()
+            for group in list(cls._local):
+                try:
+                    await cls.register(group)
+                except Exception as e:
+                    print(f"Error refreshing fanout registry for {group}: {e}")
+
+    @classmethod
+    async def join(cls, group, consumer):
+        members = cls._local.setdefault(group, set())
+        members.add(consumer)
+        if len(members) > 1:
+            return
+
+        await cls.ensure_relay()
+        try:
+            await cls.register(group)
+        except Exception as e:
+            print(f"Error registering fanout for {group}: {e}")
+
+    @classmethod
+    async def register(cls, group):
+        redis = RedisClient.get()
+        key = cls.registry_key(group)
+        now = time.time()
+        await redis.zadd(key, {cls.worker_channel: now})
+        await redis.zremrangebyscore(key, 0, now - cls.registry_ttl)
+        await redis.expire(key, cls.registry_ttl)
+
+    @classmethod
+    async def leave(cls, group, consumer):
+        members = cls._local.get(group)
+        if not members:
+            return
+
+        members.discard(consumer)
+        if members:
+            return
+
+        del cls._local[group]
+        cls._remote.pop(group, None)
+        try:
+            await RedisClient.get().zrem(cls.registry_key(group), cls.worker_channel)
+        except Exception as e:
+            print(f"Error unregistering fanout for {group}: {e}")
+
+    @classmethod
+    def local_count(cls, group):
+        return len(cls._local.get(group, ()))
+
+    @classmethod
+    def local_channels(cls):
+        return {consumer.channel_name for members in cls._local.values() for consumer in members}
+
+    @classmethod
+    async def has_members(cls, group):
+        return cls.local_count(group) > 0 or bool(await cls.remote_channels(group))
+
+    @classmethod
+    async def remote_channels(cls, group):
+        cached = cls._remote.get(group)
+        now = time.monotonic()
+        if cached and now - cached[1] < cls.refresh_interval:
+            return cached[0]
+
+        try:
+            members = await RedisClient.get().zrangebyscore(
+                cls.registry_key(group), time.time() - cls.registry_ttl, '+inf'
+            )
+            channels = [
+                member.decode() for member in members
+                if member.decode() != cls.worker_channel
+            ]
+        except Exception as e:
+            print(f"Error reading fanout members for {group}: {e}")
+            channels = []
+
+        # empty groups are cached too: spectator groups are probed every tick whether or not
+        # anyone watches. Stale entries are pruned by the keepalive loop
+        cls._remote[group] = (channels, now)
+        return channels
+
+    @classmethod
+    def prune_remote(cls):
+        cutoff = time.monotonic() - cls.refresh_interval
+        for group, (_, fetched_at) in list(cls._remote.items()):
+            if fetched_at < cutoff:
+                cls._remote.pop(group, None)
+
+    @classmethod
+    async def deliver_local(cls, group, event):
+        handler_name = get_handler_name(event)
+        for consumer in list(cls._local.get(group, ())):
+            try:
+                await getattr(consumer, handler_name)(event)
+            except Exception as e:
+                print(f"Error delivering {handler_name} to {group}: {e}")
+
+    @classmethod
+    def route_inputs(cls, group, handler):
+        if handler is None:
+            cls._input_handlers.pop(group, None)
+        else:
+            cls._input_handlers[group] = handler
+
+    @classmethod
+    async def deliver_input(cls, group, player, data):
+        handler = cls._input_handlers.get(group)
+        if handler is None:
+            return
+        try:
+            await handler(player, data)
+        except Exception as e:
+            print(f"Error applying forwarded input for {group}: {e}")
+
+    @classmethod
+    async def forward_input(cls, channel, group, player, data):
+        await get_channel_layer().send(channel, {
+            'type': 'fanout.input',
+            'group': group,
+            'player': player,
+            'data': data
+        })
+
+    @classmethod
+    async def send(cls, group, event):
+        await cls.deliver_local(group, event)
+
+        remote = await cls.remote_channels(group)
+        if not remote:
+            return
+
+        channel_layer = get_channel_layer()
+        message = {'type': 'fanout.relay', 'group': group, 'event': event}
+        for channel in list(remote):
+            try:
+                await channel_layer.send(channel, message)
+            except ChannelFull:
+                # nobody is draining it, stop relaying there until the next registry read
+                remote.remove(channel)
+                print(f"Error relaying {group} to {channel}: channel full")
+            except Exception as e:
+                print(f"Error relaying {group} to {channel}: {e}")
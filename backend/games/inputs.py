@@ -0,0 +1,35 @@
+from collections import deque
+
+
+def acknowledge_input(game_state, player, seq):
+    # clients replay their inputs newer than this on top of the server state
+    if isinstance(seq, int):
+        game_state[f'lastInputAck{player[-1]}'] = seq
+
+
+class InputQueueMixin:
+    input_queue_size = 8
+
+    pending_inputs = {}
+
+    def queue_input(self, player, data):
+        queues = self.pending_inputs.setdefault(self.match_key(), {})
+        if player not in queues:
+            queues[player] = deque(maxlen=self.input_queue_size)
+        queues[player].append(data)
+
+    def drain_inputs(self):
+        queues = self.pending_inputs.get(self.match_key())
+        if not queues:
+            return
+
+        game_state = self.shared_games[self.game_id]
+        for player, queue in queues.items():
+            while queue:
+                data = queue.popleft()
+                self.apply_queued_input(player, data)
+                acknowledge_input(game_state, player, data.get('seq'))
+
+    def drop_match(self):
+        super().drop_match()
+        self.pending_inputs.pop(self.match_key(), None)
@@ -0,0 +1,28 @@
+import time
+from channels_redis.core import RedisChannelLayer
+from .profiling import LatencyHistogram
+
+
+class InstrumentedRedisChannelLayer(RedisChannelLayer):
+    latency = {}
+
+    @classmethod
+    def observe(cls, operation, ns):
+        histogram = cls.latency.get(operation)
+        if histogram is None:
+            histogram = cls.latency[operation] = LatencyHistogram()
+        histogram.record(ns)
+
+    async def send(self, channel, message):
+        started = time.perf_counter_ns()
+        try:
+            return await super().send(channel, message)
+        finally:
+            self.observe('send', time.perf_counter_ns() - started)
+
+    async def group_send(self, group, message):
+        started = time.perf_counter_ns()
+        try:
+            return await super().group_send(group, message)
+        finally:
+            self.observe('group_send', time.perf_counter_ns() - started)
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import msgpack
+from django.conf import settings
+from .engines import ClassicPongEngine, SpaceRivalryEngine
+from .inputs import acknowledge_input
+from .scheduler import GameScheduler
+
+ENGINES = {
+    'classic-pong': ClassicPongEngine,
+    'space-rivalry': SpaceRivalryEngine,
+}
+
+
+def input_log_path(game_type, game_id):
+    return os.path.join(settings.GAME_REPLAY_DIR, f'{game_type}-{game_id}.inputs')
+
+
+def make_engine(game_type):
+    if game_type == 'space-rivalry':
+        return SpaceRivalryEngine(tick_ms=GameScheduler.physics_step * 1000)
+    return ENGINES[game_type]()
+
+
+def state_digest(wire_state):
+    encoded = json.dumps(wire_state, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def write_input_logs(pending):
+    for path, data in pending:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as log:
+            log.write(data)
+
+
+def read_input_log(path):
+    with open(path, 'rb') as log:
+        return msgpack.unpackb(log.read(), raw=False)
+
+
+class InputLog:
+    # every input the engine applied, keyed by the tick it was drained on. With the match seed
+    # that is enough to re-run the whole match
+    def __init__(self, game_type, game_id, state):
+        self.game_type = game_type
+        self.game_id = game_id
+        self.path = input_log_path(game_type, game_id)
+        self.seed = state['seed']
+        self.start_tick = state['tick']
+        self.inputs = []
+
+    def record(self, tick, player, input_type, seq=None, view_tick=None):
+        self.inputs.append((tick, player, input_type, seq, view_tick))
+
+    def finish(self, state, wire_state):
+        # forfeits and lost leases end the match outside the engine, so only the run itself can be checked
+        ended_in_engine = state['gameOver'] and not state['forfeit']
+        return msgpack.packb({
+            'game_type': self.game_type,
+            'game_id': self.game_id,
+            'seed': self.seed,
+            'start_tick': self.start_tick,
+            'players': [state['player1'], state['player2']],
+            'inputs': self.inputs,
+            'ticks': state['tick'],
+            'digest': state_digest(wire_state) if ended_in_engine else None
+        })
+
+
+def simulate(log):
+    engine = make_engine(log['game_type'])
+    game_state = engine.initial_state(seed=log['seed'])
+    game_state['player1'], game_state['player2'] = log['players']
+    game_state['gameStarted'] = True
+
+    inputs = iter(log['inputs'])
+    pending = next(inputs, None)
+    while game_state['tick'] < log['ticks'] and not game_state['gameOver']:
+        while pending is not None and pending[0] <= game_state['tick']:
+            _, player, input_type, seq, view_tick = pending
+            if view_tick is None:
+                engine.apply_input(game_state, player, input_type)
+            else:
+                engine.apply_input(game_state, player, input_type, view_tick)
+            acknowledge_input(game_state, player, seq)
+            pending = next(inputs, None)
+        engine.step(game_state, GameScheduler.physics_step)
+
+    wire_state = engine.to_wire(game_state) if hasattr(engine, 'to_wire') else game_state
+    return game_state, state_digest(wire_state)
@@ -0,0 +1,135 @@
+import random
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand
+from games.engines import ClassicPongEngine, SpaceRivalryEngine
+from games.scheduler import GameScheduler
+
+
+class Command(BaseCommand):
+    help = 'Step game engines headless with scripted inputs and report tick throughput, per-phase time and allocations'
+
+    ENGINES = {
+        'classic-pong': ClassicPongEngine,
+        'space-rivalry': SpaceRivalryEngine,
+    }
+
+    trace_overhead = (0, 0)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--game', choices=list(self.ENGINES) + ['all'], default='all')
+        parser.add_argument('--matches', type=int, default=100)
+        parser.add_argument('--ticks', type=int, default=600)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--allocations', action='store_true', help='Run an extra tracemalloc pass per phase')
+
+    def handle(self, *args, **options):
+        games = list(self.ENGINES) if options['game'] == 'all' else [options['game']]
+
+        for game_type in games:
+            random.seed(options['seed'])
+            timings, elapsed = self.run(game_type, options['matches'], options['ticks'], self.time_phase)
+            self.report_timings(game_type, options['matches'], options['ticks'], timings, elapsed)
+
+            if options['allocations']:
+                random.seed(options['seed'])
+                tracemalloc.start()
+                self.calibrate_tracing()
+                allocations, _ = self.run(game_type, options['matches'], options['ticks'], self.trace_phase)
+                tracemalloc.stop()
+                self.report_allocations(options['matches'] * options['ticks'], allocations)
+
+    def make_engine(self, game_type):
+        if game_type == 'space-rivalry':
+            return SpaceRivalryEngine(tick_ms=GameScheduler.physics_step * 1000)
+        return self.ENGINES[game_type]()
+
+    def new_match(self, engine):
+        game_state = engine.initial_state(seed=random.getrandbits(64))
+        game_state['player1'] = 'bot1'
+        game_state['player2'] = 'bot2'
+        game_state['gameStarted'] = True
+        return game_state
+
+    def scripted_input(self, engine, game_state, player):
+        if isinstance(engine, ClassicPongEngine):
+            paddle_y = game_state['paddle1Y' if player == 'player1' else 'paddle2Y']
+            target = game_state['ballY'] - engine.PADDLE_HEIGHT / 2
+            if random.random() < 0.1 or abs(target - paddle_y) < engine.PADDLE_SPEED:
+                return None
+            return 'down' if target > paddle_y else 'up'
+        return random.choice(('left', 'right', 'shoot', 'shoot', None))
+
+    def apply_inputs(self, engine, game_state, dt):
+        for player in ('player1', 'player2'):
+            input_type = self.scripted_input(engine, game_state, player)
+            if input_type:
+                engine.apply_input(game_state, player, input_type)
+
+    def run(self, game_type, match_count, ticks, measure):
+        engine = self.make_engine(game_type)
+        dt = GameScheduler.physics_step
+        matches = [self.new_match(engine) for _ in range(match_count)]
+
+        phases = [('inputs', lambda game_state, dt: self.apply_inputs(engine, game_state, dt))]
+        phases += [(name, getattr(engine, name)) for name in engine.PHASES]
+        results = {name: [0, 0] for name, _ in phases}
+
+        started = time.perf_counter()
+        for _ in range(ticks):
+            for index, game_state in enumerate(matches):
+                for name, phase in phases:
+                    measure(results[name], phase, game_state, dt)
+                game_state['tick'] += 1
+                if game_state['gameOver']:
+                    matches[index] = self.new_match(engine)
+        elapsed = time.perf_counter() - started
+
+        return results, elapsed
+
+    def time_phase(self, result, phase, game_state, dt):
+        started = time.perf_counter()
+        phase(game_state, dt)
+        result[0] += time.perf_counter() - started
+
+    def trace_phase(self, result, phase, game_state, dt):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        phase(game_state, dt)
+        after, peak = tracemalloc.get_traced_memory()
+        result[0] += after - before - self.trace_overhead[0]
+        result[1] += peak - before - self.trace_overhead[1]
+
+    def calibrate_tracing(self):
+        # the bookkeeping in trace_phase allocates a little on its own
+        self.trace_overhead = (0, 0)
+        overhead = [0, 0]
+        for _ in range(1000):
+            self.trace_phase(overhead, lambda game_state, dt: None, None, 0)
+        self.trace_overhead = (overhead[0] / 1000, overhead[1] / 1000)
+
+    def report_timings(self, game_type, match_count, ticks, timings, elapsed):
+        match_ticks = match_count * ticks
+        budget = GameScheduler.tick_interval
+        round_time = elapsed / ticks
+        phase_total = sum(result[0] for result in timings.values()) or 1
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{game_type}: {match_count} matches x {ticks} ticks'))
+        self.stdout.write(f'  {match_ticks / elapsed:,.0f} match-ticks/sec, {elapsed:.2f}s total')
+        self.stdout.write(f'  {round_time * 1000:.3f} ms per tick across all matches ({round_time / budget:.1%} of the {budget * 1000:.1f} ms budget)')
+        self.stdout.write(f'  ~{int(match_count * budget / round_time):,} matches fit in one tick')
+
+        for name, result in timings.items():
+            self.stdout.write(
+                f'    {name:<24} {result[0] / match_ticks * 1e6:8.2f} us/match-tick  {result[0] / phase_total:6.1%}'
+            )
+
+        style = self.style.SUCCESS if round_time < budget else self.style.ERROR
+        self.stdout.write(style('  within budget' if round_time < budget else '  over budget'))
+
+    def report_allocations(self, match_ticks, allocations):
+        self.stdout.write('  allocations (net / peak bytes per match-tick):')
+        for name, result in allocations.items():
+            self.stdout.write(
+                f'    {name:<24} {result[0] / match_ticks:10.1f} / {result[1] / match_ticks:10.1f}'
+            )
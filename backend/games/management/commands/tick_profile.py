@@ -0,0 +1,39 @@
+import redis
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from games.profiling import TickProfiler
+
+
+class Command(BaseCommand):
+    help = 'Show per-phase game tick timings (p50/p99/max) and overrun counts merged across workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--game', help='Only show one game type (or "scheduler")')
+
+    def handle(self, *args, **options):
+        client = redis.Redis.from_url(settings.GAMES_REDIS_URL)
+        keys = list(client.scan_iter(match=f'{TickProfiler.key_prefix}*'))
+        stats = TickProfiler.merge_snapshots(client.mget(keys) if keys else [])
+
+        if options['game']:
+            stats = {game_type: data for game_type, data in stats.items() if game_type == options['game']}
+
+        if not stats:
+            self.stdout.write(self.style.WARNING(
+                'No tick profiles published. Is TICK_PROFILING enabled on the game workers?'
+            ))
+            return
+
+        self.stdout.write(f'{len(keys)} worker(s) reporting')
+        for game_type, data in sorted(stats.items()):
+            overrun_rate = data.overruns / data.ticks if data.ticks else 0
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{game_type}: {data.ticks:,} sampled ticks, {data.overruns:,} over budget ({overrun_rate:.2%})'
+            ))
+            self.stdout.write(f'    {"phase":<24} {"samples":>9} {"p50 us":>9} {"p99 us":>9} {"max us":>9} {"mean us":>9}')
+            for phase, histogram in data.phases.items():
+                self.stdout.write(
+                    f'    {phase:<24} {histogram.count:>9,} '
+                    f'{histogram.percentile(50) / 1000:>9.1f} {histogram.percentile(99) / 1000:>9.1f} '
+                    f'{histogram.max / 1000:>9.1f} {histogram.mean() / 1000:>9.1f}'
+                )
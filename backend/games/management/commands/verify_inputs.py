@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from games.lockstep import read_input_log, simulate
+
+
+class Command(BaseCommand):
+    help = 'Re-run recorded matches from their seed and input log and check the final state is identical'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='.inputs files written next to the match replays')
+        parser.add_argument('--runs', type=int, default=2, help='Simulations per log, all must agree')
+
+    def handle(self, *args, **options):
+        failures = 0
+
+        for path in options['paths']:
+            log = read_input_log(path)
+            label = f"{log['game_type']} #{log['game_id']}"
+
+            if log['start_tick']:
+                self.stdout.write(self.style.WARNING(
+                    f"{label}: resumed at tick {log['start_tick']} after a failover, earlier inputs were not recorded here"
+                ))
+                continue
+
+            digests = set()
+            for _ in range(options['runs']):
+                game_state, digest = simulate(log)
+                digests.add(digest)
+
+            if len(digests) > 1:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f'{label}: runs diverged ({len(digests)} different final states)'))
+            elif log['digest'] is None:
+                self.stdout.write(self.style.WARNING(
+                    f"{label}: deterministic over {game_state['tick']} ticks, no recorded final state to compare (forfeit or lost lease)"
+                ))
+            elif log['digest'] != digest:
+                failures += 1
+                self.stdout.write(self.style.ERROR(
+                    f"{label}: final state differs from the live match after {game_state['tick']} ticks"
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{label}: identical final state after {game_state['tick']} ticks, "
+                    f"{len(log['inputs'])} inputs, score {game_state['score1']}-{game_state['score2']}"
+                ))
+
+        if failures:
+            raise CommandError(f'{failures} match(es) did not reproduce')
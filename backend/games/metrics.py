@@ -0,0 +1,131 @@
+from notifs.consumers import UserConnectionManager
+from .consumers.classic_pong_consumer import ClassicPongConsumer
+from .consumers.pong_consumer import PongConsumer
+from .consumers.space_rivalry_consumer import SpaceRivalryConsumer
+from .consumers.matchmaking_consumer import MatchmakingConsumer
+from .consumers.invite_consumer import InviteConsumer
+from .layers import InstrumentedRedisChannelLayer
+from .profiling import TickProfiler
+from .reaper import LifecycleReaper
+from .results import MatchResults
+from .scheduler import GameScheduler
+
+GAME_CONSUMERS = (ClassicPongConsumer, PongConsumer, SpaceRivalryConsumer)
+
+
+class ConnectionMetricsMiddleware:
+    open_connections = {}
+    opened_total = {}
+
+    def __init__(self, app):
+        self.app = app
+
+    def route(self, scope):
+        # ws/<route>/... maps one-to-one onto a consumer class
+        parts = scope.get('path', '').strip('/').split('/')
+        return parts[1] if len(parts) > 1 and parts[0] == 'ws' else 'unknown'
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'websocket':
+            return await self.app(scope, receive, send)
+
+        route = self.route(scope)
+        accepted = False
+
+        async def tracked_send(message):
+            nonlocal accepted
+            if message['type'] == 'websocket.accept' and not accepted:
+                accepted = True
+                self.open_connections[route] = self.open_connections.get(route, 0) + 1
+                self.opened_total[route] = self.opened_total.get(route, 0) + 1
+            await send(message)
+
+        try:
+            return await self.app(scope, receive, tracked_send)
+        finally:
+            if accepted:
+                self.open_connections[route] -= 1
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    return '{' + pairs + '}'
+
+
+def write_metric(lines, name, kind, help_text, samples):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+    for labels, value in samples:
+        lines.append(f'{name}{format_labels(labels)} {value}')
+
+
+def render_metrics():
+    lines = []
+
+    write_metric(lines, 'game_live_matches', 'gauge', 'Matches held in shared_games on this worker', [
+        ({'game_type': consumer.GAME_TYPE}, len(consumer.shared_games)) for consumer in GAME_CONSUMERS
+    ])
+    write_metric(lines, 'game_loops_running', 'gauge', 'Game loops registered on this worker', [
+        ({'game_type': consumer.GAME_TYPE}, len(consumer.game_loops)) for consumer in GAME_CONSUMERS
+    ])
+    write_metric(lines, 'game_scheduler_matches', 'gauge', 'Matches known to the tick scheduler', [
+        ({'state': 'registered'}, GameScheduler.registered_count()),
+        ({'state': 'stepping'}, GameScheduler.stepping_count()),
+    ])
+    write_metric(lines, 'game_scheduler_matches_by_mode', 'gauge', 'Scheduled matches per tick mode', [
+        ({'mode': mode}, count) for mode, count in GameScheduler.mode_counts().items()
+    ])
+
+    write_metric(lines, 'game_reaper_reclaimed_total', 'counter', 'Leaked loops, state, connection entries and abandoned matches reclaimed by the reaper', [
+        ({'kind': kind}, count) for kind, count in LifecycleReaper.reclaimed.items()
+    ])
+
+    write_metric(lines, 'game_results_persisted_total', 'counter', 'Match results written to the database by this worker', [
+        ({}, MatchResults.persisted)
+    ])
+    write_metric(lines, 'game_results_flush_failures_total', 'counter', 'Result flushes that failed and were retried', [
+        ({}, MatchResults.failures)
+    ])
+    write_metric(lines, 'game_results_unqueued', 'gauge', 'Results held in memory because the queue could not be reached', [
+        ({}, MatchResults.pending_count())
+    ])
+
+    write_metric(lines, 'websocket_connections', 'gauge', 'Open WebSocket connections per consumer route', [
+        ({'route': route}, count) for route, count in sorted(ConnectionMetricsMiddleware.open_connections.items())
+    ])
+    write_metric(lines, 'websocket_connections_opened_total', 'counter', 'Accepted WebSocket connections per consumer route', [
+        ({'route': route}, count) for route, count in sorted(ConnectionMetricsMiddleware.opened_total.items())
+    ])
+
+    write_metric(lines, 'matchmaking_queue_depth', 'gauge', 'Players waiting in matchmaking', [
+        ({'game_type': game_type}, len(queue)) for game_type, queue in sorted(MatchmakingConsumer.matchmaking_queues.items())
+    ])
+    write_metric(lines, 'pending_invites', 'gauge', 'Game invites waiting for a response', [
+        ({}, sum(len(invites) for invites in InviteConsumer.pending_invites.values()))
+    ])
+
+    connections = UserConnectionManager.get_all_connections()
+    write_metric(lines, 'online_users', 'gauge', 'Users with at least one notification socket', [
+        ({}, sum(1 for count in connections.values() if count > 0))
+    ])
+    write_metric(lines, 'notification_connections', 'gauge', 'Open notification sockets', [
+        ({}, sum(connections.values()))
+    ])
+
+    latency = []
+    for operation, histogram in sorted(InstrumentedRedisChannelLayer.latency.items()):
+        for quantile in (0.5, 0.99):
+            latency.append(({'operation': operation, 'quantile': quantile}, histogram.percentile(quantile * 100) / 1e9))
+    write_metric(lines, 'channel_layer_send_seconds', 'summary', 'Channel layer send latency', latency)
+    for operation, histogram in sorted(InstrumentedRedisChannelLayer.latency.items()):
+        labels = format_labels({'operation': operation})
+        lines.append(f'channel_layer_send_seconds_sum{labels} {histogram.total / 1e9}')
+        lines.append(f'channel_layer_send_seconds_count{labels} {histogram.count}')
+
+    write_metric(lines, 'game_tick_overruns_total', 'counter', 'Profiled ticks that ran past the tick budget', [
+        ({'game_type': game_type}, stats.overruns) for game_type, stats in sorted(TickProfiler.stats.items())
+    ])
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,133 @@
+import time
+from .fanout import GroupFanout
+from .reaper import LifecycleReaper
+from .results import MatchResults
+from .scheduler import GameScheduler
+from .store import GameStore
+
+
+class MatchOwnershipMixin:
+    lease_ttl = 10
+    snapshot_interval = 1
+    owner_refresh = 1
+
+    last_snapshots = {}
+
+    match_owner = None
+    owner_checked_at = 0
+
+    def match_key(self):
+        return f'{self.GAME_TYPE}:{self.game_id}'
+
+    def owns_match(self):
+        return self.game_id in self.shared_games
+
+    def tick_mode(self):
+        if self.is_game_running():
+            if self.game_id in self.disconnection_cleanup_tasks:
+                return 'disconnected'
+            return 'live'
+        return 'dormant' if self.is_game_waiting() else 'idle'
+
+    def wake_match(self):
+        if self.game_id in self.game_loops:
+            self.game_loops[self.game_id].wake()
+
+    def wire_state(self):
+        # plain dict form of the live state, for snapshots, replays and broadcasts
+        return self.shared_games[self.game_id]
+
+    def snapshot_state(self):
+        # what failover needs to resume the match, a superset of what clients see
+        return self.wire_state()
+
+    def restore_state(self, state):
+        self.shared_games[self.game_id].update(state)
+
+    async def claim_match(self, create=False):
+        if self.owns_match():
+            return True
+
+        key = self.match_key()
+        store = GameStore.get()
+        worker = GroupFanout.worker_channel
+
+        self.match_owner = await store.acquire(key, worker, self.lease_ttl)
+        self.owner_checked_at = time.monotonic()
+        if self.match_owner != worker:
+            return False
+
+        state = await store.load(key)
+        if self.owns_match():
+            return True
+
+        if state is None and not create:
+            await store.release(key, worker)
+            self.match_owner = None
+            return False
+
+        self.initialize_game_state()
+        if state is not None:
+            self.restore_state(state)
+
+        self.game_loops[self.game_id] = GameScheduler.register(
+            (self.GAME_TYPE, self.game_id),
+            self.game_tick,
+            self.tick_mode,
+            # the next claim restores the last snapshot instead of leaving a dead loop behind
+            on_failure=self.drop_match
+        )
+        GroupFanout.route_inputs(self.room_group_name, self.apply_message)
+        self.last_snapshots[key] = time.monotonic()
+        LifecycleReaper.watch(type(self))
+        # picks up results queued before a restart
+        MatchResults.start_flusher()
+        return True
+
+    async def submit(self, player, data):
+        if not self.owns_match() and time.monotonic() - self.owner_checked_at >= self.owner_refresh:
+            await self.claim_match()
+
+        if self.owns_match():
+            await self.apply_message(player, data)
+        elif self.match_owner:
+            await GroupFanout.forward_input(self.match_owner, self.room_group_name, player, data)
+
+    async def keep_match_alive(self):
+        key = self.match_key()
+        now = time.monotonic()
+        if now - self.last_snapshots.get(key, 0) < self.snapshot_interval:
+            return True
+        self.last_snapshots[key] = now
+
+        store = GameStore.get()
+        try:
+            if await store.renew(key, GroupFanout.worker_channel, self.lease_ttl):
+                await store.save(key, self.snapshot_state())
+                return True
+        except Exception as e:
+            print(f"Error persisting game {key}: {e}")
+            return True
+
+        print(f"Lost ownership of game {key}")
+        self.drop_match()
+        return False
+
+    def drop_match(self):
+        if self.game_id in self.game_loops:
+            self.game_loops.pop(self.game_id).cancel()
+        self.shared_games.pop(self.game_id, None)
+        self.state_encoders.pop(self.game_id, None)
+        self.last_snapshots.pop(self.match_key(), None)
+        GroupFanout.route_inputs(self.room_group_name, None)
+
+    async def release_match(self):
+        key = self.match_key()
+        self.drop_match()
+
+        store = GameStore.get()
+        try:
+            await store.release(key, GroupFanout.worker_channel)
+            await store.delete(key)
+        except Exception as e:
+            print(f"Error releasing game {key}: {e}")
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import os
+import socket
+import time
+from django.conf import settings
+from .utils import RedisClient
+
+
+class LatencyHistogram:
+    # log-linear buckets: 8 per power of two, so any reading is within 12.5% of its bucket
+    SUB_BITS = 3
+    SUB_BUCKETS = 1 << SUB_BITS
+    BUCKETS = 320
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @classmethod
+    def bucket(cls, ns):
+        if ns < 2 * cls.SUB_BUCKETS:
+            return max(ns, 0)
+        shift = ns.bit_length() - cls.SUB_BITS - 1
+        return min((shift << cls.SUB_BITS) + (ns >> shift), cls.BUCKETS - 1)
+
+    @classmethod
+    def bucket_floor(cls, index):
+        if index < 2 * cls.SUB_BUCKETS:
+            return index
+        shift = index // cls.SUB_BUCKETS - 1
+        return (cls.SUB_BUCKETS + index % cls.SUB_BUCKETS) << shift
+
+    def record(self, ns):
+        self.counts[self.bucket(ns)] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent):
+        if not self.count:
+            return 0
+
+        target = self.count * percent / 100
+        running = 0
+        for index, count in enumerate(self.counts):
+            running += count
+            if running >= target:
+                return min(self.bucket_floor(index + 1), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def to_dict(self):
+        return {
+            'counts': {index: count for index, count in enumerate(self.counts) if count},
+            'count': self.count,
+            'total': self.total,
+            'max': self.max
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        for index, count in data['counts'].items():
+            histogram.counts[int(index)] = count
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.max = data['max']
+        return histogram
+
+
+class TickStats:
+    def __init__(self, sample_every=1):
+        self.sample_every = sample_every
+        self.seen = 0
+        self.phases = {}
+        self.ticks = 0
+        self.overruns = 0
+
+    def sample(self):
+        self.seen += 1
+        return self.seen % self.sample_every == 0
+
+    def record(self, phase, ns):
+        histogram = self.phases.get(phase)
+        if histogram is None:
+            histogram = self.phases[phase] = LatencyHistogram()
+        histogram.record(ns)
+
+    def finish(self, ns, budget_ns):
+        self.ticks += 1
+        if ns > budget_ns:
+            self.overruns += 1
+        self.record('total', ns)
+
+    def merge(self, other):
+        self.ticks += other.ticks
+        self.overruns += other.overruns
+        for phase, histogram in other.phases.items():
+            self.phases.setdefault(phase, LatencyHistogram()).merge(histogram)
+
+    def to_dict(self):
+        return {
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'phases': {phase: histogram.to_dict() for phase, histogram in self.phases.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.ticks = data['ticks']
+        stats.overruns = data['overruns']
+        stats.phases = {
+            phase: LatencyHistogram.from_dict(histogram) for phase, histogram in data['phases'].items()
+        }
+        return stats
+
+
+class TickTimer:
+    __slots__ = ('stats', 'budget_ns', 'started', 'last')
+
+    def __init__(self, stats, budget):
+        self.stats = stats
+        self.budget_ns = budget * 1e9
+        self.started = self.last = time.perf_counter_ns()
+
+    def mark(self, phase):
+        now = time.perf_counter_ns()
+        self.stats.record(phase, now - self.last)
+        self.last = now
+
+    def finish(self):
+        self.stats.finish(time.perf_counter_ns() - self.started, self.budget_ns)
+
+
+class NullTimer:
+    def mark(self, phase):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class TickProfiler:
+    publish_interval = 10
+    key_prefix = 'tick_profile:'
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+
+    stats = {}
+    publisher = None
+
+    @classmethod
+    def timer(cls, game_type, budget, sample_every=None):
+        if not settings.TICK_PROFILING:
+            return NULL_TIMER
+
+        stats = cls.stats.get(game_type)
+        if stats is None:
+            stats = cls.stats[game_type] = TickStats(sample_every or settings.TICK_PROFILING_SAMPLE)
+            cls.start_publisher()
+
+        # match ticks are sampled to keep the cost well under 1% of the loop
+        if not stats.sample():
+            return NULL_TIMER
+        return TickTimer(stats, budget)
+
+    @classmethod
+    def start_publisher(cls):
+        if cls.publisher is None or cls.publisher.done():
+            cls.publisher = asyncio.create_task(cls.publish_loop())
+
+    @classmethod
+    async def publish_loop(cls):
+        while cls.stats:
+            await asyncio.sleep(cls.publish_interval)
+            await cls.publish()
+
+    @classmethod
+    async def publish(cls):
+        snapshot = {game_type: stats.to_dict() for game_type, stats in cls.stats.items()}
+        try:
+            await RedisClient.get().set(
+                f'{cls.key_prefix}{cls.worker}', json.dumps(snapshot), ex=cls.publish_interval * 6
+            )
+        except Exception as e:
+            print(f"Error publishing tick profile: {e}")
+
+    @classmethod
+    def merge_snapshots(cls, snapshots):
+        merged = {}
+        for snapshot in snapshots:
+            if not snapshot:
+                continue
+            for game_type, data in json.loads(snapshot).items():
+                merged.setdefault(game_type, TickStats()).merge(TickStats.from_dict(data))
+        return merged
+
+    @classmethod
+    async def collect(cls):
+        client = RedisClient.get()
+        keys = [key async for key in client.scan_iter(match=f'{cls.key_prefix}*')]
+        return cls.merge_snapshots(await client.mget(keys) if keys else [])
@@ -0,0 +1,66 @@
+import json
+import msgpack
+
+MSGPACK_SUBPROTOCOL = 'trandadan.msgpack'
+
+
+def encode_json(payload):
+    return json.dumps(payload)
+
+
+def encode_msgpack(payload):
+    return msgpack.packb(payload)
+
+
+class GameProtocolMixin:
+    binary_protocol = False
+    binary_subscribers = {}
+
+    def negotiate_protocol(self):
+        self.binary_protocol = MSGPACK_SUBPROTOCOL in self.scope.get('subprotocols', [])
+        if not self.binary_protocol:
+            return None
+
+        group = self.room_group_name
+        self.binary_subscribers[group] = self.binary_subscribers.get(group, 0) + 1
+        return MSGPACK_SUBPROTOCOL
+
+    def release_protocol(self):
+        if not self.binary_protocol:
+            return
+
+        self.binary_protocol = False
+        group = self.room_group_name
+        remaining = self.binary_subscribers.get(group, 0) - 1
+        if remaining > 0:
+            self.binary_subscribers[group] = remaining
+        else:
+            self.binary_subscribers.pop(group, None)
+
+    def encode_frame(self, payload, group=None):
+        frame = {'text': encode_json(payload)}
+        if self.binary_subscribers.get(group or self.room_group_name):
+            frame['bytes'] = encode_msgpack(payload)
+        return frame
+
+    def decode_message(self, text_data=None, bytes_data=None):
+        if bytes_data is not None:
+            return msgpack.unpackb(bytes_data)
+        return json.loads(text_data)
+
+    async def send_message(self, payload):
+        if self.binary_protocol:
+            await self.send(bytes_data=encode_msgpack(payload))
+        else:
+            await self.send(text_data=encode_json(payload))
+
+    async def send_frame(self, frame):
+        if not self.binary_protocol:
+            await self.send(text_data=frame['text'])
+            return
+
+        data = frame.get('bytes')
+        if data is None:
+            # binary subscribers are counted per worker, so a frame from another worker may lack bytes
+            data = encode_msgpack(json.loads(frame['text']))
+        await self.send(bytes_data=data)
@@ -0,0 +1,157 @@
+import asyncio
+import time
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from .fanout import GroupFanout
+from .models import Match
+from .scheduler import GameScheduler
+from .store import GameStore
+
+
+class LifecycleReaper:
+    consumers = set()
+    orphaned_since = {}
+    reclaimed = {
+        'loops': 0,
+        'states': 0,
+        'connection_timestamps': 0,
+        'active_connections': 0,
+        'cleanup_tasks': 0,
+        'matches': 0,
+    }
+    task = None
+
+    @classmethod
+    def watch(cls, consumer_class):
+        cls.consumers.add(consumer_class)
+        if cls.task is None or cls.task.done():
+            cls.task = asyncio.create_task(cls.run())
+
+    @classmethod
+    async def run(cls):
+        while True:
+            await asyncio.sleep(settings.GAME_REAPER_INTERVAL)
+            try:
+                await cls.reap()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in lifecycle reaper: {e}")
+
+    @classmethod
+    async def reap(cls):
+        now = time.monotonic()
+        orphans = set()
+
+        cls.reap_cleanup_tasks()
+        await cls.reap_loops(now, orphans)
+        cls.reap_states(now, orphans)
+        # only keys still orphaned on this pass keep their clock running
+        cls.orphaned_since = {key: cls.orphaned_since[key] for key in orphans if key in cls.orphaned_since}
+
+        cls.reap_connections()
+        await cls.reap_matches()
+
+    @classmethod
+    def expired(cls, key, now, orphans):
+        since = cls.orphaned_since.setdefault(key, now)
+        if now - since >= settings.GAME_ORPHAN_TTL:
+            return True
+        orphans.add(key)
+        return False
+
+    @classmethod
+    def reap_cleanup_tasks(cls):
+        # finished grace timers are never popped by the consumers and would read as still pending
+        for consumer_class in cls.consumers:
+            tasks = consumer_class.disconnection_cleanup_tasks
+            for game_id, task in list(tasks.items()):
+                if task.done():
+                    tasks.pop(game_id, None)
+                    cls.reclaimed['cleanup_tasks'] += 1
+
+    @classmethod
+    async def reap_loops(cls, now, orphans):
+        # a loop nobody is connected to (anywhere) and with no reconnect grace pending
+        for match in GameScheduler.matches():
+            consumer = getattr(match.step, '__self__', None)
+            if consumer is None or consumer.game_id in consumer.disconnection_cleanup_tasks:
+                continue
+            if await GroupFanout.has_members(consumer.room_group_name):
+                continue
+
+            if cls.expired(('loop',) + match.key, now, orphans):
+                await consumer.release_match()
+                cls.reclaimed['loops'] += 1
+
+    @classmethod
+    def reap_states(cls, now, orphans):
+        for consumer_class in cls.consumers:
+            for game_id, loop in list(consumer_class.game_loops.items()):
+                if loop.cancelled:
+                    consumer_class.game_loops.pop(game_id, None)
+
+            # state with no loop driving it, left behind by a claim that failed halfway
+            for game_id in list(consumer_class.shared_games):
+                if game_id in consumer_class.game_loops:
+                    continue
+                if cls.expired(('state', consumer_class.GAME_TYPE, game_id), now, orphans):
+                    consumer_class.shared_games.pop(game_id, None)
+                    consumer_class.state_encoders.pop(game_id, None)
+                    cls.reclaimed['states'] += 1
+
+    @classmethod
+    def reap_connections(cls):
+        live = GroupFanout.local_channels()
+        cutoff = time.time() - settings.GAME_CONNECTION_TTL
+
+        for consumer_class in cls.consumers:
+            timestamps = consumer_class.connection_timestamps
+            for channel, connected_at in list(timestamps.items()):
+                if connected_at < cutoff and channel not in live:
+                    timestamps.pop(channel, None)
+                    cls.reclaimed['connection_timestamps'] += 1
+
+            counts = consumer_class.active_connections
+            for game_id, count in list(counts.items()):
+                if count <= 0 and game_id not in consumer_class.shared_games:
+                    counts.pop(game_id, None)
+                    cls.reclaimed['active_connections'] += 1
+
+    @classmethod
+    async def reap_matches(cls):
+        store = GameStore.get()
+        after = 0
+        while True:
+            candidates = await database_sync_to_async(cls.abandoned_candidates)(after)
+            if not candidates:
+                return
+            after = candidates[-1][0]
+
+            abandoned = []
+            for match_id, game_type in candidates:
+                # a live lease means some worker is still running it
+                if await store.owner(f'{game_type}:{match_id}') is None:
+                    abandoned.append(match_id)
+
+            if abandoned:
+                cls.reclaimed['matches'] += await database_sync_to_async(cls.mark_abandoned)(abandoned)
+            if len(candidates) < settings.GAME_REAPER_BATCH:
+                return
+
+    @classmethod
+    def abandoned_candidates(cls, after):
+        cutoff = timezone.now() - timezone.timedelta(seconds=settings.GAME_ABANDON_TTL)
+        return list(
+            Match.objects.filter(status='ongoing', started_at__lt=cutoff, id__gt=after)
+            .order_by('id')
+            .values_list('id', 'game_type')[:settings.GAME_REAPER_BATCH]
+        )
+
+    @classmethod
+    def mark_abandoned(cls, match_ids):
+        return Match.objects.filter(id__in=match_ids, status='ongoing').update(
+            status='abandoned',
+            ended_at=timezone.now()
+        )
@@ -0,0 +1,193 @@
+import asyncio
+import os
+import struct
+import zlib
+from collections import deque
+import msgpack
+from django.conf import settings
+from .delta import DeltaEncoder
+from .lockstep import ENGINES, InputLog, write_input_logs
+
+# file layout: MAGIC, then blocks of <u32 big-endian length><zlib(msgpack frame, msgpack frame, ...)>
+MAGIC = b'TDRP\x01'
+BLOCK_HEADER = struct.Struct('>I')
+CHUNK_SIZE = 64 * 1024
+
+
+def replay_path(game_type, game_id):
+    return os.path.join(settings.GAME_REPLAY_DIR, f'{game_type}-{game_id}.replay')
+
+
+def write_blocks(pending):
+    for path, frames in pending:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = zlib.compress(b''.join(frames))
+        with open(path, 'ab') as replay:
+            if replay.tell() == 0:
+                replay.write(MAGIC)
+            replay.write(BLOCK_HEADER.pack(len(data)) + data)
+
+
+def read_frames(path):
+    with open(path, 'rb') as replay:
+        if replay.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a replay file")
+
+        while True:
+            header = replay.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                return
+            (length,) = BLOCK_HEADER.unpack(header)
+            unpacker = msgpack.Unpacker(raw=False)
+            unpacker.feed(zlib.decompress(replay.read(length)))
+            yield from unpacker
+
+
+def stream_file(path, chunk_size=CHUNK_SIZE):
+    with open(path, 'rb') as replay:
+        while chunk := replay.read(chunk_size):
+            yield chunk
+
+
+class ReplayRecorder:
+    keyframe_interval = 300
+
+    def __init__(self, path, buffer_size):
+        self.path = path
+        self.encoder = DeltaEncoder(self.keyframe_interval)
+        self.buffer = deque()
+        self.buffer_size = buffer_size
+        self.dropped = 0
+
+    def record(self, state):
+        if len(self.buffer) >= self.buffer_size:
+            # deltas are useless without the keyframe they chain from, so evict up to the
+            # next keyframe. With none left the chain restarts from a fresh one
+            self.buffer.popleft()
+            self.dropped += 1
+            while self.buffer and not self.buffer[0][0]:
+                self.buffer.popleft()
+                self.dropped += 1
+            if not self.buffer:
+                self.encoder.baseline = None
+
+        frame = self.encoder.encode(state)
+        if frame is not None:
+            # pack now: the live state keeps mutating until the flusher gets to it
+            self.buffer.append((frame['type'] == 'game_state', msgpack.packb(frame)))
+
+    def drain(self):
+        frames = [packed for _, packed in self.buffer]
+        self.buffer.clear()
+        return frames
+
+
+class Replays:
+    flush_interval = 1
+
+    recorders = {}
+    closed = []
+    input_logs = {}
+    finished_logs = []
+    flusher = None
+
+    @classmethod
+    def enabled(cls):
+        return settings.GAME_REPLAYS_ENABLED
+
+    @classmethod
+    def record(cls, game_type, game_id, state):
+        key = (game_type, game_id)
+        recorder = cls.recorders.get(key)
+        if recorder is None:
+            recorder = cls.recorders[key] = ReplayRecorder(
+                replay_path(game_type, game_id), settings.GAME_REPLAY_BUFFER
+            )
+            cls.start_flusher()
+        recorder.record(state)
+
+    @classmethod
+    def open_input_log(cls, game_type, game_id, state):
+        key = (game_type, game_id)
+        if game_type in ENGINES and key not in cls.input_logs:
+            cls.input_logs[key] = InputLog(game_type, game_id, state)
+
+    @classmethod
+    def record_input(cls, game_type, game_id, tick, player, input_type, seq=None, view_tick=None):
+        log = cls.input_logs.get((game_type, game_id))
+        if log is not None:
+            log.record(tick, player, input_type, seq, view_tick)
+
+    @classmethod
+    def close_input_log(cls, game_type, game_id, state, wire_state):
+        log = cls.input_logs.pop((game_type, game_id), None)
+        if log is not None:
+            cls.finished_logs.append((log.path, log.finish(state, wire_state)))
+            cls.start_flusher()
+
+    @classmethod
+    def close(cls, game_type, game_id):
+        recorder = cls.recorders.pop((game_type, game_id), None)
+        if recorder is None:
+            return
+
+        if recorder.dropped:
+            print(f"Replay {recorder.path} dropped {recorder.dropped} frames")
+        frames = recorder.drain()
+        if frames:
+            cls.closed.append((recorder.path, frames))
+            cls.start_flusher()
+
+    @classmethod
+    def start_flusher(cls):
+        if cls.flusher is None or cls.flusher.done():
+            cls.flusher = asyncio.create_task(cls.flush_loop())
+
+    @classmethod
+    async def flush_loop(cls):
+        while cls.recorders or cls.closed or cls.finished_logs:
+            await asyncio.sleep(cls.flush_interval)
+            await cls.flush()
+
+    @classmethod
+    async def flush(cls):
+        pending, cls.closed = cls.closed, []
+        for recorder in cls.recorders.values():
+            frames = recorder.drain()
+            if frames:
+                pending.append((recorder.path, frames))
+
+        logs, cls.finished_logs = cls.finished_logs, []
+
+        try:
+            if pending:
+                await asyncio.to_thread(write_blocks, pending)
+            if logs:
+                await asyncio.to_thread(write_input_logs, logs)
+        except Exception as e:
+            print(f"Error writing replays: {e}")
+
+
+class ReplayRecordingMixin:
+    async def claim_match(self, create=False):
+        claimed = await super().claim_match(create)
+        if claimed and Replays.enabled():
+            Replays.open_input_log(self.GAME_TYPE, self.game_id, self.shared_games[self.game_id])
+        return claimed
+
+    def record_replay(self):
+        if Replays.enabled() and self.game_id in self.shared_games:
+            Replays.record(self.GAME_TYPE, self.game_id, self.wire_state())
+
+    def record_input(self, player, input_type, seq=None, view_tick=None):
+        if Replays.enabled():
+            tick = self.shared_games[self.game_id]['tick']
+            Replays.record_input(self.GAME_TYPE, self.game_id, tick, player, input_type, seq, view_tick)
+
+    def drop_match(self):
+        if Replays.enabled() and self.game_id in self.shared_games:
+            Replays.close_input_log(
+                self.GAME_TYPE, self.game_id, self.shared_games[self.game_id], self.wire_state()
+            )
+        super().drop_match()
+        Replays.close(self.GAME_TYPE, self.game_id)
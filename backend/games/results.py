@@ -0,0 +1,148 @@
+import asyncio
+import uuid
+import msgpack
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Match
+from .utils import RedisClient, XPManager
+
+
+def apply_results(results):
+    # one transaction per batch. Rows already completed are skipped so a batch that is
+    # retried after a partial failure never awards XP twice
+    with transaction.atomic():
+        matches = Match.objects.select_for_update().in_bulk({result['match_id'] for result in results})
+        winners = get_user_model().objects.select_for_update().in_bulk(
+            {result['winner'] for result in results}, field_name='username'
+        )
+
+        completed = {}
+        awarded = {}
+        for result in results:
+            match = matches.get(result['match_id'])
+            winner = winners.get(result['winner'])
+            if match is None or winner is None:
+                print(f"Error persisting result for match {result['match_id']}: match or winner {result['winner']} not found")
+                continue
+            if match.status == 'completed':
+                continue
+
+            XPManager(winner).add_xp(result['xp'])
+            awarded[winner.pk] = winner
+
+            match.winner = winner
+            match.score_player1 = result['score1']
+            match.score_player2 = result['score2']
+            match.forfeit = result['forfeit']
+            match.ended_at = parse_datetime(result['ended_at'])
+            match.status = 'completed'
+            completed[match.pk] = match
+
+        if completed:
+            Match.objects.bulk_update(
+                completed.values(), ['winner', 'score_player1', 'score_player2', 'forfeit', 'ended_at', 'status']
+            )
+        if awarded:
+            get_user_model().objects.bulk_update(awarded.values(), ['xp', 'level'])
+        return len(completed)
+
+
+class MatchResults:
+    queue_key = 'match_results'
+    lock_key = 'match_results:lock'
+    flush_interval = 1
+    lock_ttl = 30
+    max_backoff = 30
+
+    # the lock holder is the only one removing entries from the head, so trimming is only
+    # done while the lock is still ours
+    TRIM_SCRIPT = """
+    if redis.call('get', KEYS[2]) == ARGV[1] then
+        redis.call('ltrim', KEYS[1], ARGV[2], -1)
+        return redis.call('del', KEYS[2])
+    end
+    return 0
+    """
+
+    unsaved = []
+    persisted = 0
+    failures = 0
+    flusher = None
+
+    @classmethod
+    async def submit(cls, match_id, winner, score1, score2, forfeit, xp):
+        result = msgpack.packb({
+            'match_id': int(match_id),
+            'winner': winner,
+            'score1': score1,
+            'score2': score2,
+            'forfeit': forfeit,
+            'xp': xp,
+            'ended_at': timezone.now().isoformat()
+        })
+        try:
+            await RedisClient.get().rpush(cls.queue_key, result)
+        except Exception as e:
+            print(f"Error queueing result for match {match_id}: {e}")
+            cls.unsaved.append(result)
+        cls.start_flusher()
+
+    @classmethod
+    def start_flusher(cls):
+        if cls.flusher is None or cls.flusher.done():
+            cls.flusher = asyncio.create_task(cls.flush_loop())
+
+    @classmethod
+    def pending_count(cls):
+        return len(cls.unsaved)
+
+    @classmethod
+    async def flush_loop(cls):
+        delay = cls.flush_interval
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                remaining = await cls.flush()
+                delay = cls.flush_interval
+            except Exception as e:
+                cls.failures += 1
+                delay = min(delay * 2, cls.max_backoff)
+                print(f"Error persisting match results, retrying in {delay}s: {e}")
+                continue
+
+            if not remaining and not cls.unsaved:
+                return
+
+    @classmethod
+    async def flush(cls):
+        redis = RedisClient.get()
+
+        if cls.unsaved:
+            unsaved, cls.unsaved = cls.unsaved, []
+            try:
+                await redis.rpush(cls.queue_key, *unsaved)
+            except Exception:
+                cls.unsaved = unsaved + cls.unsaved
+                raise
+
+        token = uuid.uuid4().hex
+        if not await redis.set(cls.lock_key, token, nx=True, ex=cls.lock_ttl):
+            # another worker is flushing, keep polling until the queue is empty
+            return await redis.llen(cls.queue_key)
+
+        applied = 0
+        try:
+            batch = await redis.lrange(cls.queue_key, 0, settings.GAME_RESULTS_BATCH - 1)
+            if batch:
+                results = [msgpack.unpackb(entry, raw=False) for entry in batch]
+                cls.persisted += await database_sync_to_async(apply_results)(results)
+            applied = len(batch)
+        finally:
+            # on failure nothing is trimmed and the same batch is retried
+            await redis.eval(cls.TRIM_SCRIPT, 2, cls.queue_key, cls.lock_key, token, applied)
+
+        return await redis.llen(cls.queue_key)
@@ -5,6 +5,7 @@ from .consumers.matchmaking_consumer import MatchmakingConsumer
 from .consumers.space_rivalry_consumer import SpaceRivalryConsumer
 from .consumers.invite_consumer import InviteConsumer
 from .consumers.classic_pong_consumer import ClassicPongConsumer
+from .consumers.spectator_consumer import SpectatorConsumer
 
 websocket_urlpatterns = [
     re_path(r'ws/pong/(?P<game_id>\w+)/$', PongConsumer.as_asgi()),
@@ -12,4 +13,5 @@ websocket_urlpatterns = [
     re_path(r'ws/space-rivalry/(?P<game_id>\w+)/$', SpaceRivalryConsumer.as_asgi()),
     re_path(r'ws/invites/$', InviteConsumer.as_asgi()),
     re_path(r'ws/classic-pong/(?P<game_id>\w+)/$', ClassicPongConsumer.as_asgi()),
+    re_path(r'ws/spectate/(?P<game_type>[\w-]+)/(?P<game_id>\w+)/$', SpectatorConsumer.as_asgi()),
 ]
@@ -0,0 +1,180 @@
+import asyncio
+import time
+from .profiling import TickProfiler
+
+
+class FixedTimestep:
+    def __init__(self, step, max_steps):
+        self.step = step
+        self.max_steps = max_steps
+        self.accumulator = 0
+        self.last_time = None
+
+    def reset(self):
+        self.accumulator = 0
+        self.last_time = None
+
+    def advance(self):
+        now = time.monotonic()
+        if self.last_time is None:
+            self.last_time = now
+            return 1
+
+        self.accumulator += now - self.last_time
+        self.last_time = now
+
+        steps = int(self.accumulator / self.step)
+        if steps > self.max_steps:
+            # too far behind to catch up, drop the backlog instead of spiralling
+            self.accumulator = 0
+            return self.max_steps
+
+        self.accumulator -= steps * self.step
+        return steps
+
+
+class ScheduledMatch:
+    def __init__(self, key, step, tick_mode, on_failure=None):
+        self.key = key
+        self.step = step
+        self.tick_mode = tick_mode
+        self.on_failure = on_failure
+        self.clock = FixedTimestep(GameScheduler.physics_step, GameScheduler.max_catchup_steps)
+        self.cancelled = False
+        self.mode = None
+        self.next_run = 0
+
+    def wake(self):
+        # re-check the mode on the next scheduler tick instead of at the end of the current interval
+        self.next_run = 0
+
+    def cancel(self):
+        self.cancelled = True
+        GameScheduler.unregister(self.key, self)
+
+
+class GameScheduler:
+    tick_interval = 1/60
+    physics_step = 1/60
+    max_catchup_steps = 5
+
+    # seconds between ticks for each match mode. Physics always advances in physics_step
+    # increments, so slower modes only tick (and broadcast) less often. Dormant matches tick
+    # without stepping to keep their lease and inputs moving, idle ones are only polled
+    mode_intervals = {
+        'live': 1/60,
+        'cruise': 1/30,
+        'disconnected': 1/20,
+        'dormant': 1,
+        'idle': 1,
+    }
+
+    _matches = {}
+    _task = None
+    _stepping = 0
+
+    @classmethod
+    def register(cls, key, step, tick_mode, on_failure=None):
+        match = ScheduledMatch(key, step, tick_mode, on_failure)
+        cls._matches[key] = match
+        if cls._task is None or cls._task.done():
+            cls._task = asyncio.create_task(cls.run())
+        return match
+
+    @classmethod
+    def unregister(cls, key, match=None):
+        if match is None or cls._matches.get(key) is match:
+            cls._matches.pop(key, None)
+
+    @classmethod
+    def matches(cls):
+        return list(cls._matches.values())
+
+    @classmethod
+    def registered_count(cls):
+        return len(cls._matches)
+
+    @classmethod
+    def stepping_count(cls):
+        return cls._stepping
+
+    @classmethod
+    def mode_counts(cls):
+        counts = dict.fromkeys(cls.mode_intervals, 0)
+        for match in cls._matches.values():
+            if match.mode in counts:
+                counts[match.mode] += 1
+        return counts
+
+    @classmethod
+    async def run(cls):
+        try:
+            next_tick = time.monotonic()
+            while cls._matches:
+                timer = TickProfiler.timer('scheduler', cls.tick_interval, sample_every=1)
+                await cls.tick()
+                timer.finish()
+
+                next_tick += cls.tick_interval
+                delay = next_tick - time.monotonic()
+                if delay < 0:
+                    next_tick = time.monotonic()
+                    delay = 0
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            cls._stepping = 0
+            cls._task = None
+
+    @classmethod
+    async def tick(cls):
+        now = time.monotonic()
+        # matches anchored to a slower interval come due within half a tick of their slot
+        horizon = now + cls.tick_interval / 2
+        due = []
+        stepping = 0
+
+        for match in list(cls._matches.values()):
+            if match.next_run > horizon:
+                if match.mode not in ('dormant', 'idle'):
+                    stepping += 1
+                continue
+
+            try:
+                match.mode = match.tick_mode()
+            except Exception as e:
+                print(f"Error checking match {match.key}: {e}")
+                continue
+
+            interval = cls.mode_intervals.get(match.mode, cls.tick_interval)
+            match.next_run = max(match.next_run + interval, now)
+
+            if match.mode in ('dormant', 'idle'):
+                match.clock.reset()
+                if match.mode == 'dormant':
+                    due.append((match, 0))
+                continue
+
+            stepping += 1
+            steps = match.clock.advance()
+            if steps:
+                due.append((match, steps))
+
+        cls._stepping = stepping
+        if not due:
+            return
+
+        results = await asyncio.gather(
+            *(match.step(steps) for match, steps in due),
+            return_exceptions=True
+        )
+        for (match, _), result in zip(due, results):
+            if isinstance(result, BaseException):
+                print(f"Error in game loop {match.key}: {result}")
+                match.cancel()
+                if match.on_failure is not None:
+                    try:
+                        match.on_failure()
+                    except Exception as e:
+                        print(f"Error dropping failed game loop {match.key}: {e}")
@@ -0,0 +1,75 @@
+import time
+from collections import deque
+from django.conf import settings
+from .delta import DeltaEncoder, snapshot
+from .fanout import GroupFanout
+
+
+class SpectatorFeed:
+    keyframe_seconds = 1
+
+    def __init__(self, rate, delay):
+        self.interval = 1 / rate
+        self.delay = delay
+        self.encoder = DeltaEncoder(max(1, round(rate * self.keyframe_seconds)))
+        self.history = deque()
+        self.next_publish = 0
+
+    def due(self, now):
+        return now >= self.next_publish
+
+    def frame(self, state, now, final=False):
+        self.next_publish = now + self.interval
+
+        if self.delay and not final:
+            self.history.append((now, snapshot(state)))
+            while len(self.history) > 1 and self.history[1][0] <= now - self.delay:
+                self.history.popleft()
+
+            captured_at, state = self.history[0]
+            if captured_at > now - self.delay:
+                return None
+
+        return self.encoder.encode(state)
+
+
+class SpectatorFeedMixin:
+    spectator_feeds = {}
+
+    def spectator_group(self):
+        return f'spectate_{self.room_group_name}'
+
+    async def publish_spectators(self, final=False):
+        key = self.match_key()
+        now = time.monotonic()
+        feed = self.spectator_feeds.get(key)
+        if feed is not None and not final and not feed.due(now):
+            return
+
+        group = self.spectator_group()
+        if not await GroupFanout.has_members(group):
+            self.spectator_feeds.pop(key, None)
+            return
+
+        if feed is None:
+            feed = self.spectator_feeds[key] = SpectatorFeed(
+                settings.SPECTATOR_RATE, settings.SPECTATOR_DELAY
+            )
+
+        frame = feed.frame(self.wire_state(), now, final)
+        if frame is None:
+            return
+
+        await GroupFanout.send(group, {
+            'type': 'spectator_frame',
+            **self.encode_frame(frame, group)
+        })
+
+    def drop_match(self):
+        super().drop_match()
+        self.spectator_feeds.pop(self.match_key(), None)
+
+    async def release_match(self):
+        if self.game_id in self.shared_games:
+            await self.publish_spectators(final=True)
+        await super().release_match()
@@ -0,0 +1,117 @@
+import time
+import msgpack
+from django.conf import settings
+from django.utils.module_loading import import_string
+from .utils import RedisClient
+from .delta import snapshot
+
+
+class LocalGameStateStore:
+    def __init__(self):
+        self._states = {}
+        self._leases = {}
+
+    async def load(self, key):
+        state = self._states.get(key)
+        return snapshot(state) if state is not None else None
+
+    async def save(self, key, state):
+        self._states[key] = snapshot(state)
+
+    async def delete(self, key):
+        self._states.pop(key, None)
+
+    def _live_owner(self, key):
+        lease = self._leases.get(key)
+        if lease and lease[1] > time.monotonic():
+            return lease[0]
+        return None
+
+    async def owner(self, key):
+        return self._live_owner(key)
+
+    async def acquire(self, key, owner, ttl):
+        current = self._live_owner(key)
+        if current is None or current == owner:
+            self._leases[key] = (owner, time.monotonic() + ttl)
+            return owner
+        return current
+
+    async def renew(self, key, owner, ttl):
+        if self._live_owner(key) != owner:
+            return False
+        self._leases[key] = (owner, time.monotonic() + ttl)
+        return True
+
+    async def release(self, key, owner):
+        if self._live_owner(key) == owner:
+            del self._leases[key]
+
+
+class RedisGameStateStore:
+    RENEW_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('pexpire', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+
+    RELEASE_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+
+    state_ttl = 60 * 60
+
+    def state_key(self, key):
+        return f'game:{key}:state'
+
+    def lease_key(self, key):
+        return f'game:{key}:owner'
+
+    async def load(self, key):
+        data = await RedisClient.get().get(self.state_key(key))
+        if data is None:
+            return None
+        return msgpack.unpackb(data)
+
+    async def save(self, key, state):
+        await RedisClient.get().set(self.state_key(key), msgpack.packb(state), ex=self.state_ttl)
+
+    async def delete(self, key):
+        await RedisClient.get().delete(self.state_key(key))
+
+    async def owner(self, key):
+        current = await RedisClient.get().get(self.lease_key(key))
+        return current.decode() if current is not None else None
+
+    async def acquire(self, key, owner, ttl):
+        redis = RedisClient.get()
+        if await redis.set(self.lease_key(key), owner, nx=True, px=int(ttl * 1000)):
+            return owner
+
+        current = await self.owner(key)
+        if current == owner:
+            await self.renew(key, owner, ttl)
+        return current
+
+    async def renew(self, key, owner, ttl):
+        renewed = await RedisClient.get().eval(
+            self.RENEW_SCRIPT, 1, self.lease_key(key), owner, int(ttl * 1000)
+        )
+        return bool(renewed)
+
+    async def release(self, key, owner):
+        await RedisClient.get().eval(self.RELEASE_SCRIPT, 1, self.lease_key(key), owner)
+
+
+class GameStore:
+    _store = None
+
+    @classmethod
+    def get(cls):
+        if cls._store is None:
+            cls._store = import_string(settings.GAME_STATE_STORE)()
+        return cls._store
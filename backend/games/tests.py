@@ -1,3 +1,228 @@
-from django.test import TestCase
+import random
+import msgpack
+import numpy as np
+from django.test import SimpleTestCase
+from .delta import DeltaEncoder, snapshot
+from .engines import ClassicPongEngine, SpaceRivalryEngine
+from .lockstep import InputLog, make_engine, simulate, state_digest
+from .replays import ReplayRecorder
+from .scheduler import GameScheduler
 
-# Create your tests here.
+DT = GameScheduler.physics_step
+
+INPUTS = {
+    'classic-pong': ('up', 'down', None),
+    'space-rivalry': ('left', 'right', 'shoot', None),
+}
+
+
+def play(engine, game_state, ticks, choices, inputs, log=None):
+    for _ in range(ticks):
+        for player in ('player1', 'player2'):
+            input_type = inputs.choice(choices)
+            if input_type:
+                if log is not None:
+                    log.record(game_state['tick'], player, input_type)
+                engine.apply_input(game_state, player, input_type)
+        engine.step(game_state, DT)
+
+
+def start(engine, seed):
+    game_state = engine.initial_state(seed=seed)
+    game_state['player1'], game_state['player2'] = 'alice', 'bob'
+    game_state['gameStarted'] = True
+    return game_state
+
+
+class LockstepTests(SimpleTestCase):
+    def record_match(self, game_type, seed, ticks=600):
+        engine = make_engine(game_type)
+        game_state = start(engine, seed)
+        log = InputLog(game_type, 1, game_state)
+        play(engine, game_state, ticks, INPUTS[game_type], random.Random(seed), log)
+        wire_state = engine.to_wire(game_state)
+        return msgpack.unpackb(log.finish(game_state, wire_state), raw=False), state_digest(wire_state)
+
+    def test_same_seed_and_inputs_give_the_same_digest(self):
+        for game_type in INPUTS:
+            with self.subTest(game_type=game_type):
+                log, live_digest = self.record_match(game_type, seed=1234)
+                _, first = simulate(log)
+                _, second = simulate(log)
+                self.assertEqual(first, live_digest)
+                self.assertEqual(second, live_digest)
+
+    def test_different_seed_gives_a_different_match(self):
+        for game_type in INPUTS:
+            with self.subTest(game_type=game_type):
+                log, live_digest = self.record_match(game_type, seed=1234)
+                log['seed'] = 4321
+                _, digest = simulate(log)
+                self.assertNotEqual(digest, live_digest)
+
+
+class SnapshotTests(SimpleTestCase):
+    def test_space_rivalry_resumes_from_snapshot(self):
+        engine = SpaceRivalryEngine(tick_ms=DT * 1000)
+        game_state = start(engine, seed=99)
+        game_state['difficulty'] = 10
+        inputs = random.Random(99)
+        play(engine, game_state, 300, INPUTS['space-rivalry'], inputs)
+        self.assertTrue(len(game_state['asteroids']))
+
+        # through msgpack like the state store, into a fresh engine
+        stored = msgpack.unpackb(msgpack.packb(engine.to_snapshot(game_state)), raw=False)
+        resumed_engine = SpaceRivalryEngine(tick_ms=DT * 1000)
+        resumed = resumed_engine.initial_state()
+        resumed_engine.restore(resumed, stored)
+
+        later_inputs = random.Random(7)
+        play(engine, game_state, 300, INPUTS['space-rivalry'], later_inputs)
+        later_inputs.seed(7)
+        play(resumed_engine, resumed, 300, INPUTS['space-rivalry'], later_inputs)
+
+        self.assertEqual(
+            state_digest(resumed_engine.to_snapshot(resumed)),
+            state_digest(engine.to_snapshot(game_state))
+        )
+
+    def test_classic_pong_resumes_from_snapshot(self):
+        engine = ClassicPongEngine()
+        game_state = start(engine, seed=5)
+        play(engine, game_state, 400, INPUTS['classic-pong'], random.Random(5))
+
+        resumed = engine.initial_state()
+        resumed.update(msgpack.unpackb(msgpack.packb(engine.to_snapshot(game_state)), raw=False))
+
+        later_inputs = random.Random(11)
+        play(engine, game_state, 400, INPUTS['classic-pong'], later_inputs)
+        later_inputs.seed(11)
+        play(engine, resumed, 400, INPUTS['classic-pong'], later_inputs)
+
+        self.assertEqual(state_digest(engine.to_snapshot(resumed)), state_digest(engine.to_snapshot(game_state)))
+
+    def test_wire_state_hides_the_match_rng(self):
+        for engine in (ClassicPongEngine(), SpaceRivalryEngine()):
+            with self.subTest(engine=type(engine).__name__):
+                game_state = engine.initial_state(seed=3)
+                self.assertNotIn('seed', engine.to_wire(game_state))
+                self.assertNotIn('rngState', engine.to_wire(game_state))
+                self.assertEqual(engine.to_snapshot(game_state)['seed'], 3)
+
+
+class DeltaEncoderTests(SimpleTestCase):
+    def test_despawned_entity_is_sent_as_removed_path(self):
+        engine = SpaceRivalryEngine()
+        game_state = start(engine, seed=1)
+        engine.add_asteroid(game_state, 'NORMAL', 100, 0)
+        engine.add_asteroid(game_state, 'NORMAL', 300, 0)
+        kept_id, gone_id = (str(entity_id) for entity_id in game_state['asteroids']['id'].tolist())
+
+        encoder = DeltaEncoder()
+        self.assertEqual(encoder.encode(engine.to_wire(game_state))['type'], 'game_state')
+
+        game_state['asteroids'].keep(np.array([True, False]))
+        game_state['tick'] += 1
+        frame = encoder.encode(engine.to_wire(game_state))
+
+        self.assertEqual(frame['type'], 'game_state_delta')
+        self.assertEqual(frame['removed'], [['asteroids', gone_id]])
+        # anchored entities that keep moving are not resent
+        self.assertNotIn('asteroids', frame['changes'])
+        self.assertIn(kept_id, encoder.baseline['asteroids'])
+
+    def test_unchanged_state_sends_nothing(self):
+        encoder = DeltaEncoder()
+        state = {'ballX': 1, 'nested': {'a': 1}}
+        encoder.encode(state)
+        self.assertIsNone(encoder.encode(snapshot(state)))
+
+    def test_keyframe_matches_the_last_broadcast_seq(self):
+        encoder = DeltaEncoder()
+        encoder.encode({'ballX': 1})
+        frame = encoder.keyframe({'ballX': 5})
+        self.assertEqual(frame['seq'], 1)
+        self.assertEqual(frame['state'], {'ballX': 1})
+
+        delta = encoder.encode({'ballX': 5})
+        self.assertEqual(delta['base'], frame['seq'])
+        self.assertEqual(delta['changes'], {'ballX': 5})
+
+
+class ReplayRecorderTests(SimpleTestCase):
+    def test_overflow_keeps_the_buffer_starting_at_a_keyframe(self):
+        recorder = ReplayRecorder('unused', buffer_size=5)
+        recorder.encoder.keyframe_interval = 2
+        for tick in range(12):
+            recorder.record({'tick': tick})
+
+        frames = [msgpack.unpackb(packed, raw=False) for packed in recorder.drain()]
+        self.assertEqual(frames[0]['type'], 'game_state')
+        for previous, frame in zip(frames, frames[1:]):
+            if frame['type'] == 'game_state_delta':
+                self.assertEqual(frame['base'], previous['seq'])
+        self.assertEqual(frames[-1]['seq'], 12)
+
+    def test_overflow_without_a_later_keyframe_restarts_the_chain(self):
+        recorder = ReplayRecorder('unused', buffer_size=3)
+        for tick in range(4):
+            recorder.record({'tick': tick})
+
+        frames = [msgpack.unpackb(packed, raw=False) for packed in recorder.drain()]
+        self.assertEqual([frame['type'] for frame in frames], ['game_state'])
+        self.assertEqual(frames[0]['state'], {'tick': 3})
+        self.assertEqual(recorder.dropped, 3)
+
+
+class RewindTests(SimpleTestCase):
+    def approach_left_paddle(self, engine):
+        game_state = start(engine, seed=1)
+        game_state.update(ballX=120, ballY=50, ballSpeedX=-7, ballSpeedY=0, paddle1Y=100)
+
+        # player 1 sends view ticks, so their misses are held for a late input
+        while game_state['missed1'] is None:
+            engine.apply_input(game_state, 'player1', None, game_state['tick'])
+            engine.step(game_state, DT)
+        return game_state, game_state['missed1']['tick']
+
+    def move_up_late(self, engine, game_state, view_tick):
+        for _ in range(5):
+            engine.apply_input(game_state, 'player1', 'up', view_tick)
+        engine.step(game_state, DT)
+
+    def test_late_input_inside_rewind_window_turns_miss_into_hit(self):
+        engine = ClassicPongEngine()
+        game_state, miss_tick = self.approach_left_paddle(engine)
+        for _ in range(3):
+            engine.step(game_state, DT)
+
+        self.move_up_late(engine, game_state, view_tick=miss_tick)
+
+        self.assertIsNone(game_state['missed1'])
+        self.assertGreater(game_state['ballSpeedX'], 0)
+        self.assertEqual(game_state['combo1'], 1)
+        self.assertEqual(game_state['score2'], 0)
+
+    def test_late_input_outside_rewind_window_concedes(self):
+        engine = ClassicPongEngine()
+        game_state, miss_tick = self.approach_left_paddle(engine)
+        for _ in range(engine.REWIND_TICKS):
+            engine.step(game_state, DT)
+
+        self.move_up_late(engine, game_state, view_tick=miss_tick)
+        for _ in range(20):
+            engine.step(game_state, DT)
+
+        self.assertEqual(game_state['score2'], 1)
+        self.assertEqual(game_state['combo1'], 0)
+
+    def test_clients_without_view_ticks_score_immediately(self):
+        engine = ClassicPongEngine()
+        game_state = start(engine, seed=1)
+        game_state.update(ballX=120, ballY=50, ballSpeedX=-7, ballSpeedY=0, paddle1Y=100)
+
+        for _ in range(20):
+            engine.step(game_state, DT)
+
+        self.assertIsNone(game_state['missed1'])
+        self.assertEqual(game_state['score2'], 1)
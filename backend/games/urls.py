@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import GetUserMatch, MatchStatsViewSet, GetUserDash
+from .views import GetUserMatch, MatchStatsViewSet, GetUserDash, MatchReplay
 
 urlpatterns = [
     path('usermatches/<int:userid>', GetUserMatch.as_view(), name='get_user_match'),
     path('userdash/<int:userid>', GetUserDash.as_view(), name='get_user_match'),
+    path('replays/<int:game_id>', MatchReplay.as_view(), name='match-replay'),
     path('stats', MatchStatsViewSet.as_view(), name='match-stats'),
 ]
@@ -1,4 +1,6 @@
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from redis import asyncio as aioredis
 import threading
 
 class PlayersManager:
@@ -20,12 +22,20 @@ class PlayersManager:
         with cls._lock:
             return username in cls._players
 
+class RedisClient:
+    _client = None
+
+    @classmethod
+    def get(cls):
+        if cls._client is None:
+            cls._client = aioredis.from_url(settings.GAMES_REDIS_URL)
+        return cls._client
+
 class XPManager:
     def __init__(self, user, base_xp=100, growth_factor=1.5):
         self.user = user
         self.base_xp = base_xp
         self.growth_factor = growth_factor
-        user.save()
 
     def xp_to_next_level(self):
         return int(self.base_xp * (self.growth_factor ** (self.user.level - 1)))
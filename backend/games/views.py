@@ -7,6 +7,11 @@ from django.db.models import Count, Avg, F, Q, Max, Min, StdDev
 from django.db.models.functions import TruncDate, ExtractHour, Abs
 from django.utils import timezone
 from django.utils.timezone import now, timedelta
+from django.http import HttpResponse, StreamingHttpResponse
+from django.conf import settings
+import os
+from .replays import replay_path, stream_file
+from .metrics import render_metrics
 
 User = get_user_model()
 
@@ -223,3 +228,31 @@ class MatchStatsViewSet(APIView):
                                   'player2__username', 'score_player1',
                                   'score_player2', 'winner__username')[:10])
         })
+
+
+class MatchReplay(APIView):
+
+    def get(self, request, game_id):
+        try:
+            match = Match.objects.get(id=game_id)
+        except Match.DoesNotExist:
+            return Response({"error": "Match not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        path = replay_path(match.game_type, match.id)
+        if not os.path.exists(path):
+            return Response({"error": "No replay recorded for this match"}, status=status.HTTP_404_NOT_FOUND)
+
+        response = StreamingHttpResponse(stream_file(path), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="{os.path.basename(path)}"'
+        return response
+
+
+class MetricsView(APIView):
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request):
+        if settings.METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {settings.METRICS_TOKEN}':
+            return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+
+        return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
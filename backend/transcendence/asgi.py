@@ -13,6 +13,7 @@ app = get_asgi_application()
 from channels.routing import ProtocolTypeRouter, URLRouter
 from api.authentication import JWTAuthMiddleware
 from games.routing import websocket_urlpatterns
+from games.metrics import ConnectionMetricsMiddleware
 from chat.consumers import DirectMessageConsumer
 from notifs.consumers import NotificationConsumer
 from django.urls import path
@@ -20,9 +21,11 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'transcendence.settings')
 
 application = ProtocolTypeRouter({
     "http": app,
-    "websocket": JWTAuthMiddleware(
-        URLRouter(
-            websocket_urlpatterns + [path('ws/chat/', DirectMessageConsumer.as_asgi()), path('ws/notifs/', NotificationConsumer.as_asgi())]
+    "websocket": ConnectionMetricsMiddleware(
+        JWTAuthMiddleware(
+            URLRouter(
+                websocket_urlpatterns + [path('ws/chat/', DirectMessageConsumer.as_asgi()), path('ws/notifs/', NotificationConsumer.as_asgi())]
+            )
         )
     ),
 })
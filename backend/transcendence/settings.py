@@ -208,13 +208,32 @@ ASGI_APPLICATION = 'transcendence.asgi.application'
 
 CHANNEL_LAYERS = {
     "default": {
-        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "BACKEND": "games.layers.InstrumentedRedisChannelLayer",
         "CONFIG": {
             "hosts": [(os.getenv('REDIS_HOST'), int(os.getenv('REDIS_PORT')))],
         },
     },
 }
 
+GAMES_REDIS_URL = f"redis://{os.getenv('REDIS_HOST')}:{os.getenv('REDIS_PORT')}/2"
+GAME_STATE_STORE = os.getenv('GAME_STATE_STORE', 'games.store.RedisGameStateStore')
+SPECTATOR_RATE = int(os.getenv('SPECTATOR_RATE', 10))
+SPECTATOR_DELAY = float(os.getenv('SPECTATOR_DELAY', 0))
+SPECTATOR_CAP = int(os.getenv('SPECTATOR_CAP', 50))
+GAME_REPLAYS_ENABLED = os.getenv('GAME_REPLAYS_ENABLED', '').lower() in ('1', 'true', 'yes')
+GAME_REPLAY_DIR = os.getenv('GAME_REPLAY_DIR', os.path.join(BASE_DIR, 'replays'))
+GAME_REPLAY_BUFFER = int(os.getenv('GAME_REPLAY_BUFFER', 600))
+GAME_CRUISE_TICKS = os.getenv('GAME_CRUISE_TICKS', '').lower() in ('1', 'true', 'yes')
+GAME_REAPER_INTERVAL = int(os.getenv('GAME_REAPER_INTERVAL', 30))
+GAME_ORPHAN_TTL = int(os.getenv('GAME_ORPHAN_TTL', 120))
+GAME_CONNECTION_TTL = int(os.getenv('GAME_CONNECTION_TTL', 600))
+GAME_ABANDON_TTL = int(os.getenv('GAME_ABANDON_TTL', 3600))
+GAME_REAPER_BATCH = int(os.getenv('GAME_REAPER_BATCH', 200))
+GAME_RESULTS_BATCH = int(os.getenv('GAME_RESULTS_BATCH', 100))
+TICK_PROFILING = os.getenv('TICK_PROFILING', '').lower() in ('1', 'true', 'yes')
+TICK_PROFILING_SAMPLE = int(os.getenv('TICK_PROFILING_SAMPLE', 20))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
@@ -17,11 +17,14 @@ Including another URLconf
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
+from games.views import MetricsView
 
 urlpatterns = [
     path('api/', include('api.urls')),
     path('games/', include('games.urls')),
     path('api/chat/', include('chat.urls')),
+    # scraped from inside the docker network, nginx does not proxy it
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
 
 # only for dev, make this served via nginx + docker volumes.
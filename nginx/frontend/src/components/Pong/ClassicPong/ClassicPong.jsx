@@ -3,6 +3,7 @@ import { Card, CardHeader, CardTitle, CardContent } from '@/components/ui/card';
 import { Trophy } from 'lucide-react';
 import { env } from '../../../config/env';
 import { useNavigate } from 'react-router-dom';
+import { applyStateDelta } from '../../../lib/stateDelta';
 
 const GAME_WIDTH = 800;
 const GAME_HEIGHT = 400;
@@ -22,6 +23,7 @@ const ClassicPong = () => {
   const navigate = useNavigate();
   const wsRef = useRef(null);
   const cleanupRef = useRef(false);
+  const lastSeqRef = useRef(null);
   const reconnectAttempts = useRef(0);
   const maxReconnectAttempts = 1;
 
@@ -75,8 +77,14 @@ const ClassicPong = () => {
       const data = JSON.parse(event.data);
       switch(data.type) {
         case 'game_state':
+          lastSeqRef.current = data.seq;
           setGameState(data.state);
           break;
+        case 'game_state_delta':
+          if (data.base !== lastSeqRef.current) break;
+          lastSeqRef.current = data.seq;
+          setGameState(prev => prev && applyStateDelta(prev, data));
+          break;
         case 'game_ended':
           handleGameEnd(data.state, false);
           break;
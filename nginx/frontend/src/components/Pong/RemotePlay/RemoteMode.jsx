@@ -6,6 +6,7 @@ import gsap from 'gsap';
 import { useNavigate } from 'react-router-dom';
 import { Trophy } from 'lucide-react';
 import { axiosInstance } from '../../../api/axiosInstance';
+import { applyStateDelta } from '../../../lib/stateDelta';
 
 const RemoteMode = () => {
     const canvasRef = useRef(null);
@@ -38,6 +39,8 @@ const RemoteMode = () => {
     });
     const pingInterval = useRef(null);
     const lastPongReceived = useRef(Date.now());
+    const gameStateRef = useRef(null);
+    const lastSeqRef = useRef(null);
 
     // Check for mobile and orientation
     useEffect(() => {
@@ -84,19 +87,8 @@ const RemoteMode = () => {
     useEffect(() => {
         if (!canvasRef.current) return;
 
-        let playerScore = 0;
-        let aiScore = 0;
-        const maxScore = 11;
-        let playerGamesWon = 0;
-        let aiGamesWon = 0;
-        let maxGames = 3;
-        let playerSideBounces = 0;
-        let aiSideBounces = 0;
-        let isGameOver = false;
         let inGame = false;
-        let lastHitAI = true;
         let mouseCurrent = { x: 0, y: 0 };
-        const ballSound = new Audio('/sounds/ping_pong.mp3');
 
         const setupWebSocket = () => {
             if (websocketRef.current?.readyState === WebSocket.OPEN) {
@@ -168,14 +160,24 @@ const RemoteMode = () => {
                         break;
 
                     case 'game_state':
-                        handleGameState(data.state);
+                    case 'game_state_delta':
+                        if (data.type === 'game_state') {
+                            gameStateRef.current = data.state;
+                        } else if (gameStateRef.current && data.base === lastSeqRef.current) {
+                            gameStateRef.current = applyStateDelta(gameStateRef.current, data);
+                        } else {
+                            break;
+                        }
+                        lastSeqRef.current = data.seq;
+
+                        handleGameState(gameStateRef.current);
                         setConnectionState(prev => ({
                             ...prev,
                             hasGameStarted: true,
                             status: 'connected'
                         }));
-                        if (data.state.winner) {
-                            handleGameEnd(data.state);
+                        if (gameStateRef.current.winner) {
+                            handleGameEnd(gameStateRef.current);
                         }
                         setTimeout(() => {
                             inGame = true;
@@ -256,10 +258,10 @@ const RemoteMode = () => {
 
         const handleGameState = (state) => {
             updatePaddlePositions(state);
+            updateBallPosition(state);
             if (state.player1 !== username) {
                 setScores({ player1: state.scores.player2, player2: state.scores.player1 });
                 setMatches({ player1: state.rounds_won.player2, player2: state.rounds_won.player1 });
-                updateBallPosition(state);
             } else {
                 setScores({ player1: state.scores.player1, player2: state.scores.player2 });
                 setMatches({ player1: state.rounds_won.player1, player2: state.rounds_won.player2 });
@@ -433,151 +435,6 @@ const RemoteMode = () => {
             return { netObject, tableObject };
         };
 
-        const simulatePhysics = (deltaTime) => {
-            gameObjectsRef.current.forEach(obj => {
-                const gravity = -9.82;
-                obj.velocity.y += gravity * deltaTime;
-
-                const airResistance = 1;
-                obj.velocity.multiplyScalar(airResistance);
-
-                const scaledVelocity = obj.velocity.clone().multiplyScalar(deltaTime);
-                obj.position.add(scaledVelocity);
-
-                if (obj.position.y < 0.5) {
-                    obj.velocity.y *= -0.5;
-                    obj.position.y = 0.5;
-                }
-                obj.mesh.position.copy(obj.position);
-            });
-        };
-
-
-        const collisionTimestamps = new Map();
-        const collisionDelay = 100;
-
-        const twoObjCollide = (objA, objB) => {
-            const boxA = new THREE.Box3().setFromObject(objA.mesh);
-            const boxB = new THREE.Box3().setFromObject(objB.mesh);
-
-            if (boxA.intersectsBox(boxB)) {
-                const currentTime = performance.now();
-                const key = `${objA.id}-${objB.id}`;
-
-                if (!collisionTimestamps.has(key) ||
-                currentTime - collisionTimestamps.get(key) > collisionDelay) {
-                    collisionTimestamps.set(key, currentTime);
-                    return true;
-                }
-            }
-            return false;
-        };
-
-        const checkCollisions = () => {
-            if (!paddleRef.current || gameObjectsRef.current.length === 0 || !paddleOpponentRef.current) return;
-
-            const ball = gameObjectsRef.current[gameObjectsRef.current.length - 1];
-
-            if (twoObjCollide(paddleRef.current, ball) && lastHitAI) {
-                lastHitAI = false;
-                ballSound.volume = Math.min(1, 1);
-                ballSound.currentTime = 0;
-                // ballSound.play();
-
-                const paddleBox = new THREE.Box3().setFromObject(paddleRef.current.mesh);
-                const ballWidth = ball.position.x - paddleBox.min.x;
-                const paddleWidth = paddleBox.max.x - paddleBox.min.x;
-                const hitDirection = ballWidth / paddleWidth;
-
-                let forceX = -(hitDirection - paddleWidth / 2) * 3;
-                const ballHeight = ball.position.y - paddleBox.min.y;
-                const paddleHeight = paddleBox.max.y - paddleBox.min.y;
-                let forceY = Math.log(ballHeight / paddleHeight + 1) * 6 + 2;
-                let forceZ = Math.log(ballHeight / paddleHeight + 1) * 13 + 10;
-
-                playerSideBounces = 0;
-                aiSideBounces = 0;
-
-                ball.velocity = new THREE.Vector3(0, 0, 0);
-                ball.applyImpulse(new THREE.Vector3(forceX, forceY, -forceZ));
-            }
-
-            else if (twoObjCollide(paddleOpponentRef.current, ball) && !lastHitAI) {
-                lastHitAI = true;
-                ballSound.volume = Math.min(1, 1);
-                ballSound.currentTime = 0;
-                // ballSound.play();
-
-                const paddleBox = new THREE.Box3().setFromObject(paddleOpponentRef.current.mesh);
-                const ballWidth = ball.position.x - paddleBox.min.x;
-                const paddleWidth = paddleBox.max.x - paddleBox.min.x;
-                const hitDirection = ballWidth / paddleWidth;
-
-                let forceX = (hitDirection - paddleWidth / 2) * 3;
-                const ballHeight = ball.position.y - paddleBox.min.y;
-                const paddleHeight = paddleBox.max.y - paddleBox.min.y;
-                let forceY = Math.log(ballHeight / paddleHeight + 1) * 6 + 2;
-                let forceZ = Math.log(ballHeight / paddleHeight + 1) * 13 + 10;
-
-                playerSideBounces = 0;
-                aiSideBounces = 0;
-
-                ball.velocity = new THREE.Vector3(0, 0, 0);
-                ball.applyImpulse(new THREE.Vector3(forceX, forceY, forceZ));
-            }
-
-            else if (twoObjCollide(tableObject, ball)) {
-                ballSound.volume = Math.min(1, 1);
-                ballSound.currentTime = 0;
-
-                let scoreUpdate = false;
-                // ballSound.play();
-
-                ball.velocity.y = -ball.velocity.y;
-                let scoringPlayer = null;
-
-                if (ball.position.z < 0) {
-                    aiSideBounces++;
-                    if (aiSideBounces === 2) {
-                        playerScore++;
-                        scoreUpdate = true;
-                        scoringPlayer = 'player1';
-                        resetBall(-1);
-                    }
-                } else if (ball.position.z > 0) {
-                    playerSideBounces++;
-                    if (playerSideBounces === 2) {
-                        aiScore++;
-                        scoreUpdate = true;
-                        scoringPlayer = 'player2';
-                        resetBall(1);
-                    }
-                }
-
-                if (scoreUpdate && websocketRef.current && websocketRef.current.readyState === WebSocket.OPEN) {
-                    websocketRef.current.send(JSON.stringify({
-                        type: 'score_update',
-                        scores: {
-                            player1: playerScore,
-                            player2: aiScore
-                        },
-                        scoringPlayer: scoringPlayer,
-                        playerGamesWon: playerGamesWon,
-                        aiGamesWon: aiGamesWon
-                    }));
-                }
-            } else if (twoObjCollide(netObject, ball)) {
-                ballSound.volume = Math.min(1, 1);
-                ballSound.currentTime = 0;
-                // ballSound.play();
-
-                ball.velocity.z = -ball.velocity.z * 0.5;
-                ball.velocity.x += (Math.random() - 0.5) * 0.2;
-                ball.velocity.y *= 0.9;
-                ball.position.z += ball.velocity.z * 0.01;
-            }
-        };
-
         const handleBeforeUnload = (e) => {
             if (gameStatus !== 'completed' && websocketRef.current) {
                 isUnmounting.current = true;
@@ -586,116 +443,6 @@ const RemoteMode = () => {
             }
         };
 
-        const resetBall = (direction = 1) => {
-            gameObjectsRef.current.forEach(obj => {
-                scene.remove(obj.mesh);
-                obj.mesh.geometry.dispose();
-                obj.mesh.material.dispose();
-            });
-            gameObjectsRef.current = [];
-
-            const position = new THREE.Vector3(0, 5.0387, 8 * direction);
-            CreateBall(position, direction);
-
-            lastHitAI = direction === -1;
-            playerSideBounces = 0;
-            aiSideBounces = 0;
-        };
-
-        const winCheck = () => {
-            if (playerScore >= maxScore || aiScore >= maxScore) {
-                if (Math.abs(playerScore - aiScore) >= 2) {
-                    if (playerScore > aiScore) {
-                        playerGamesWon++;
-                    } else {
-                        aiGamesWon++;
-                    }
-
-                    if (websocketRef.current && websocketRef.current.readyState === WebSocket.OPEN) {
-                        websocketRef.current.send(JSON.stringify({
-                            type: 'game_won',
-                            winner: playerScore > aiScore ? 'player1' : 'player2',
-                            matches: {
-                                player1: playerGamesWon,
-                                player2: aiGamesWon
-                            }
-                        }));
-                    }
-
-                    playerScore = 0;
-                    aiScore = 0;
-
-                    if (playerGamesWon >= Math.ceil(maxGames / 2) ||
-                        aiGamesWon >= Math.ceil(maxGames / 2)) {
-                        isGameOver = true;
-                        inGame = false;
-
-                        if (websocketRef.current && websocketRef.current.readyState === WebSocket.OPEN) {
-                            websocketRef.current.send(JSON.stringify({
-                                type: 'match_complete',
-                                winner: playerGamesWon > aiGamesWon ? 'player1' : 'player2',
-                                finalScore: {
-                                    player1: playerGamesWon,
-                                    player2: aiGamesWon
-                                },
-                                forfeit: false
-                            }));
-                        }
-
-                        playerGamesWon = 0;
-                        aiGamesWon = 0;
-                    }
-                }
-            }
-        };
-
-        const gameLogic = () => {
-            if (gameObjectsRef.current.length === 0) return;
-
-            const ball = gameObjectsRef.current[gameObjectsRef.current.length - 1];
-            const tableBounds = new THREE.Box3().setFromObject(tableObject.mesh);
-
-            let scoreUpdate = false;
-            let scoringPlayer = null;
-
-            if (ball.position.z > tableBounds.max.z + 3 && playerSideBounces === 1) {
-                aiScore++;
-                scoreUpdate = true;
-                scoringPlayer = 'player2';
-                resetBall(-1);
-            } else if (ball.position.z < tableBounds.min.z - 3 && aiSideBounces === 1) {
-                playerScore++;
-                scoreUpdate = true;
-                scoringPlayer = 'player1';
-                resetBall(1);
-            } else if (ball.position.z > tableBounds.max.z + 3 && playerSideBounces === 0) {
-                playerScore++;
-                scoreUpdate = true;
-                scoringPlayer = 'player1';
-                resetBall(1);
-            } else if (ball.position.z < tableBounds.min.z - 3 && aiSideBounces === 0) {
-                aiScore++;
-                scoreUpdate = true;
-                scoringPlayer = 'player2';
-                resetBall(-1);
-            }
-
-            if (scoreUpdate && websocketRef.current && websocketRef.current.readyState === WebSocket.OPEN) {
-                websocketRef.current.send(JSON.stringify({
-                    type: 'score_update',
-                    scores: {
-                        player1: playerScore,
-                        player2: aiScore
-                    },
-                    scoringPlayer: scoringPlayer,
-                    playerGamesWon: playerGamesWon,
-                    aiGamesWon: aiGamesWon
-                }));
-            }
-
-            winCheck();
-        };
-
         const handleMouseMove = (event) => {
             // Get correct mouse coordinates based on canvas position
             const rect = canvasRef.current.getBoundingClientRect();
@@ -755,26 +502,17 @@ const RemoteMode = () => {
             renderer.setPixelRatio(Math.min(window.devicePixelRatio, 2));
         };
 
-        const clock = new THREE.Clock();
-        let oldElapsedTime = 0;
 
         let isBoundingBoxVisible = false;
         const animate = () => {
-            const elapsedTime = clock.getElapsedTime();
-            const deltaTime = elapsedTime - oldElapsedTime;
-            oldElapsedTime = elapsedTime;
-
             if (inGame) {
                 if (paddleRef.current?.mesh) {
-                    const ball = gameObjectsRef.current[gameObjectsRef.current.length - 1];
                     if (isPlayer1) {
                         camera.position.set(
                             4 * mouseCurrent.x,
                             6.8 + (1 * mouseCurrent.y),
                             12.8
                         );
-                        if (websocketRef.current && websocketRef.current.readyState === WebSocket.OPEN)
-                            websocketRef.current.send(JSON.stringify({ type: 'ball_position', ball_position: { x: ball.position.x, y: ball.position.y, z: ball.position.z } }));
                     } else {
                         camera.position.set(
                             -4 * mouseCurrent.x,
@@ -825,12 +563,6 @@ const RemoteMode = () => {
                         });
                     }
                 }
-                if (isPlayer1) {
-                    simulatePhysics(deltaTime);
-                    checkCollisions();
-                    gameLogic();
-                }
-
             }
             controls.update();
 
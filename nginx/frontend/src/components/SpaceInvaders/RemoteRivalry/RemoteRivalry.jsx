@@ -3,6 +3,7 @@ import { useNavigate } from 'react-router-dom';
 import { Trophy } from 'lucide-react';
 import { axiosInstance } from '../../../api/axiosInstance';
 import { env } from '../../../config/env';
+import { applyStateDelta } from '../../../lib/stateDelta';
 
 const GAME_WIDTH = 800;
 const GAME_HEIGHT = 600;
@@ -12,6 +13,11 @@ const LASER_WIDTH = 4;
 const LASER_HEIGHT = 15;
 const POWERUP_SIZE = 25;
 
+const DEBRIS_SIZE = 20;
+
+// entities arrive keyed by id with a motion anchor, placed at the current server tick
+const entityY = (entity, tick) => entity.y + entity.vy * (tick - entity.tick);
+
 const POWERUP_COLORS = {
   RAPID_FIRE: 'yellow',
   SHIELD: 'cyan',
@@ -31,6 +37,7 @@ const RemoteRivalry = () => {
 
   const wsRef = useRef(null);
   const cleanupRef = useRef(false);
+  const lastSeqRef = useRef(null);
   const reconnectAttempts = useRef(0);
   const reconnectTimeout = useRef(null);
   const reconnectTimeoutId = useRef(null);
@@ -134,9 +141,16 @@ const RemoteRivalry = () => {
 
       switch(data.type) {
         case 'game_state':
+          lastSeqRef.current = data.seq;
           setGameState(data.state);
           break;
 
+        case 'game_state_delta':
+          if (data.base !== lastSeqRef.current) break;
+          lastSeqRef.current = data.seq;
+          setGameState(prev => prev && applyStateDelta(prev, data));
+          break;
+
         case 'player_disconnected':
           setErrorMessage(data.message);
           break;
@@ -423,38 +437,38 @@ const RemoteRivalry = () => {
           }}
         />
 
-        {gameState.lasers1.map((laser, i) => (
+        {Object.entries(gameState.lasers1).map(([id, laser]) => (
           <div
-            key={`laser1-${i}`}
+            key={`laser1-${id}`}
             className="absolute bg-blue-300"
             style={{
               left: laser.x - LASER_WIDTH/2,
-              top: laser.y,
+              top: entityY(laser, gameState.tick),
               width: LASER_WIDTH,
               height: LASER_HEIGHT
             }}
           />
         ))}
-        {gameState.lasers2.map((laser, i) => (
+        {Object.entries(gameState.lasers2).map(([id, laser]) => (
           <div
-            key={`laser2-${i}`}
+            key={`laser2-${id}`}
             className="absolute bg-red-300"
             style={{
               left: laser.x - LASER_WIDTH/2,
-              top: laser.y,
+              top: entityY(laser, gameState.tick),
               width: LASER_WIDTH,
               height: LASER_HEIGHT
             }}
           />
         ))}
 
-        {gameState.asteroids.map((asteroid, i) => (
+        {Object.entries(gameState.asteroids).map(([id, asteroid]) => (
           <div
-            key={`asteroid-${i}`}
+            key={`asteroid-${id}`}
             className="absolute rounded-full"
             style={{
               left: asteroid.x - asteroid.size/2,
-              top: asteroid.y - asteroid.size/2,
+              top: entityY(asteroid, gameState.tick) - asteroid.size/2,
               width: asteroid.size,
               height: asteroid.size,
               backgroundColor: asteroid.type === 'FAST' ? '#A0A0A0' :
@@ -464,13 +478,26 @@ const RemoteRivalry = () => {
           />
         ))}
 
-        {gameState.powerups.map((powerup, i) => (
+        {Object.entries(gameState.debris).map(([id, debris]) => (
+          <div
+            key={`debris-${id}`}
+            className="absolute rounded-sm bg-gray-400"
+            style={{
+              left: debris.x - DEBRIS_SIZE/2,
+              top: entityY(debris, gameState.tick) - DEBRIS_SIZE/2,
+              width: DEBRIS_SIZE,
+              height: DEBRIS_SIZE
+            }}
+          />
+        ))}
+
+        {Object.entries(gameState.powerups).map(([id, powerup]) => (
           <div
-            key={`powerup-${i}`}
+            key={`powerup-${id}`}
             className="absolute rounded-lg animate-bounce"
             style={{
               left: powerup.x - POWERUP_SIZE/2,
-              top: powerup.y - POWERUP_SIZE/2,
+              top: entityY(powerup, gameState.tick) - POWERUP_SIZE/2,
               width: POWERUP_SIZE,
               height: POWERUP_SIZE,
               backgroundColor: POWERUP_COLORS[powerup.type]
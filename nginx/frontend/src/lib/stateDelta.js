@@ -0,0 +1,33 @@
+const isPlainObject = (value) =>
+  value !== null && typeof value === 'object' && !Array.isArray(value);
+
+const mergeChanges = (target, changes) => {
+  const result = { ...target };
+  for (const [key, value] of Object.entries(changes)) {
+    if (isPlainObject(value) && isPlainObject(result[key])) {
+      result[key] = mergeChanges(result[key], value);
+    } else {
+      result[key] = value;
+    }
+  }
+  return result;
+};
+
+const withoutPath = (target, [key, ...rest]) => {
+  if (!isPlainObject(target) || !(key in target)) return target;
+  const result = { ...target };
+  if (rest.length === 0) {
+    delete result[key];
+  } else {
+    result[key] = withoutPath(result[key], rest);
+  }
+  return result;
+};
+
+export function applyStateDelta(state, delta) {
+  let next = mergeChanges(state, delta.changes);
+  for (const path of delta.removed || []) {
+    next = withoutPath(next, path);
+  }
+  return next;
+}
@@ -0,0 +1,390 @@
+import argparse
+import asyncio
+import json
+import random
+import resource
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import requests
+import websockets
+
+from pong_cli import (
+    MSGPACK_SUBPROTOCOL,
+    PADDLE_HEIGHT,
+    GameSession,
+    apply_state_delta,
+    msgpack,
+    ssl_context,
+)
+
+requests.packages.urllib3.disable_warnings()
+
+
+class Histogram:
+    def __init__(self, bucket_ms: float = 0.5, max_ms: float = 5000):
+        self.bucket_ms = bucket_ms
+        self.counts = [0] * (int(max_ms / bucket_ms) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, value_ms: float):
+        index = min(int(value_ms / self.bucket_ms), len(self.counts) - 1)
+        self.counts[index] += 1
+        self.total += 1
+        self.sum += value_ms
+        self.max = max(self.max, value_ms)
+
+    def percentile(self, p: float) -> float:
+        if not self.total:
+            return 0.0
+        threshold = self.total * p / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= threshold:
+                return (index + 1) * self.bucket_ms
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.total,
+            'mean': round(self.sum / self.total, 2) if self.total else 0.0,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'max': round(self.max, 2),
+        }
+
+
+@dataclass
+class SwarmStats:
+    started: float = field(default_factory=time.monotonic)
+    logged_in: int = 0
+    matched: int = 0
+    completed: int = 0
+    forfeited: int = 0
+    connected: int = 0
+    peak_connected: int = 0
+    frames: int = 0
+    errors: Dict[str, int] = field(default_factory=dict)
+    login_ms: Histogram = field(default_factory=Histogram)
+    matchmaking_ms: Histogram = field(default_factory=lambda: Histogram(bucket_ms=10, max_ms=120000))
+    rtt_ms: Histogram = field(default_factory=Histogram)
+    frame_interval_ms: Histogram = field(default_factory=Histogram)
+
+    def error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def socket_opened(self):
+        self.connected += 1
+        self.peak_connected = max(self.peak_connected, self.connected)
+
+    def socket_closed(self):
+        self.connected -= 1
+
+    def progress_line(self, frames_per_sec: float) -> str:
+        rtt = self.rtt_ms.summary()
+        return (
+            f"[{time.monotonic() - self.started:6.0f}s] "
+            f"logged_in={self.logged_in} sockets={self.connected} matched={self.matched} "
+            f"completed={self.completed} forfeited={self.forfeited} frames/s={frames_per_sec:,.0f} "
+            f"rtt p50={rtt['p50']}ms p99={rtt['p99']}ms errors={sum(self.errors.values())}"
+        )
+
+    def report(self, bots: int) -> Dict:
+        return {
+            'bots': bots,
+            'duration_s': round(time.monotonic() - self.started, 1),
+            'logged_in': self.logged_in,
+            'matched': self.matched,
+            'completed': self.completed,
+            'forfeited': self.forfeited,
+            'peak_game_sockets': self.peak_connected,
+            'frames': self.frames,
+            'errors': self.errors,
+            'login_ms': self.login_ms.summary(),
+            'matchmaking_ms': self.matchmaking_ms.summary(),
+            'rtt_ms': self.rtt_ms.summary(),
+            'frame_interval_ms': self.frame_interval_ms.summary(),
+        }
+
+
+class Bot:
+    def __init__(self, index: int, args, stats: SwarmStats, login_slots: asyncio.Semaphore):
+        self.index = index
+        self.args = args
+        self.stats = stats
+        self.login_slots = login_slots
+        self.access_token: Optional[str] = None
+        self.state: Optional[dict] = None
+        self.last_seq: Optional[int] = None
+
+    def encode(self, payload):
+        if self.args.msgpack:
+            return msgpack.packb(payload)
+        return json.dumps(payload)
+
+    def decode(self, message):
+        if isinstance(message, bytes):
+            return msgpack.unpackb(message)
+        return json.loads(message)
+
+    def connect(self, path: str, subprotocols=None):
+        url = f"{self.args.ws_url}{path}?token={self.access_token}"
+        return websockets.connect(
+            url,
+            ssl=ssl_context if url.startswith('wss') else None,
+            subprotocols=subprotocols,
+            ping_interval=None,
+            open_timeout=self.args.timeout,
+        )
+
+    async def run(self):
+        if not await self.login():
+            return
+
+        for _ in range(self.args.matches):
+            session = await self.find_match()
+            if session is None:
+                return
+            await self.play_game(session)
+
+    async def login(self) -> bool:
+        email = self.args.email.format(i=self.index)
+        password = self.args.password.format(i=self.index)
+
+        async with self.login_slots:
+            started = time.monotonic()
+            try:
+                response = await asyncio.to_thread(
+                    requests.post,
+                    f"{self.args.api_url}/api/login",
+                    json={"email": email, "password": password},
+                    verify=False,
+                    timeout=self.args.timeout,
+                )
+                response.raise_for_status()
+                data = response.json()
+            except requests.RequestException:
+                self.stats.error('login')
+                return False
+
+        if data.get('mfa_required'):
+            self.stats.error('login_mfa')
+            return False
+
+        self.access_token = data['access_token']
+        self.stats.login_ms.record((time.monotonic() - started) * 1000)
+        self.stats.logged_in += 1
+        return True
+
+    async def find_match(self) -> Optional[GameSession]:
+        started = time.monotonic()
+        try:
+            async with self.connect("/ws/matchmaking/") as websocket:
+                await websocket.send(json.dumps({
+                    "type": "find_match",
+                    "game_type": "classic-pong"
+                }))
+
+                while True:
+                    response = json.loads(await asyncio.wait_for(
+                        websocket.recv(), self.args.matchmaking_timeout
+                    ))
+
+                    if response.get("status") == "matched":
+                        self.stats.matchmaking_ms.record((time.monotonic() - started) * 1000)
+                        self.stats.matched += 1
+                        return GameSession(
+                            game_id=response["game_id"],
+                            username=response["username"],
+                            opponent=response["opponent"],
+                            is_player1=response["username"] == response["player1"]
+                        )
+                    elif response.get("status") == "error":
+                        self.stats.error('matchmaking')
+                        return None
+
+        except asyncio.TimeoutError:
+            self.stats.error('matchmaking_timeout')
+        except (OSError, websockets.exceptions.WebSocketException):
+            self.stats.error('matchmaking_connection')
+        return None
+
+    async def play_game(self, session: GameSession):
+        self.state = None
+        self.last_seq = None
+        subprotocols = [MSGPACK_SUBPROTOCOL] if self.args.msgpack else None
+
+        try:
+            async with self.connect(f"/ws/classic-pong/{session.game_id}/", subprotocols) as websocket:
+                self.stats.socket_opened()
+                tasks = [
+                    asyncio.create_task(self.send_inputs(websocket, session)),
+                    asyncio.create_task(self.measure_rtt(websocket)),
+                ]
+                try:
+                    await websocket.send(self.encode({
+                        "type": "init",
+                        "username": session.username,
+                        "opponent": session.opponent,
+                        "isPlayer1": session.is_player1
+                    }))
+                    await asyncio.wait_for(self.receive_frames(websocket), self.args.game_timeout)
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    self.stats.socket_closed()
+
+        except asyncio.TimeoutError:
+            self.stats.error('game_timeout')
+        except (OSError, websockets.exceptions.WebSocketException):
+            self.stats.error('game_connection')
+
+    async def receive_frames(self, websocket):
+        last_frame = None
+
+        while True:
+            response = self.decode(await websocket.recv())
+            kind = response["type"]
+
+            if kind in ("game_state", "game_state_delta"):
+                now = time.monotonic()
+                if last_frame is not None:
+                    self.stats.frame_interval_ms.record((now - last_frame) * 1000)
+                last_frame = now
+                self.stats.frames += 1
+
+                if kind == "game_state":
+                    self.state = response["state"]
+                    self.last_seq = response["seq"]
+                elif self.state is not None and response["base"] == self.last_seq:
+                    self.state = apply_state_delta(self.state, response)
+                    self.last_seq = response["seq"]
+
+            elif kind == "game_ended":
+                self.stats.completed += 1
+                return
+            elif kind == "game_ended_by_forfeit":
+                self.stats.forfeited += 1
+                return
+
+    async def send_inputs(self, websocket, session: GameSession):
+        paddle_key = 'paddle1Y' if session.is_player1 else 'paddle2Y'
+
+        while True:
+            await asyncio.sleep(self.args.input_interval)
+            if not self.state or not self.state.get('gameStarted'):
+                continue
+            if random.random() > self.args.skill:
+                continue
+
+            target = self.state['ballY'] - PADDLE_HEIGHT / 2
+            paddle_y = self.state[paddle_key]
+            if abs(target - paddle_y) < PADDLE_HEIGHT / 4:
+                continue
+
+            direction = "down" if target > paddle_y else "up"
+            try:
+                await websocket.send(self.encode({
+                    "type": "player_input",
+                    "input": direction
+                }))
+            except websockets.exceptions.WebSocketException:
+                return
+
+    async def measure_rtt(self, websocket):
+        while True:
+            await asyncio.sleep(self.args.ping_interval)
+            try:
+                started = time.monotonic()
+                await asyncio.wait_for(await websocket.ping(), self.args.timeout)
+                self.stats.rtt_ms.record((time.monotonic() - started) * 1000)
+            except asyncio.TimeoutError:
+                self.stats.error('ping_timeout')
+            except websockets.exceptions.WebSocketException:
+                return
+
+
+async def report_progress(stats: SwarmStats, interval: float):
+    last_frames = 0
+    while True:
+        await asyncio.sleep(interval)
+        frames_per_sec = (stats.frames - last_frames) / interval
+        last_frames = stats.frames
+        print(stats.progress_line(frames_per_sec), flush=True)
+
+
+async def run_swarm(args, stats: SwarmStats):
+    login_slots = asyncio.Semaphore(args.login_concurrency)
+    reporter = asyncio.create_task(report_progress(stats, args.report_interval))
+
+    bots = []
+    delay = args.ramp / args.bots if args.bots else 0
+    for index in range(args.first, args.first + args.bots):
+        bots.append(asyncio.create_task(Bot(index, args, stats, login_slots).run()))
+        if delay:
+            await asyncio.sleep(delay)
+
+    try:
+        await asyncio.gather(*bots)
+    finally:
+        reporter.cancel()
+
+
+def raise_file_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Headless classic-pong bot swarm for load testing.")
+    parser.add_argument("api_url", nargs="?", default="https://localhost")
+    parser.add_argument("--bots", type=int, default=100, help="number of simulated players (use an even number)")
+    parser.add_argument("--first", type=int, default=0, help="index of the first bot account")
+    parser.add_argument("--matches", type=int, default=1, help="matches each bot plays before exiting")
+    parser.add_argument("--ramp", type=float, default=10, help="seconds over which to start the bots")
+    parser.add_argument("--email", default="bot{i}@bots.local", help="login email template, {i} is the bot index")
+    parser.add_argument("--password", default="botpassword", help="login password template")
+    parser.add_argument("--skill", type=float, default=0.85, help="chance a bot reacts on a given input tick")
+    parser.add_argument("--input-interval", type=float, default=1 / 60)
+    parser.add_argument("--ping-interval", type=float, default=1.0)
+    parser.add_argument("--login-concurrency", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--matchmaking-timeout", type=float, default=60)
+    parser.add_argument("--game-timeout", type=float, default=600)
+    parser.add_argument("--report-interval", type=float, default=5)
+    parser.add_argument("--msgpack", action="store_true", help="negotiate the binary game subprotocol")
+    parser.add_argument("--json", help="write the final report to this file")
+    args = parser.parse_args(argv)
+    args.ws_url = args.api_url.replace('https', 'wss').replace('http', 'ws')
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+
+    if args.msgpack and msgpack is None:
+        print("--msgpack requires the msgpack package (pip install msgpack)")
+        sys.exit(1)
+
+    file_limit = raise_file_limit()
+    if args.bots * 2 > file_limit:
+        print(f"Warning: {args.bots} bots may exceed the open file limit ({file_limit})")
+
+    stats = SwarmStats()
+    try:
+        asyncio.run(run_swarm(args, stats))
+    except KeyboardInterrupt:
+        print("Interrupted, reporting partial results")
+
+    report = stats.report(args.bots)
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
@@ -6,20 +6,81 @@ import requests
 import getpass
 import curses
 import time
+from collections import deque
 from typing import Optional, Dict
 from dataclasses import dataclass
 import ssl
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_SUBPROTOCOL = 'trandadan.msgpack'
+
 GAME_WIDTH = 800
 GAME_HEIGHT = 400
 PADDLE_WIDTH = 15
 PADDLE_HEIGHT = 80
+PADDLE_SPEED = 11
 BALL_SIZE = 10
 
 ssl_context = ssl.create_default_context()
 ssl_context.check_hostname = False
 ssl_context.verify_mode = ssl.CERT_NONE
 
+def apply_state_delta(state, delta):
+    merged = merge_changes(state, delta['changes'])
+    for path in delta.get('removed', []):
+        target = merged
+        for key in path[:-1]:
+            target = target.get(key, {})
+        target.pop(path[-1], None)
+    return merged
+
+def merge_changes(target, changes):
+    result = dict(target)
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = merge_changes(result[key], value)
+        else:
+            result[key] = value
+    return result
+
+def move_paddle(paddle_y, input_type):
+    if input_type == 'up':
+        return max(0, paddle_y - PADDLE_SPEED)
+    if input_type == 'down':
+        return min(GAME_HEIGHT - PADDLE_HEIGHT, paddle_y + PADDLE_SPEED)
+    return paddle_y
+
+class InputPredictor:
+    # moves our paddle as soon as an input is sent: the server acks the last input seq it
+    # applied, so the predicted paddle is the server paddle plus the unacked inputs
+    def __init__(self, is_player1: bool):
+        self.paddle_key = 'paddle1Y' if is_player1 else 'paddle2Y'
+        self.ack_key = 'lastInputAck1' if is_player1 else 'lastInputAck2'
+        self.seq = 0
+        self.pending = deque()
+        self.view_tick = None
+
+    def record(self, input_type: str) -> int:
+        self.seq += 1
+        self.pending.append((self.seq, input_type))
+        return self.seq
+
+    def predict(self, state):
+        # sent with each input so the server can rewind paddle hits to what we were seeing
+        self.view_tick = state.get('tick')
+        ack = state.get(self.ack_key, 0)
+        while self.pending and self.pending[0][0] <= ack:
+            self.pending.popleft()
+
+        paddle_y = state[self.paddle_key]
+        for _, input_type in self.pending:
+            paddle_y = move_paddle(paddle_y, input_type)
+        return {**state, self.paddle_key: paddle_y}
+
 @dataclass
 class GameSession:
     game_id: str
@@ -68,29 +129,34 @@ class KeyboardHandler:
 
             await asyncio.sleep(0.001)
 
-    async def send_input(self, websocket):
+    async def send_input(self, websocket, encode, predictor, on_input):
         while True:
             current_time = asyncio.get_event_loop().time()
 
             if current_time - self.last_sent >= self.input_rate:
+                input_type = None
                 if self.keys['up'].pressed:
-                    await websocket.send(json.dumps({
-                        "type": "player_input",
-                        "input": "up"
-                    }))
+                    input_type = "up"
                 elif self.keys['down'].pressed:
-                    await websocket.send(json.dumps({
+                    input_type = "down"
+
+                if input_type:
+                    await websocket.send(encode({
                         "type": "player_input",
-                        "input": "down"
+                        "input": input_type,
+                        "seq": predictor.record(input_type),
+                        "tick": predictor.view_tick
                     }))
+                    await on_input()
                 self.last_sent = current_time
 
             await asyncio.sleep(self.input_rate)
 
 class PongCLI:
-    def __init__(self, api_url: str, ws_url: str):
+    def __init__(self, api_url: str, ws_url: str, use_msgpack: bool = False):
         self.api_url = api_url
         self.ws_url = ws_url
+        self.use_msgpack = use_msgpack
         self.access_token = None
         self.game_session: Optional[GameSession] = None
         self.matchmaking_ws = None
@@ -98,6 +164,18 @@ class PongCLI:
         self.keyboard_handler = KeyboardHandler()
         self.stdscr = None
         self.game_window = None
+        self.state = None
+        self.predictor: Optional[InputPredictor] = None
+
+    def encode(self, payload):
+        if self.use_msgpack:
+            return msgpack.packb(payload)
+        return json.dumps(payload)
+
+    def decode(self, message):
+        if isinstance(message, bytes):
+            return msgpack.unpackb(message)
+        return json.loads(message)
 
     def init_curses(self):
         self.stdscr = curses.initscr()
@@ -202,6 +280,10 @@ class PongCLI:
             await asyncio.sleep(2)
             return False
 
+    async def render_predicted(self):
+        if self.state is not None:
+            await self.render_game_state(self.predictor.predict(self.state))
+
     async def render_game_state(self, state):
         FIXED_WIDTH = 80
         FIXED_HEIGHT = 22
@@ -260,29 +342,45 @@ class PongCLI:
 
         try:
             ws_url = f"{self.ws_url}/ws/classic-pong/{self.game_session.game_id}/?token={self.access_token}"
-            async with websockets.connect(ws_url, ssl=ssl_context) as websocket:
+            subprotocols = [MSGPACK_SUBPROTOCOL] if self.use_msgpack else None
+            async with websockets.connect(ws_url, ssl=ssl_context, subprotocols=subprotocols) as websocket:
                 self.game_ws = websocket
 
-                await websocket.send(json.dumps({
+                await websocket.send(self.encode({
                     "type": "init",
                     "username": self.game_session.username,
                     "opponent": self.game_session.opponent,
                     "isPlayer1": self.game_session.is_player1
                 }))
 
+                self.state = None
+                self.predictor = InputPredictor(self.game_session.is_player1)
+
                 keyboard_task = asyncio.create_task(
                     self.keyboard_handler.handle_input(self.stdscr)
                 )
                 input_task = asyncio.create_task(
-                    self.keyboard_handler.send_input(websocket)
+                    self.keyboard_handler.send_input(
+                        websocket, self.encode, self.predictor, self.render_predicted
+                    )
                 )
 
+                last_seq = None
+
                 try:
                     while True:
-                        response = json.loads(await websocket.recv())
+                        response = self.decode(await websocket.recv())
 
                         if response["type"] == "game_state":
-                            await self.render_game_state(response["state"])
+                            self.state = response["state"]
+                            last_seq = response["seq"]
+                            await self.render_predicted()
+                        elif response["type"] == "game_state_delta":
+                            if self.state is None or response["base"] != last_seq:
+                                continue
+                            self.state = apply_state_delta(self.state, response)
+                            last_seq = response["seq"]
+                            await self.render_predicted()
                         elif response["type"] == "game_ended":
                             winner = response["winner"]
                             is_winner = winner == self.game_session.username
@@ -352,9 +450,16 @@ if __name__ == "__main__":
     api_url = "https://localhost"
     ws_url = "wss://localhost"
 
-    if len(sys.argv) > 1:
-        api_url = sys.argv[1]
-        ws_url = sys.argv[1].replace('https', 'wss')
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    use_msgpack = '--msgpack' in sys.argv
+
+    if args:
+        api_url = args[0]
+        ws_url = args[0].replace('https', 'wss')
+
+    if use_msgpack and msgpack is None:
+        print("--msgpack requires the msgpack package (pip install msgpack)")
+        sys.exit(1)
 
-    client = PongCLI(api_url, ws_url)
+    client = PongCLI(api_url, ws_url, use_msgpack)
     asyncio.run(client.run())